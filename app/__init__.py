@@ -31,6 +31,10 @@ def create_app(config_name='default'):
     
     # Security middleware temporarily disabled for debugging
     
+    # Request/DB timings and the /metrics endpoint
+    from app.utils import metrics
+    metrics.init_app(app)
+    
     # Configure CORS using settings
     CORS(app, 
          origins=app.config.get('CORS_ORIGINS', ['http://localhost:3000', 'http://localhost:5173', 'http://localhost:8080']),
@@ -70,11 +74,29 @@ def create_app(config_name='default'):
         try:
             from app.services.sync_scheduler import sync_scheduler
             from app.services.event_listener import event_listener
+            from app.services.transaction_monitor import transaction_monitor
+            from app.services.trending_service import trending_engine
+            from app.services.polymarket_event_index import polymarket_event_index
+            from app.services.job_scheduler import job_scheduler
             
-            # Start sync scheduler (only in production or when explicitly enabled)
+            # Start sync jobs (only in production or when explicitly enabled)
             if app.config.get('ENABLE_AUTO_SYNC', False):
-                sync_scheduler.start()
-                event_listener.start_listening()
+                with app.app_context():
+                    trending_engine.warm_start()
+                
+                # Chain ingestion writes shared rows: one leader per cluster runs it
+                job_scheduler.register('market_sync', sync_scheduler.run_cycle,
+                                       lambda: sync_scheduler.next_cycle_in)
+                job_scheduler.register('event_listener', event_listener.poll,
+                                       lambda: event_listener.poll_interval)
+                job_scheduler.register('transaction_monitor', transaction_monitor.poll,
+                                       transaction_monitor.poll_interval)
+                # In-memory indexes are per process
+                job_scheduler.register('trending', trending_engine.tick,
+                                       trending_engine.refresh_interval, leader_only=False)
+                job_scheduler.register('gamma_event_index', polymarket_event_index.refresh,
+                                       polymarket_event_index.refresh_interval, leader_only=False)
+                job_scheduler.start(app)
                 print("Auto-sync services started")
             else:
                 print("Auto-sync services disabled (set ENABLE_AUTO_SYNC=true to enable)")
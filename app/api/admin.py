@@ -1,12 +1,17 @@
 """
 Admin API endpoints for market management and system operations
 """
-from flask import Blueprint, request, jsonify
-from app import db, cache
+from flask import Blueprint, request, jsonify, current_app
+from app import db
 from app.models import Market, Prediction, User
 from app.services.contract_service import contract_service
 from app.services.event_listener import event_listener
+from app.services.job_scheduler import job_scheduler
+from app.services.position_reconciler import position_reconciler
 from app.services.sync_scheduler import sync_scheduler
+from app.services.transaction_monitor import transaction_monitor
+from app.utils.tagged_cache import tagged_cache
+from app.utils.validators import parse_flag
 import os
 import time
 
@@ -32,8 +37,8 @@ def sync_all_data():
     try:
         result = sync_scheduler.force_sync()
         
+        # Affected cache tags are evicted by the sync itself
         if result['success']:
-            cache.clear()
             return jsonify(result), 200
         else:
             return jsonify(result), 500
@@ -50,10 +55,114 @@ def get_sync_status():
     
     try:
         stats = sync_scheduler.get_stats()
+        stats['event_listener'] = event_listener.get_stats()
+        stats['transaction_monitor'] = transaction_monitor.get_monitoring_stats()
+        stats['jobs'] = job_scheduler.get_stats()
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/sync/cleanup', methods=['POST'])
+def cleanup_orphaned_markets():
+    """Remove markets that no longer exist on chain; dry_run (default true) only reports them
+    
+    Reading every chain market takes too long for a request, so this starts a
+    background task (202); GET /sync/cleanup returns its status and report.
+    """
+    auth_error = require_admin_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        dry_run = parse_flag(data.get('dry_run'), True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        task = job_scheduler.run_in_background(
+            'sync_cleanup', lambda: sync_scheduler.cleanup_orphans(dry_run=dry_run), current_app._get_current_object()
+        )
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'task': task}), 202
+
+@bp.route('/sync/cleanup', methods=['GET'])
+def get_cleanup_status():
+    """Status and report of this worker's last background cleanup"""
+    auth_error = require_admin_auth()
+    if auth_error:
+        return auth_error
+    
+    return jsonify({
+        'task': job_scheduler.get_task('sync_cleanup'),
+        'last_cleanup': sync_scheduler.last_cleanup
+    }), 200
+
+@bp.route('/reconcile/positions', methods=['POST'])
+def reconcile_positions():
+    """Verify predictions against on-chain bets; fixes drift unless dry_run (default true)
+    
+    With market_id the (bounded) check runs inline and returns the report.
+    Without it the full reconciliation runs as a background task: the response
+    is 202 and GET /reconcile/positions reports progress and the result.
+    """
+    auth_error = require_admin_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        limit = min(int(data.get('limit', 100)), 1000)
+        dry_run = parse_flag(data.get('dry_run'), True)
+        market_id = data.get('market_id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def run():
+        report = position_reconciler.reconcile(market_id=market_id, dry_run=dry_run)
+        report['drifts'] = report['drifts'][:limit]
+        return report
+    
+    try:
+        if market_id is not None:
+            return jsonify(run()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    try:
+        task = job_scheduler.run_in_background('reconcile_positions', run, current_app._get_current_object())
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'task': task}), 202
+
+@bp.route('/reconcile/positions', methods=['GET'])
+def get_reconcile_status():
+    """Status and result of this worker's last background reconciliation"""
+    auth_error = require_admin_auth()
+    if auth_error:
+        return auth_error
+    
+    return jsonify({
+        'task': job_scheduler.get_task('reconcile_positions'),
+        'last_report': position_reconciler.last_report
+    }), 200
+
+@bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get per-tag cache hit/miss/eviction counters"""
+    auth_error = require_admin_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        return jsonify({
+            'tags': tagged_cache.get_stats(request.args.get('tag')),
+            'rpc_reads': contract_service.read_cache.get_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/system/health', methods=['GET'])
 def health_check():
     """Comprehensive health check"""
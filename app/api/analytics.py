@@ -1,13 +1,14 @@
 from flask import Blueprint, request, jsonify
-from app import db, cache
+from app import db
 from app.models import Market, Prediction, User
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
+from app.utils.tagged_cache import tagged_cache, ANALYTICS_TAG
 
 bp = Blueprint('analytics', __name__)
 
 @bp.route('/overview', methods=['GET'])
-@cache.cached(timeout=300)
+@tagged_cache.cached(timeout=300, tags=[ANALYTICS_TAG])
 def get_overview():
     """Get platform overview statistics"""
     try:
@@ -54,42 +55,38 @@ def get_overview():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/markets/top', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)
+@tagged_cache.cached(timeout=300, tags=[ANALYTICS_TAG], query_string=True)
 def get_top_markets():
     """Get top markets by various metrics"""
     try:
         metric = request.args.get('metric', 'volume')  # volume, liquidity, predictions
         limit = min(request.args.get('limit', 10, type=int), 50)
         
+        try:
+            fields = Market.parse_fields(request.args.get('fields'), request.args.get('view'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         if metric == 'liquidity':
-            markets = Market.query.order_by(desc(Market.total_liquidity)).limit(limit).all()
+            query = Market.query.order_by(desc(Market.total_liquidity))
         elif metric == 'predictions':
-            # Count predictions per market
-            market_ids = db.session.query(
-                Prediction.market_id,
-                func.count(Prediction.id).label('count')
-            ).group_by(Prediction.market_id).order_by(desc('count')).limit(limit).all()
-            
-            markets = []
-            for market_id, count in market_ids:
-                market = Market.query.get(market_id)
-                if market:
-                    market_dict = market.to_dict()
-                    market_dict['prediction_count'] = count
-                    markets.append(market_dict)
-            
-            return jsonify({'markets': markets}), 200
+            # Ranked by the denormalized per-market prediction counter
+            query = Market.query.order_by(desc(Market.prediction_count))
         else:
-            markets = Market.query.order_by(desc(Market.volume_24h)).limit(limit).all()
+            query = Market.query.order_by(desc(Market.volume_24h))
+        
+        if fields is not None:
+            query = query.options(Market.load_only_option(fields))
         
-        market_list = [m.to_dict() for m in markets]
+        markets = query.limit(limit).all()
+        market_list = [m.to_dict(fields) for m in markets]
         
         return jsonify({'markets': market_list}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/categories/stats', methods=['GET'])
-@cache.cached(timeout=300)
+@tagged_cache.cached(timeout=300, tags=[ANALYTICS_TAG])
 def get_category_stats():
     """Get statistics by category"""
     try:
@@ -117,7 +114,7 @@ def get_category_stats():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/activity/recent', methods=['GET'])
-@cache.cached(timeout=60)
+@tagged_cache.cached(timeout=60, tags=[ANALYTICS_TAG])
 def get_recent_activity():
     """Get recent platform activity"""
     try:
@@ -148,7 +145,7 @@ def get_recent_activity():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/volume/history', methods=['GET'])
-@cache.cached(timeout=300)
+@tagged_cache.cached(timeout=300, tags=[ANALYTICS_TAG])
 def get_volume_history():
     """Get volume history (placeholder for time-series data)"""
     try:
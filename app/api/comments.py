@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Comment, Market, User
 from sqlalchemy import desc
+from app.utils.tagged_cache import tagged_cache, market_tag
+from app.services.trending_service import trending_engine
 
 bp = Blueprint('comments', __name__)
 
@@ -68,6 +70,8 @@ def create_comment():
             market.comment_count = (market.comment_count or 0) + 1
         
         db.session.commit()
+        tagged_cache.invalidate(market_tag(data['market_id']))
+        trending_engine.record_comment(data['market_id'])
         
         return jsonify({
             'message': 'Comment created successfully',
@@ -13,12 +13,22 @@ def get_user_favorites(user_address):
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
         
+        try:
+            fields = Market.parse_fields(request.args.get('fields'), request.args.get('view'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Get user's favorites with market details
-        pagination = db.session.query(Favorite, Market).join(
+        query = db.session.query(Favorite, Market).join(
             Market, Favorite.market_id == Market.id
         ).filter(
             Favorite.user_address == user_address
-        ).order_by(desc(Favorite.created_at)).paginate(
+        ).order_by(desc(Favorite.created_at))
+        
+        if fields is not None:
+            query = query.options(Market.load_only_option(fields))
+        
+        pagination = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -28,7 +38,7 @@ def get_user_favorites(user_address):
                 'id': favorite.id,
                 'market_id': favorite.market_id,
                 'created_at': favorite.created_at.isoformat() if favorite.created_at else None,
-                'market': {
+                'market': market.to_dict(fields) if fields is not None else {
                     'id': market.id,
                     'question': market.question,
                     'description': market.description,
@@ -1,111 +1,183 @@
-from flask import Blueprint, request, jsonify
-from app import db, cache
-from app.models import Market, User
+from flask import Blueprint, request, jsonify, make_response
+from app import db
+from app.models import Market, User, PriceCandle
+from app.models.market import null_as_zero
+from app.models.price_history import CANDLE_INTERVALS
 from app.services.contract_service import contract_service
 from app.services.market_sports_service import market_sports_service
+from app.services.market_search_service import market_search_service
+from app.services.trending_service import trending_engine
+from app.utils.helpers import encode_cursor, decode_cursor
+from app.utils.http_cache import body_etag, make_etag, not_modified, add_validators
+from app.utils.tagged_cache import tagged_cache, market_tag, market_list_tags, MARKET_LIST_TAG
 from sqlalchemy import desc, func, not_
 from datetime import datetime
+import time
 
 bp = Blueprint('markets', __name__)
 
+# Sortable columns for the market list; anything else falls back to end_time.
+# All are integers, and the nullable ones sort NULL as 0 so those rows keep a cursor position.
+MARKET_SORT_COLUMNS = {
+    'total_liquidity': null_as_zero(Market.total_liquidity),
+    'yes_pool': null_as_zero(Market.yes_pool),
+    'no_pool': null_as_zero(Market.no_pool),
+    'end_time': Market.end_time
+}
+
+MARKET_LIST_CACHE_TIMEOUT = 30
+MARKET_CACHE_TIMEOUT = 30
+MAX_BATCH_IDS = 250
+MAX_CANDLES = 2000
+
+def _filtered_markets_query():
+    """Market list query with the request's filters applied (no ordering)"""
+    category = request.args.get('category')
+    status = request.args.get('status')  # active, resolved
+    search = request.args.get('search')
+    
+    # Build query - only user-created markets (exclude auto-synced Polymarket markets)
+    # Any ID containing 'polymarket' (case-insensitive) is excluded in SQL
+    query = Market.query.filter(
+        ~func.lower(Market.id).like('%polymarket%')
+    )
+    
+    # Apply filters
+    if category and category != 'All':
+        query = query.filter(Market.category == category)
+    
+    if status == 'active':
+        # Filter out expired markets - only show markets that haven't ended yet
+        current_time = int(datetime.utcnow().timestamp())
+        query = query.filter(
+            Market.resolved == False,
+            Market.end_time > current_time
+        )
+    elif status == 'resolved':
+        query = query.filter(Market.resolved == True)
+    
+    if search:
+        query = market_search_service.filter_query(query, search)
+    
+    return query
+
 @bp.route('', methods=['GET'])
-# @cache.cached(timeout=2, query_string=True)  # Temporarily disabled to test filter
 def get_markets():
-    """Get all markets with filtering and pagination - only user-created markets"""
+    """Get all markets with filtering and pagination - only user-created markets
+    
+    `view=card` or `fields=a,b,c` return a projected representation backed by
+    a column-restricted query (live sports enrichment is full view only).
+    
+    Supports offset pagination via `page` and keyset pagination via `cursor`.
+    When a cursor is given, `page` is ignored and the total count is skipped so
+    deep pages cost the same as the first one.
+    
+    Responds 304 when the client's ETag still matches the (cached) response
+    body, or its If-Modified-Since is not older than the newest market on the
+    page (the body's last_modified); no aggregate query runs on cache hits.
+    """
+    try:
+        response = make_response(_get_markets_response())
+        if response.status_code != 200:
+            return response
+        
+        etag = body_etag(response)
+        last_modified = response.get_json().get('last_modified')
+        last_modified = datetime.fromisoformat(last_modified) if last_modified else None
+        conditional = not_modified(etag, last_modified)
+        if conditional is not None:
+            return conditional
+        
+        return add_validators(response, etag, last_modified)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tagged_cache.cached(timeout=MARKET_LIST_CACHE_TIMEOUT, tags=market_list_tags, query_string=True)
+def _get_markets_response():
+    """Build the (cacheable) market list response"""
     try:
         # Query parameters
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
-        category = request.args.get('category')
-        status = request.args.get('status')  # active, resolved
         sort_by = request.args.get('sort_by', 'created_timestamp')  # volume_24h, total_liquidity, created_timestamp                                            
-        search = request.args.get('search')
-        
-        # Build query - only user-created markets (exclude auto-synced Polymarket markets)
-        # Filter out markets with IDs starting with 'polymarket_' (case-insensitive)
-        # Using SQLAlchemy filter with multiple checks for reliability
-        query = Market.query.filter(
-            ~Market.id.like('polymarket_%')
-        )
+        cursor = request.args.get('cursor')
         
-        # Apply filters
-        if category and category != 'All':
-            query = query.filter(Market.category == category)
-        
-        if status == 'active':
-            # Filter out expired markets - only show markets that haven't ended yet
-            current_time = int(datetime.utcnow().timestamp())
-            query = query.filter(
-                Market.resolved == False,
-                Market.end_time > current_time
-            )
-        elif status == 'resolved':
-            query = query.filter(Market.resolved == True)
-        
-        if search:
+        try:
+            fields = Market.parse_fields(request.args.get('fields'), request.args.get('view'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = _filtered_markets_query()
+        
+        # Apply sorting - id is the tiebreaker so the ordering is total and keyset-safe
+        sort_key = sort_by if sort_by in MARKET_SORT_COLUMNS else 'end_time'
+        sort_column = MARKET_SORT_COLUMNS[sort_key]
+        query = query.order_by(desc(sort_column), desc(Market.id))
+        
+        # Projected lists only SELECT the columns they serialize (plus the cursor and Last-Modified columns)
+        if fields is not None:
+            query = query.options(Market.load_only_option(fields, sort_key, 'last_updated'))
+        
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if position['s'] != sort_key:
+                return jsonify({'error': 'Cursor does not match sort_by'}), 400
+            
+            # Compared against integer columns and string ids; anything else is a forged cursor
+            value, last_id = position['v'], position['id']
+            if not isinstance(value, int) or isinstance(value, bool) or not isinstance(last_id, str):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            
             query = query.filter(
                 db.or_(
-                    Market.question.ilike(f'%{search}%'),
-                    Market.description.ilike(f'%{search}%')
+                    sort_column < value,
+                    db.and_(sort_column == value, Market.id < last_id)
                 )
             )
+            
+            # Fetch one extra row to know whether another page exists
+            page_markets = query.limit(per_page + 1).all()
+            has_next = len(page_markets) > per_page
+            page_markets = page_markets[:per_page]
+            pagination_info = {
+                'per_page': per_page,
+                'cursor': cursor,
+                'has_next': has_next
+            }
+        else:
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            page_markets = pagination.items
+            has_next = pagination.has_next
+            pagination_info = {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': has_next,
+                'has_prev': pagination.has_prev
+            }
+        
+        last_market = page_markets[-1] if page_markets else None
+        pagination_info['next_cursor'] = encode_cursor(
+            sort_key, getattr(last_market, sort_key) or 0, last_market.id
+        ) if has_next and last_market else None
         
-        # Apply sorting
-        if sort_by == 'total_liquidity':
-            query = query.order_by(desc(Market.total_liquidity))
-        elif sort_by == 'yes_pool':
-            query = query.order_by(desc(Market.yes_pool))
-        elif sort_by == 'no_pool':
-            query = query.order_by(desc(Market.no_pool))
+        if fields is not None:
+            markets = [market.to_dict(fields) for market in page_markets]
         else:
-            query = query.order_by(desc(Market.end_time))
-        
-        # CRITICAL: Filter out Polymarket markets BEFORE pagination to ensure they're never returned
-        # This is a safety net in case the SQLAlchemy filter doesn't work as expected
-        # Use a simple, aggressive filter that checks if 'polymarket' appears anywhere in the ID
-        def is_polymarket_market(market_id) -> bool:
-            """Check if a market ID is a Polymarket-synced market - be very aggressive"""
-            if not market_id:
-                return False
-            market_id_str = str(market_id).lower()
-            # Check for any variation of 'polymarket' in the ID
-            return 'polymarket' in market_id_str
-        
-        # Get all results and filter in Python before pagination
-        all_markets = query.all()
-        # Filter out ANY market that contains 'polymarket' in its ID (case-insensitive)
-        filtered_markets = [m for m in all_markets if not is_polymarket_market(m.id)]
-        
-        # Log any Polymarket markets that were filtered out
-        polymarket_markets = [m for m in all_markets if is_polymarket_market(m.id)]
-        if polymarket_markets:
-            print(f"⚠️ WARNING: {len(polymarket_markets)} Polymarket markets filtered out")
-            print(f"   Sample IDs: {[m.id for m in polymarket_markets[:3]]}")
-        
-        # Apply pagination to filtered results manually
-        total_filtered = len(filtered_markets)
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_markets = filtered_markets[start_idx:end_idx]
-        
-        print(f"DEBUG: Total markets before filter: {len(all_markets)}, After filter: {total_filtered}, Paginated: {len(paginated_markets)}")
-        
-        markets = []
-        for market in paginated_markets:
-            market_dict = market.to_dict()
-            market_dict['prices'] = market.calculate_prices()
-            
-            # Add prediction count
-            from app.models import Prediction
-            prediction_count = Prediction.query.filter_by(market_id=market.id).count()
-            market_dict['prediction_count'] = prediction_count
-            
-            markets.append(market_dict)
+            markets = []
+            for market in page_markets:
+                market_dict = market.to_dict()
+                market_dict['prices'] = market.calculate_prices()
+                markets.append(market_dict)
         
-        # Add live sports data for sports markets
+        # Add live sports data for sports markets (full representation only)
         try:
-            # Use paginated_markets, not all markets, to avoid processing Polymarket markets
-            live_scores = market_sports_service.get_live_scores_for_markets(paginated_markets)
+            live_scores = market_sports_service.get_live_scores_for_markets(page_markets) if fields is None else {}
             for market_dict in markets:
                 if market_dict['id'] in live_scores:
                     market_dict['live_sports'] = live_scores[market_dict['id']]
@@ -113,27 +185,137 @@ def get_markets():
             print(f"Error fetching live sports data: {e}")
             # Continue without live sports data if there's an error
         
-        # Calculate pagination info from filtered results
-        pages_filtered = (total_filtered + per_page - 1) // per_page
+        # Newest change on the page, served as Last-Modified
+        last_modified = max((m.last_updated for m in page_markets if m.last_updated), default=None)
         
         return jsonify({
             'markets': markets,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total_filtered,
-                'pages': pages_filtered,
-                'has_next': page < pages_filtered,
-                'has_prev': page > 1
-            }
+            'pagination': pagination_info,
+            'last_modified': last_modified.isoformat() if last_modified else None
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/search', methods=['GET'])
+def search_markets():
+    """Full-text search over markets, ranked by relevance with prefix matching"""
+    try:
+        term = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        category = request.args.get('category')
+        status = request.args.get('status')  # active, resolved
+        
+        if not term:
+            return jsonify({'error': 'Missing search query parameter: q'}), 400
+        
+        started = time.perf_counter()
+        hits = market_search_service.search(
+            term,
+            limit=limit,
+            offset=offset,
+            category=category,
+            status=status,
+            now=int(datetime.utcnow().timestamp())
+        )
+        took_ms = (time.perf_counter() - started) * 1000
+        
+        results = []
+        for market, score in hits:
+            market_dict = market.to_dict()
+            market_dict['prices'] = market.calculate_prices()
+            results.append({'market': market_dict, 'score': round(score, 6)})
+        
+        return jsonify({
+            'query': term,
+            'results': results,
+            'count': len(results),
+            'limit': limit,
+            'offset': offset,
+            'took_ms': round(took_ms, 2)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/batch', methods=['GET', 'POST'])
+def get_markets_batch():
+    """Get many markets by ID in one call
+    
+    GET takes `ids=1,2,3`, POST takes a JSON body `{"ids": [...]}`. Markets are
+    returned in request order; unknown ids are listed under `missing`.
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            raw_ids = data.get('ids') or []
+            if not isinstance(raw_ids, list):
+                return jsonify({'error': 'ids must be a list'}), 400
+        else:
+            raw_ids = (request.args.get('ids') or '').split(',')
+        
+        # De-duplicate while keeping the caller's order
+        market_ids = list(dict.fromkeys(str(i).strip() for i in raw_ids if str(i).strip()))
+        
+        if not market_ids:
+            return jsonify({'error': 'ids is required'}), 400
+        if len(market_ids) > MAX_BATCH_IDS:
+            return jsonify({'error': f'At most {MAX_BATCH_IDS} ids per request'}), 400
+        
+        # Per-market entries share the market:<id> tag with the detail cache,
+        # so any write that evicts a market detail also evicts its batch entry
+        entries = {f'market-object:{market_id}': [market_tag(market_id)] for market_id in market_ids}
+        cached, keys = tagged_cache.get_many(entries)
+        found = {key.split(':', 1)[1]: value for key, value in cached.items()}
+        
+        misses = [market_id for market_id in market_ids if market_id not in found]
+        if misses:
+            fetched = {}
+            for market in Market.query.filter(Market.id.in_(misses)).all():
+                market_dict = market.to_dict()
+                market_dict['prices'] = market.calculate_prices()
+                fetched[f'market-object:{market.id}'] = market_dict
+                found[market.id] = market_dict
+            
+            tagged_cache.set_many(fetched, keys, timeout=MARKET_CACHE_TIMEOUT)
+        
+        return jsonify({
+            'markets': [found[market_id] for market_id in market_ids if market_id in found],
+            'missing': [market_id for market_id in market_ids if market_id not in found],
+            'cache_hits': len(cached)
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/<market_id>', methods=['GET'])
-@cache.cached(timeout=30)
 def get_market(market_id):
     """Get a specific market by ID"""
+    try:
+        # Narrow PK lookup decides freshness before any serialization work
+        version = db.session.query(
+            Market.last_updated, Market.prediction_count
+        ).filter(Market.id == market_id).first()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    etag = make_etag(market_id, *version) if version else None
+    if etag:
+        conditional = not_modified(etag, version.last_updated)
+        if conditional is not None:
+            return conditional
+    
+    response = make_response(_get_market_response(market_id=market_id))
+    
+    # Count the view even when the response is served from cache
+    if response.status_code == 200:
+        trending_engine.record_view(market_id)
+        if etag:
+            add_validators(response, etag, version.last_updated)
+    
+    return response
+
+@tagged_cache.cached(timeout=MARKET_CACHE_TIMEOUT, tags=lambda market_id: [market_tag(market_id)])
+def _get_market_response(market_id):
+    """Build the (cacheable) market detail response"""
     try:
         market = Market.query.get(market_id)
         
@@ -141,21 +323,17 @@ def get_market(market_id):
             # Try fetching from blockchain
             market_data = contract_service.get_market(int(market_id))
             if market_data:
-                market = Market(**market_data)
-                db.session.add(market)
+                Market.upsert_from_chain([market_data])
                 db.session.commit()
+                market = Market.query.get(market_id)
             else:
                 return jsonify({'error': 'Market not found'}), 404
         
         market_dict = market.to_dict()
         market_dict['prices'] = market.calculate_prices()
         
-        # Add prediction count and recent predictions
-        from app.models import Prediction
-        prediction_count = Prediction.query.filter_by(market_id=market.id).count()
-        market_dict['prediction_count'] = prediction_count
-        
         # Get recent predictions for this market
+        from app.models import Prediction
         recent_predictions = Prediction.query.filter_by(
             market_id=market.id
         ).order_by(desc(Prediction.timestamp)).limit(10).all()
@@ -172,34 +350,26 @@ def sync_markets():
     try:
         markets_data = contract_service.fetch_all_markets()
         
-        synced_count = 0
-        for market_data in markets_data:
-            market = Market.query.get(market_data['id'])
-            if market:
-                # Update existing market
-                for key, value in market_data.items():
-                    if hasattr(market, key):
-                        setattr(market, key, value)
-            else:
-                # Create new market
-                market = Market(**market_data)
-                db.session.add(market)
-            
-            synced_count += 1
-        
+        # Unchanged markets (same chain fingerprint) are skipped entirely
+        created, updated = Market.upsert_from_chain(markets_data)
         db.session.commit()
-        cache.clear()
+        
+        changed = set(created + updated)
+        if changed:
+            tagged_cache.invalidate_markets(changed, Market.categories_of(changed))
         
         return jsonify({
             'message': 'Markets synced successfully',
-            'synced_count': synced_count
+            'synced_count': len(markets_data),
+            'created_count': len(created),
+            'updated_count': len(updated)
         }), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/categories', methods=['GET'])
-@cache.cached(timeout=300)
+@tagged_cache.cached(timeout=300, tags=[MARKET_LIST_TAG])
 def get_categories():
     """Get all market categories with counts"""
     try:
@@ -218,15 +388,26 @@ def get_categories():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/featured', methods=['GET'])
-@cache.cached(timeout=120)
+@tagged_cache.cached(timeout=120, tags=[MARKET_LIST_TAG], query_string=True)
 def get_featured_markets():
     """Get featured markets (high volume/liquidity)"""
     try:
-        markets = Market.query.filter(
+        try:
+            fields = Market.parse_fields(request.args.get('fields'), request.args.get('view'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = Market.query.filter(
             Market.resolved == False
         ).order_by(
             desc(Market.total_liquidity)
-        ).limit(10).all()
+        )
+        
+        if fields is not None:
+            markets = query.options(Market.load_only_option(fields)).limit(10).all()
+            return jsonify({'markets': [m.to_dict(fields) for m in markets]}), 200
+        
+        markets = query.limit(10).all()
         
         market_list = []
         for market in markets:
@@ -238,6 +419,32 @@ def get_featured_markets():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/trending', methods=['GET'])
+def get_trending_markets():
+    """Get trending markets from the precomputed trending index"""
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        ranked = trending_engine.get_trending(limit=limit, offset=offset)
+        markets_by_id = {
+            m.id: m for m in Market.query.filter(Market.id.in_([market_id for market_id, _ in ranked])).all()
+        } if ranked else {}
+        
+        market_list = []
+        for market_id, score in ranked:
+            market = markets_by_id.get(market_id)
+            if not market or market.resolved or 'polymarket' in market.id.lower():
+                continue
+            market_dict = market.to_dict()
+            market_dict['prices'] = market.calculate_prices()
+            market_dict['trending_score'] = round(score, 6)
+            market_list.append(market_dict)
+        
+        return jsonify({'markets': market_list}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('', methods=['POST'])
 def create_market():
     """Create a new market"""
@@ -292,8 +499,8 @@ def create_market():
         
         db.session.commit()
         
-        # Clear cache
-        cache.clear()
+        # Evict only the entries this market affects
+        tagged_cache.invalidate_markets([market.id], [data.get('category')])
         
         return jsonify({
             'message': 'Market created successfully',
@@ -313,10 +520,12 @@ def cleanup_polymarket_markets():
         count = len(polymarket_markets)
         
         if count > 0:
+            removed_ids = [market.id for market in polymarket_markets]
+            removed_categories = {market.category for market in polymarket_markets}
             for market in polymarket_markets:
                 db.session.delete(market)
             db.session.commit()
-            cache.clear()
+            tagged_cache.invalidate_markets(removed_ids, removed_categories)
             
             return jsonify({
                 'message': f'Removed {count} Polymarket markets from database',
@@ -332,6 +541,36 @@ def cleanup_polymarket_markets():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<market_id>/candles', methods=['GET'])
+@tagged_cache.cached(timeout=MARKET_CACHE_TIMEOUT, tags=lambda market_id: [market_tag(market_id)], query_string=True)
+def get_market_candles(market_id):
+    """Get OHLC + volume candles of the YES price for a market
+    
+    `interval` is one of 1m, 1h, 1d (default 1h). Candles are pre-rolled on
+    every pool change, so this is a single indexed range read at any interval.
+    """
+    try:
+        interval = request.args.get('interval', '1h')
+        if interval not in CANDLE_INTERVALS:
+            return jsonify({'error': f"interval must be one of {', '.join(CANDLE_INTERVALS)}"}), 400
+        
+        start = request.args.get('start', type=int)
+        end = request.args.get('end', type=int)
+        limit = min(request.args.get('limit', 500, type=int), MAX_CANDLES)
+        
+        if not db.session.query(Market.id).filter(Market.id == market_id).first():
+            return jsonify({'error': 'Market not found'}), 404
+        
+        candles = PriceCandle.get_series(market_id, interval, start=start, end=end, limit=limit)
+        
+        return jsonify({
+            'market_id': market_id,
+            'interval': interval,
+            'candles': [c.to_dict() for c in candles]
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/<int:market_id>/live-sports', methods=['GET'])
 def get_market_live_sports(market_id):
     """Get live sports data for a specific market"""
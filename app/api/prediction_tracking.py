@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
+from sqlalchemy import func
 from app import db
 from app.models import Prediction, Market, User
 from app.services.prediction_tracking_service import prediction_tracking_service
+from app.utils.http_cache import make_etag, not_modified, add_validators
 
 bp = Blueprint('prediction_tracking', __name__)
 
@@ -106,7 +108,6 @@ def get_active_predictions():
                 'market_question': prediction.market.question if prediction.market else 'Unknown Market',
                 'outcome': prediction.outcome,
                 'amount': prediction.amount / 1_000_000_000,
-                'shares': prediction.shares / 1_000_000_000,
                 'timestamp': prediction.timestamp,
                 'status': status
             })
@@ -126,13 +127,28 @@ def get_active_predictions():
 def get_live_predictions():
     """Get live predictions with real-time updates"""
     try:
-        # Get recent predictions (last 24 hours)
+        # Get recent predictions (last 24 hours) - timestamps are unix seconds
         from datetime import datetime, timedelta
-        since = datetime.utcnow() - timedelta(hours=24)
+        since = int((datetime.utcnow() - timedelta(hours=24)).timestamp())
         
-        recent_predictions = db.session.query(Prediction).join(Market).filter(
+        window = db.session.query(Prediction).join(Market).filter(
             Prediction.timestamp >= since
-        ).order_by(Prediction.timestamp.desc()).limit(100).all()
+        )
+        
+        # New predictions raise max(id); resolutions and claims bump last_updated
+        max_id, count, markets_updated = window.with_entities(
+            func.max(Prediction.id),
+            func.count(Prediction.id),
+            func.max(Market.last_updated)
+        ).first()
+        etag = make_etag('live', max_id, count, markets_updated)
+        
+        # Weak: the body also carries render-time fields (last_updated, time remaining)
+        conditional = not_modified(etag, weak=True)
+        if conditional is not None:
+            return conditional
+        
+        recent_predictions = window.order_by(Prediction.timestamp.desc()).limit(100).all()
         
         results = []
         for prediction in recent_predictions:
@@ -144,18 +160,18 @@ def get_live_predictions():
                 'market_question': prediction.market.question if prediction.market else 'Unknown Market',
                 'outcome': prediction.outcome,
                 'amount': prediction.amount / 1_000_000_000,
-                'shares': prediction.shares / 1_000_000_000,
                 'timestamp': prediction.timestamp,
                 'status': status,
                 'is_live': not prediction.market.resolved if prediction.market else False
             })
         
-        return jsonify({
+        response = make_response(jsonify({
             'success': True,
             'predictions': results,
             'last_updated': datetime.utcnow().isoformat(),
             'total_count': len(results)
-        }), 200
+        }), 200)
+        return add_validators(response, etag, markets_updated, weak=True)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -180,7 +196,6 @@ def get_recent_predictions():
                 'market_question': prediction.market.question if prediction.market else 'Unknown Market',
                 'outcome': prediction.outcome,
                 'amount': prediction.amount / 1_000_000_000,
-                'shares': prediction.shares / 1_000_000_000,
                 'timestamp': prediction.timestamp,
                 'status': status,
                 'is_resolved': prediction.market.resolved if prediction.market else False
@@ -3,6 +3,8 @@ from app import db
 from app.models import Prediction, Market, User
 from sqlalchemy import desc
 from datetime import datetime
+from app.utils.tagged_cache import tagged_cache
+from app.services.trending_service import trending_engine
 
 bp = Blueprint('predictions', __name__)
 
@@ -103,6 +105,12 @@ def create_prediction():
         if existing:
             return jsonify({'error': 'User already has a prediction on this outcome for this market'}), 409
         
+        # First prediction by this user on this market counts as a new participant
+        is_new_participant = Prediction.query.filter_by(
+            market_id=data['market_id'],
+            user_address=data['user_address']
+        ).first() is None
+        
         # Create prediction matching smart contract Bet struct
         prediction = Prediction(
             transaction_hash=transaction_hash,
@@ -115,7 +123,10 @@ def create_prediction():
         )
         
         db.session.add(prediction)
+        Market.increment_prediction_count(market.id)
         db.session.commit()
+        tagged_cache.invalidate_markets([market.id], [market.category])
+        trending_engine.record_prediction(market.id, prediction.amount, new_participant=is_new_participant)
         
         return jsonify({
             'message': 'Prediction created successfully',
@@ -5,6 +5,8 @@ from .liquidity import LiquidityProvider, LiquidityWithdrawal
 from .comment import Comment, Favorite
 from .notification import Notification, ActivityFeed
 from .game import Game
+from .price_history import PriceSnapshot, PriceCandle
+from .sync_checkpoint import SyncCheckpoint
 
 __all__ = [
     'Market', 
@@ -16,6 +18,9 @@ __all__ = [
     'Favorite',
     'Notification',
     'ActivityFeed',
-    'Game'
+    'Game',
+    'PriceSnapshot',
+    'PriceCandle',
+    'SyncCheckpoint'
 ]
 
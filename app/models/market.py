@@ -1,6 +1,43 @@
+import time
+import hashlib
 from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import load_only
 from app import db
 
+# Lightweight shape for list/card views ('prices' is derived from yes_pool/no_pool)
+CARD_FIELDS = (
+    'id', 'question', 'category', 'image_url', 'end_time', 'resolved',
+    'total_liquidity', 'volume_24h', 'prediction_count', 'prices'
+)
+
+# Virtual fields and the columns they are computed from
+DERIVED_FIELDS = {
+    'prices': ('yes_pool', 'no_pool')
+}
+
+MARKET_VIEWS = {
+    'card': CARD_FIELDS
+}
+
+# Columns read from the contract's markets() getter; fingerprinted into chain_hash
+CHAIN_FIELDS = (
+    'question', 'description', 'end_time', 'resolved', 'winning_outcome', 'total_liquidity',
+    'outcome_a_shares', 'outcome_b_shares', 'yes_pool', 'no_pool', 'creator'
+)
+
+# Ids per IN (...) lookup during chain upserts
+UPSERT_CHUNK_SIZE = 1000
+
+def null_as_zero(column):
+    """Sort expression for a nullable numeric column: NULL orders (and pages) as 0
+    
+    The 0 is a literal rather than a bound parameter so the expression matches
+    an index declared on it.
+    """
+    return func.coalesce(column, literal_column('0'))
+
 class Market(db.Model):
     """Market model matching smart contract structure"""
     __tablename__ = 'markets'
@@ -16,8 +53,9 @@ class Market(db.Model):
     total_liquidity = db.Column(db.BigInteger, default=0)
     outcome_a_shares = db.Column(db.BigInteger, default=0)  # outcomeAShares
     outcome_b_shares = db.Column(db.BigInteger, default=0)  # outcomeBShares
-    yes_pool = db.Column(db.BigInteger, default=0)  # yesPool
-    no_pool = db.Column(db.BigInteger, default=0)   # noPool
+    # Previous pool values are kept on change so price history can compute volume
+    yes_pool = db.column_property(db.Column(db.BigInteger, default=0), active_history=True)  # yesPool
+    no_pool = db.column_property(db.Column(db.BigInteger, default=0), active_history=True)   # noPool
     volume_24h = db.Column(db.BigInteger, default=0)  # 24h volume
     created_timestamp = db.Column(db.BigInteger, nullable=False)  # created timestamp
     category = db.Column(db.String(50))  # market category
@@ -31,9 +69,11 @@ class Market(db.Model):
     participant_count = db.Column(db.Integer, default=0)
     comment_count = db.Column(db.Integer, default=0)
     favorite_count = db.Column(db.Integer, default=0)
+    prediction_count = db.Column(db.Integer, default=0)  # maintained on prediction writes
     slug = db.Column(db.String(200), unique=True)
     featured = db.Column(db.Boolean, default=False)
     trending_score = db.Column(db.Float, default=0.0)
+    chain_hash = db.Column(db.String(32))  # chain_fingerprint() of the last synced contract read
     
     # Sports-specific fields
     home_team = db.Column(db.String(100))
@@ -59,8 +99,15 @@ class Market(db.Model):
     def __repr__(self):
         return f'<Market {self.id}: {self.question[:50]}>'
     
-    def to_dict(self):
-        """Convert market to dictionary matching smart contract structure"""
+    def to_dict(self, fields=None):
+        """Convert market to dictionary matching smart contract structure
+        
+        When fields is given only those keys are serialized, so a row loaded
+        with load_only() never lazy-loads the columns it skipped.
+        """
+        if fields is not None:
+            return {name: self._field_value(name) for name in fields}
+        
         return {
             'id': self.id,
             'question': self.question,
@@ -83,9 +130,10 @@ class Market(db.Model):
             'participant_count': self.participant_count,
             'comment_count': self.comment_count,
             'favorite_count': self.favorite_count,
+            'prediction_count': self.prediction_count or 0,
             'slug': self.slug,
             'featured': self.featured,
-            'trending_score': self.trending_score,
+            'trending_score': self.current_trending_score(),
             'last_updated': self.last_updated.isoformat() if self.last_updated else None,
             # Sports-specific fields
             'home_team': self.home_team,
@@ -102,6 +150,53 @@ class Market(db.Model):
             'market_confidence': self.market_confidence
         }
     
+    def _field_value(self, name):
+        """Serialize a single field for projected output"""
+        if name == 'prices':
+            return self.calculate_prices()
+        if name == 'last_updated':
+            return self.last_updated.isoformat() if self.last_updated else None
+        if name == 'prediction_count':
+            return self.prediction_count or 0
+        if name == 'trending_score':
+            return self.current_trending_score()
+        return getattr(self, name)
+    
+    def current_trending_score(self):
+        """trending_score decayed to now (the column is stored forward-decayed)"""
+        from app.services.trending_service import trending_engine
+        return trending_engine.decayed(self.trending_score)
+    
+    @staticmethod
+    def parse_fields(fields_param=None, view=None):
+        """Resolve ?fields= / ?view= into a field list (None means the full representation)"""
+        if fields_param:
+            fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+        elif view and view != 'full':
+            if view not in MARKET_VIEWS:
+                raise ValueError(f"Unknown view: {view}")
+            return list(MARKET_VIEWS[view])
+        else:
+            return None
+        
+        allowed = set(Market.__table__.columns.keys()) | set(DERIVED_FIELDS)
+        unknown = [f for f in fields if f not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        
+        # id is always returned so clients can key the objects
+        return ['id'] + [f for f in dict.fromkeys(fields) if f != 'id']
+    
+    @staticmethod
+    def load_only_option(fields, *extra_columns):
+        """load_only() option restricting the SELECT to what fields (plus extras) need"""
+        column_names = set(Market.__table__.columns.keys())
+        needed = {'id', *extra_columns}
+        for name in fields:
+            needed.update(DERIVED_FIELDS.get(name, (name,)))
+        
+        return load_only(*[getattr(Market, name) for name in sorted(needed & column_names)])
+    
     def calculate_prices(self):
         """Calculate YES/NO prices based on smart contract pools"""
         total_liquidity = self.yes_pool + self.no_pool
@@ -112,4 +207,106 @@ class Market(db.Model):
         no_price = round((self.no_pool / total_liquidity) * 100)
         
         return {'yes_price': yes_price, 'no_price': no_price}
+    
+    @staticmethod
+    def increment_prediction_count(market_id, by=1):
+        """Atomically bump the denormalized prediction counter (caller commits)"""
+        Market.query.filter_by(id=str(market_id)).update(
+            {Market.prediction_count: db.func.coalesce(Market.prediction_count, 0) + by},
+            synchronize_session=False
+        )
+    
+    @staticmethod
+    def chain_fingerprint(market_data: Dict) -> str:
+        """Stable hash of the CHAIN_FIELDS of a contract read"""
+        payload = '\x1f'.join(repr(market_data.get(name)) for name in CHAIN_FIELDS)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def upsert_from_chain(markets_data: Sequence[Dict]) -> Tuple[List[str], List[str]]:
+        """Create or update markets from contract reads, touching only rows whose fingerprint changed
+        
+        Stored fingerprints are compared in bulk; only mismatched markets are
+        loaded and only their differing fields are set, so unchanged markets
+        produce no UPDATE. Returns (created_ids, updated_ids); caller commits.
+        """
+        hashes = {str(m['id']): Market.chain_fingerprint(m) for m in markets_data}
+        ids = list(hashes)
+        
+        stored = {}
+        for i in range(0, len(ids), UPSERT_CHUNK_SIZE):
+            stored.update(
+                db.session.query(Market.id, Market.chain_hash).filter(Market.id.in_(ids[i:i + UPSERT_CHUNK_SIZE]))
+            )
+        
+        stale_ids = [market_id for market_id in ids if market_id in stored and stored[market_id] != hashes[market_id]]
+        stale = {}
+        for i in range(0, len(stale_ids), UPSERT_CHUNK_SIZE):
+            stale.update(
+                (market.id, market) for market in
+                Market.query.filter(Market.id.in_(stale_ids[i:i + UPSERT_CHUNK_SIZE]))
+            )
+        
+        created, updated = [], []
+        for market_data in markets_data:
+            market_id = str(market_data['id'])
+            if market_id in stale:
+                market = stale[market_id]
+                changed = False
+                for key in CHAIN_FIELDS:
+                    if key in market_data and getattr(market, key) != market_data[key]:
+                        setattr(market, key, market_data[key])
+                        changed = True
+                market.chain_hash = hashes[market_id]
+                # A missing or outdated fingerprint alone is bookkeeping, not a market change
+                if changed:
+                    updated.append(market_id)
+            elif market_id not in stored:
+                market_data = dict(market_data, chain_hash=hashes[market_id])
+                # The markets() getter has no creation time
+                market_data.setdefault('created_timestamp', int(time.time()))
+                db.session.add(Market(**market_data))
+                stored[market_id] = hashes[market_id]
+                created.append(market_id)
+        
+        return created, updated
+    
+    @staticmethod
+    def categories_of(market_ids) -> set:
+        """Distinct categories of the given markets, for evicting category-filtered list caches"""
+        market_ids = [str(market_id) for market_id in market_ids]
+        categories = set()
+        for i in range(0, len(market_ids), UPSERT_CHUNK_SIZE):
+            categories.update(
+                category for (category,) in
+                db.session.query(Market.category).filter(Market.id.in_(market_ids[i:i + UPSERT_CHUNK_SIZE])).distinct()
+                if category
+            )
+        return categories
+    
+    @staticmethod
+    def backfill_prediction_counts():
+        """Recompute prediction_count for all markets from one GROUP BY query"""
+        from app.models.prediction import Prediction
+        
+        counts = db.session.query(
+            Prediction.market_id,
+            db.func.count(Prediction.id)
+        ).group_by(Prediction.market_id).all()
+        
+        Market.query.update({Market.prediction_count: 0}, synchronize_session=False)
+        if counts:
+            db.session.execute(
+                db.update(Market),
+                [{'id': market_id, 'prediction_count': count} for market_id, count in counts]
+            )
+        db.session.commit()
+        
+        return len(counts)
 
+# (sort expression DESC, id DESC) indexes back keyset pagination on the market list.
+# They match the list's ORDER BY exactly and are declared the same way in supabase_schema.sql.
+db.Index('idx_markets_end_time_id', Market.end_time.desc(), Market.id.desc())
+db.Index('idx_markets_total_liquidity_id', null_as_zero(Market.total_liquidity).desc(), Market.id.desc())
+db.Index('idx_markets_yes_pool_id', null_as_zero(Market.yes_pool).desc(), Market.id.desc())
+db.Index('idx_markets_no_pool_id', null_as_zero(Market.no_pool).desc(), Market.id.desc())
@@ -18,6 +18,11 @@ class Prediction(db.Model):
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Backs position lookups and the reconciler's (market_id, user_address) keyset scan
+    __table_args__ = (
+        db.Index('idx_predictions_market_user', 'market_id', 'user_address'),
+    )
+    
     def __repr__(self):
         return f'<Prediction {self.id}: {self.user_address[:10]}... on {self.market_id[:10]}...>'
     
@@ -0,0 +1,142 @@
+import time
+from sqlalchemy import event, inspect
+from app import db
+from app.utils.bulk import greatest, least, upsert
+from .market import Market
+
+# Candle intervals kept pre-rolled, in seconds
+CANDLE_INTERVALS = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400
+}
+
+def yes_price_bps(yes_pool, no_pool):
+    """YES price in basis points (0-10000) from the pools, 5000 when empty"""
+    total = (yes_pool or 0) + (no_pool or 0)
+    if total == 0:
+        return 5000
+    return round((yes_pool or 0) * 10000 / total)
+
+class PriceSnapshot(db.Model):
+    """YES price of a market each time its pools change"""
+    __tablename__ = 'price_snapshots'
+    __table_args__ = (
+        db.Index('idx_price_snapshots_market_timestamp', 'market_id', 'timestamp'),
+    )
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    market_id = db.Column(db.String(66), db.ForeignKey('markets.id', ondelete='CASCADE'), nullable=False)
+    timestamp = db.Column(db.BigInteger, nullable=False)
+    yes_price = db.Column(db.SmallInteger, nullable=False)  # basis points
+    volume = db.Column(db.BigInteger, default=0)  # pool growth since the previous snapshot
+    
+    def to_dict(self):
+        return {
+            'market_id': self.market_id,
+            'timestamp': self.timestamp,
+            'yes_price': self.yes_price / 100,
+            'no_price': (10000 - self.yes_price) / 100,
+            'volume': self.volume
+        }
+
+class PriceCandle(db.Model):
+    """Pre-rolled OHLC + volume of the YES price per market, interval and bucket"""
+    __tablename__ = 'price_candles'
+    
+    market_id = db.Column(db.String(66), db.ForeignKey('markets.id', ondelete='CASCADE'), primary_key=True)
+    interval = db.Column(db.String(4), primary_key=True)  # 1m, 1h, 1d
+    bucket_start = db.Column(db.BigInteger, primary_key=True)
+    open = db.Column(db.SmallInteger, nullable=False)  # basis points
+    high = db.Column(db.SmallInteger, nullable=False)
+    low = db.Column(db.SmallInteger, nullable=False)
+    close = db.Column(db.SmallInteger, nullable=False)
+    volume = db.Column(db.BigInteger, default=0)
+    
+    def to_dict(self):
+        return {
+            'time': self.bucket_start,
+            'open': self.open / 100,
+            'high': self.high / 100,
+            'low': self.low / 100,
+            'close': self.close / 100,
+            'volume': self.volume
+        }
+    
+    @staticmethod
+    def get_series(market_id, interval, start=None, end=None, limit=500):
+        """Candles for one market, oldest first, ending at `end` (or now)"""
+        query = PriceCandle.query.filter(
+            PriceCandle.market_id == str(market_id),
+            PriceCandle.interval == interval
+        )
+        if start is not None:
+            query = query.filter(PriceCandle.bucket_start >= start)
+        if end is not None:
+            query = query.filter(PriceCandle.bucket_start <= end)
+        
+        candles = query.order_by(PriceCandle.bucket_start.desc()).limit(limit).all()
+        return candles[::-1]
+
+def _pool_changes(session):
+    """(market, old_total) for every new market and every market whose pools changed"""
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Market):
+            changes.append((obj, None))
+    
+    for obj in session.dirty:
+        if not isinstance(obj, Market):
+            continue
+        attrs = inspect(obj).attrs
+        yes_history, no_history = attrs.yes_pool.history, attrs.no_pool.history
+        if not (yes_history.has_changes() or no_history.has_changes()):
+            continue
+        
+        old_yes = yes_history.deleted[0] if yes_history.deleted else obj.yes_pool
+        old_no = no_history.deleted[0] if no_history.deleted else obj.no_pool
+        if yes_price_bps(old_yes, old_no) == yes_price_bps(obj.yes_pool, obj.no_pool) and \
+                (old_yes or 0) + (old_no or 0) == (obj.yes_pool or 0) + (obj.no_pool or 0):
+            continue
+        changes.append((obj, (old_yes or 0) + (old_no or 0)))
+    
+    return changes
+
+@event.listens_for(db.session, 'after_flush')
+def record_price_changes(session, flush_context):
+    """Append a snapshot and roll the 1m/1h/1d candles for every pool change in this flush
+    
+    Runs after the markets are written (candles reference them) while the
+    flush's pool history is still available. Candles are rolled with one
+    INSERT ... ON CONFLICT DO UPDATE, so concurrent writers to the same bucket
+    combine in the database instead of overwriting each other's high, low
+    and volume.
+    """
+    changes = _pool_changes(session)
+    if not changes:
+        return
+    
+    now = int(time.time())
+    starts = {name: now - now % seconds for name, seconds in CANDLE_INTERVALS.items()}
+    
+    snapshots, candles = [], []
+    for market, old_total in changes:
+        market_id = str(market.id)
+        price = yes_price_bps(market.yes_pool, market.no_pool)
+        total = (market.yes_pool or 0) + (market.no_pool or 0)
+        volume = max(total - old_total, 0) if old_total is not None else total
+        
+        snapshots.append({'market_id': market_id, 'timestamp': now, 'yes_price': price, 'volume': volume})
+        for name, bucket_start in starts.items():
+            candles.append({
+                'market_id': market_id, 'interval': name, 'bucket_start': bucket_start,
+                'open': price, 'high': price, 'low': price, 'close': price, 'volume': volume
+            })
+    
+    session.execute(PriceSnapshot.__table__.insert(), snapshots)
+    upsert(PriceCandle, candles, ['market_id', 'interval', 'bucket_start'], lambda excluded: {
+        'high': greatest(PriceCandle.high, excluded.high),
+        'low': least(PriceCandle.low, excluded.low),
+        'close': excluded.close,
+        'volume': db.func.coalesce(PriceCandle.volume, 0) + excluded.volume
+    })
@@ -0,0 +1,38 @@
+from datetime import datetime
+from app import db
+
+class SyncCheckpoint(db.Model):
+    """Last block a chain sync process has fully applied, by process name"""
+    __tablename__ = 'sync_checkpoints'
+    
+    name = db.Column(db.String(64), primary_key=True)  # e.g. market_sync, event_listener
+    block_number = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SyncCheckpoint {self.name}: {self.block_number}>'
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'block_number': self.block_number,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    @staticmethod
+    def get(name):
+        """Checkpoint by name, or None if the process has never completed a pass"""
+        return SyncCheckpoint.query.get(name)
+    
+    @staticmethod
+    def save(name, block_number):
+        """Create or advance a checkpoint (caller commits with the synced data)"""
+        checkpoint = SyncCheckpoint.query.get(name)
+        if checkpoint is None:
+            checkpoint = SyncCheckpoint(name=name, block_number=block_number)
+            db.session.add(checkpoint)
+        else:
+            checkpoint.block_number = block_number
+            # Touch the row even when the block did not move
+            checkpoint.updated_at = datetime.utcnow()
+        return checkpoint
@@ -0,0 +1,105 @@
+"""
+Block-Keyed Read Cache
+Read-through cache for contract view calls keyed by (call, args, block number).
+
+Contract state cannot change within a block, so a view call result is valid
+for as long as the chain head stays at the block it was read at. Calls are
+pinned to the cached head block; when a newer head is observed every entry is
+dropped. Concurrent callers asking for the same key while it is being loaded
+wait for the single in-flight call instead of issuing their own.
+"""
+import os
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class BlockReadCache:
+    """Per-head-block view call cache with single-flight loading"""
+    
+    def __init__(self, get_block_number: Callable[[], int], head_ttl: Optional[float] = None,
+                 max_entries: int = 50000):
+        self.get_block_number = get_block_number
+        # How long an observed head is trusted before asking the node again
+        self.head_ttl = head_ttl if head_ttl is not None else float(os.getenv('RPC_HEAD_TTL', 1.0))
+        self.max_entries = max_entries
+        
+        self.block = None
+        self.head_checked_at = 0.0
+        self.entries: Dict[Hashable, Any] = {}
+        self.in_flight: Dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0}
+    
+    def head(self) -> int:
+        """Current head block, refreshed at most every head_ttl seconds"""
+        now = time.time()
+        if self.block is not None and now - self.head_checked_at < self.head_ttl:
+            return self.block
+        
+        block = self.get_block_number()
+        self.observe_head(block)
+        self.head_checked_at = now
+        return block
+    
+    def observe_head(self, block: int):
+        """Record a head seen elsewhere (e.g. by a log poller); a newer head drops every entry"""
+        with self.lock:
+            if self.block is None or block > self.block:
+                if self.entries:
+                    self.stats['invalidations'] += 1
+                self.block = block
+                self.entries = {}
+    
+    def get(self, name: str, args: tuple, loader: Callable[[int], Any]) -> Any:
+        """Cached result of name(*args) at the head block; loader(block) performs the call"""
+        block = self.head()
+        key = (name, args, block)
+        
+        with self.lock:
+            if key in self.entries:
+                self.stats['hits'] += 1
+                return self.entries[key]
+            
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.in_flight[key] = future
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = loader(block)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+        
+        self.put(name, args, block, result)
+        future.set_result(result)
+        return result
+    
+    def put(self, name: str, args: tuple, block: int, result: Any):
+        """Store a result read at block (ignored if the head has moved on)"""
+        with self.lock:
+            if block != self.block or len(self.entries) >= self.max_entries:
+                return
+            self.entries[(name, args, block)] = result
+    
+    def get_stats(self) -> Dict:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+            hit_ratio = (self.stats['hits'] + self.stats['coalesced']) / lookups if lookups else 0.0
+            return {
+                'block': self.block,
+                'entries': len(self.entries),
+                'hit_ratio': round(hit_ratio, 4),
+                'stats': dict(self.stats)
+            }
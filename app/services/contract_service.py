@@ -3,20 +3,99 @@ Single Smart Contract Service - Used by both Frontend and Backend
 No duplication, no over-engineering
 """
 import os
+import threading
 import requests
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Iterable, List, Dict, Optional, Sequence
+from eth_utils import event_abi_to_log_topic
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
+from app.services.block_cache import BlockReadCache
+from app.services.rpc_client import evm_rpc_client, RpcClientProvider, RpcError
+
+# Multicall3 is deployed at the same address on Base, Base Sepolia and most EVM chains
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+MIN_LOG_BLOCK_RANGE = 10
+# Full windows at the learned ceiling before probing above it again
+LOG_RANGE_RECOVERY_WINDOWS = 50
+
+# Node error messages providers use for eth_getLogs span or result-count limits
+LOG_RANGE_ERROR_MESSAGES = (
+    'block range', 'range is too large', 'range too large', 'max range', 'query returned more than',
+    'response size', 'logs matched', 'too many logs', 'too many results', 'limit exceeded'
+)
+
+def is_log_range_error(error: Exception) -> bool:
+    """True for a node rejecting an eth_getLogs span or result count, not a transport or rate-limit failure"""
+    # web3 raises ValueError(<JSON-RPC error object>) for node-side errors
+    detail = error.args[0] if isinstance(error, ValueError) and error.args else None
+    if not isinstance(detail, dict):
+        return False
+    message = str(detail.get('message', '')).lower()
+    if any(m in message for m in ('rate limit', 'rate-limit', 'too many requests', 'request count')):
+        return False
+    return any(m in message for m in LOG_RANGE_ERROR_MESSAGES)
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
 
 class ContractService:
     """Single service for all smart contract interactions"""
     
     def __init__(self):
-        # Use BASE_RPC_URL from config (fallback to old env var for compatibility)
-        self.rpc_url = os.getenv('BASE_RPC_URL') or os.getenv('ETH_RPC_URL', 'https://base-sepolia.api.onfinality.io/public')
+        # BASE_RPC_URLS (comma-separated) or BASE_RPC_URL, through the shared pooled client
+        self.rpc = evm_rpc_client
+        self.rpc_url = self.rpc.primary_url
         # Use PREDICTION_MARKET_CONTRACT_ADDRESS from config (fallback to old env var for compatibility)
         self.contract_address = os.getenv('PREDICTION_MARKET_CONTRACT_ADDRESS') or os.getenv('CONTRACT_ADDRESS', '0x63c0c19a282a1B52b07dD5a65b58948A07DAE32B')
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        # Batched reads: calls per aggregate3 request and requests in flight
+        self.multicall_address = os.getenv('MULTICALL3_ADDRESS', MULTICALL3_ADDRESS)
+        self.multicall_batch_size = int(os.getenv('MULTICALL_BATCH_SIZE', 200))
+        self.multicall_concurrency = int(os.getenv('MULTICALL_CONCURRENCY', 4))
+        self.multicall = None
+        # eth_getLogs window: starts at LOG_BLOCK_RANGE, shrinks when the provider
+        # rejects a range and grows back towards LOG_BLOCK_RANGE_MAX on success.
+        # A rejection also lowers the ceiling, which recovers after a run of full windows.
+        self.log_block_range = int(os.getenv('LOG_BLOCK_RANGE', 2000))
+        self.configured_max_log_block_range = int(os.getenv('LOG_BLOCK_RANGE_MAX', 10000))
+        self.max_log_block_range = self.configured_max_log_block_range
+        self.full_windows_at_ceiling = 0
+        self.w3 = Web3(RpcClientProvider(self.rpc))
+        # View call results keyed by (function, args, head block)
+        self.read_cache = BlockReadCache(lambda: self.w3.eth.block_number)
+        # Block number -> timestamp; a block's timestamp never changes, so entries only age out by size
+        self.block_timestamps = OrderedDict()
+        self.block_timestamp_cache_size = int(os.getenv('BLOCK_TIMESTAMP_CACHE_SIZE', 10000))
+        self.block_timestamp_lock = threading.Lock()
         
         # Add POA middleware for Base (required for Base testnet)
         self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
@@ -120,6 +199,10 @@ class ContractService:
                     address=checksum_address,
                     abi=self.contract_abi
                 )
+                self.multicall = self.w3.eth.contract(
+                    address=self.w3.to_checksum_address(self.multicall_address),
+                    abi=MULTICALL3_ABI
+                )
                 print(f"Contract service initialized with address: {checksum_address}")
             except Exception as e:
                 print(f"Error initializing contract: {e}")
@@ -134,52 +217,248 @@ class ContractService:
             return None
             
         try:
-            market_data = self.contract.functions.markets(market_id).call()
-            
-            return {
-                'id': str(market_id),
-                'question': market_data[0],
-                'description': market_data[1],
-                'end_time': market_data[2],
-                'resolved': market_data[3],
-                'winning_outcome': market_data[4],
-                'total_liquidity': market_data[5],
-                'outcome_a_shares': market_data[6],
-                'outcome_b_shares': market_data[7],
-                'yes_pool': market_data[8],
-                'no_pool': market_data[9],
-                'creator': market_data[10]
-            }
+            market_data = self.cached_call('markets', market_id)
+            return self._market_dict(market_id, market_data)
         except Exception as e:
             print(f"Error fetching market {market_id}: {e}")
             return None
     
+    def _market_dict(self, market_id: int, market_data: Sequence) -> Dict:
+        """Map a markets(id) return tuple onto Market model fields"""
+        return {
+            'id': str(market_id),
+            'question': market_data[0],
+            'description': market_data[1],
+            'end_time': market_data[2],
+            'resolved': market_data[3],
+            'winning_outcome': market_data[4],
+            'total_liquidity': market_data[5],
+            'outcome_a_shares': market_data[6],
+            'outcome_b_shares': market_data[7],
+            'yes_pool': market_data[8],
+            'no_pool': market_data[9],
+            'creator': market_data[10]
+        }
+    
     def fetch_all_markets(self) -> List[Dict]:
         """Get all markets from blockchain"""
         if not self.contract:
             return []
             
         try:
-            next_market_id = self.contract.functions.nextMarketId().call()
-            markets = []
-            
-            for market_id in range(next_market_id):
-                market_data = self.get_market(market_id)
-                if market_data:
-                    markets.append(market_data)
-            
-            return markets
+            return self.get_markets(range(self.get_next_market_id()))
         except Exception as e:
             print(f"Error fetching all markets: {e}")
             return []
     
+    def get_next_market_id(self) -> int:
+        """nextMarketId: market ids on chain are 0 .. nextMarketId - 1"""
+        return self.cached_call('nextMarketId')
+    
+    def get_markets(self, market_ids: Sequence[int]) -> List[Dict]:
+        """Get many markets with batched multicall reads (markets that fail to load are skipped)"""
+        if not self.contract:
+            return []
+        
+        market_ids = list(market_ids)
+        results = self.batch_call('markets', [(market_id,) for market_id in market_ids])
+        
+        return [
+            self._market_dict(market_id, market_data)
+            for market_id, market_data in zip(market_ids, results)
+            if market_data is not None
+        ]
+    
+    def cached_call(self, fn_name: str, *args) -> Any:
+        """View call pinned to the head block, served from the read cache until the head moves"""
+        def load(block):
+            result = getattr(self.contract.functions, fn_name)(*args).call(block_identifier=block)
+            return tuple(result) if isinstance(result, list) else result
+        return self.read_cache.get(fn_name, args, load)
+    
+    def batch_call(self, fn_name: str, args_list: Sequence[Sequence[Any]]) -> List[Optional[tuple]]:
+        """Call a view function once per args tuple, aggregated through Multicall3
+        
+        Calls are split into chunks of multicall_batch_size and up to
+        multicall_concurrency chunks are in flight at once. Results line up with
+        args_list; a failed call yields None. Every chunk reads the same head
+        block and successful results are stored in the read cache.
+        """
+        if not self.contract or not args_list:
+            return []
+        
+        block = self.read_cache.head()
+        chunks = [
+            args_list[i:i + self.multicall_batch_size]
+            for i in range(0, len(args_list), self.multicall_batch_size)
+        ]
+        
+        if self.multicall is None:
+            results = [result for chunk in chunks for result in self._call_individually(fn_name, chunk, block)]
+        else:
+            # Every chunk is one aggregate3 eth_call; up to multicall_concurrency run at once
+            responses = self.rpc.call_many([
+                ('eth_call', [{'to': self.multicall.address, 'data': self._encode_aggregate(fn_name, chunk)}, hex(block)])
+                for chunk in chunks
+            ], concurrency=self.multicall_concurrency)
+            
+            results = []
+            for chunk, response in zip(chunks, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    results.extend(self._decode_aggregate(fn_name, response))
+                except Exception as e:
+                    print(f"Multicall for {fn_name} failed, falling back to individual calls: {e}")
+                    results.extend(self._call_individually(fn_name, chunk, block))
+        
+        for args, result in zip(args_list, results):
+            if result is not None:
+                self.read_cache.put(fn_name, tuple(args), block, result)
+        return results
+    
+    def _call_individually(self, fn_name: str, chunk: Sequence[Sequence[Any]], block: int) -> List[Optional[tuple]]:
+        results = []
+        for args in chunk:
+            try:
+                results.append(tuple(getattr(self.contract.functions, fn_name)(*args).call(block_identifier=block)))
+            except Exception as e:
+                print(f"Error calling {fn_name}{tuple(args)}: {e}")
+                results.append(None)
+        return results
+    
+    def _encode_aggregate(self, fn_name: str, chunk: Sequence[Sequence[Any]]) -> str:
+        calls = [
+            (self.contract.address, True, self.contract.encodeABI(fn_name=fn_name, args=list(args)))
+            for args in chunk
+        ]
+        return self.multicall.encodeABI(fn_name='aggregate3', args=[calls])
+    
+    def _decode_aggregate(self, fn_name: str, response: str) -> List[Optional[tuple]]:
+        outputs = self.contract.get_function_by_name(fn_name).abi['outputs']
+        output_types = [o['type'] for o in outputs]
+        (responses,) = self.w3.codec.decode(['(bool,bytes)[]'], Web3.to_bytes(hexstr=response))
+        
+        results = []
+        for success, return_data in responses:
+            if not success or not return_data:
+                results.append(None)
+                continue
+            
+            values = self.w3.codec.decode(output_types, return_data)
+            # Match what contract.functions.<fn>().call() returns for addresses
+            results.append(tuple(
+                Web3.to_checksum_address(v) if t == 'address' else v
+                for t, v in zip(output_types, values)
+            ))
+        return results
+    
+    def get_block_number(self) -> int:
+        """Latest block number of the connected chain (a new head invalidates the read cache)"""
+        block = self.w3.eth.block_number
+        self.read_cache.observe_head(block)
+        return block
+    
+    def get_block_timestamps(self, block_numbers: Iterable[int]) -> Dict[int, int]:
+        """Timestamps of the given blocks, fetching the uncached ones in one JSON-RPC batch
+        
+        Raises if any block cannot be read, so callers never fall back to wall-clock time.
+        """
+        wanted = set(block_numbers)
+        with self.block_timestamp_lock:
+            found = {n: self.block_timestamps[n] for n in wanted if n in self.block_timestamps}
+            for n in found:
+                self.block_timestamps.move_to_end(n)
+        
+        missing = sorted(wanted - set(found))
+        if not missing:
+            return found
+        
+        results = self.rpc.batch([('eth_getBlockByNumber', [hex(n), False]) for n in missing])
+        for n, block in zip(missing, results):
+            if isinstance(block, RpcError):
+                raise block
+            if not block:
+                raise ValueError(f"Block {n} not available from the node")
+            found[n] = int(block['timestamp'], 16)
+        
+        with self.block_timestamp_lock:
+            for n in missing:
+                self.block_timestamps[n] = found[n]
+            while len(self.block_timestamps) > self.block_timestamp_cache_size:
+                self.block_timestamps.popitem(last=False)
+        return found
+    
+    def event_topics(self) -> Dict[str, str]:
+        """topic0 hex -> event name for every event in the contract ABI"""
+        return {
+            Web3.to_hex(event_abi_to_log_topic(abi)): abi['name']
+            for abi in self.contract_abi if abi.get('type') == 'event'
+        }
+    
+    def get_logs(self, from_block: int, to_block: int, event_names: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Raw logs of contract events in [from_block, to_block], one topic-OR request per window
+        
+        event_names restricts the query to those events (default: all of them).
+        """
+        if not self.contract or to_block < from_block:
+            return []
+        
+        topics = [
+            topic for topic, name in self.event_topics().items()
+            if event_names is None or name in event_names
+        ]
+        logs = []
+        start = from_block
+        while start <= to_block:
+            window = self.log_block_range
+            end = min(start + window - 1, to_block)
+            try:
+                batch = self.w3.eth.get_logs({
+                    'address': self.contract.address,
+                    'fromBlock': start,
+                    'toBlock': end,
+                    'topics': [topics]
+                })
+            except Exception as e:
+                # Timeouts, resets and 5xx say nothing about the window size; let the caller retry later
+                if not is_log_range_error(e) or window <= MIN_LOG_BLOCK_RANGE:
+                    raise
+                # Providers cap the block span or result count; halve and retry the same start
+                self.max_log_block_range = max(window - 1, MIN_LOG_BLOCK_RANGE)
+                self.log_block_range = max(window // 2, MIN_LOG_BLOCK_RANGE)
+                self.full_windows_at_ceiling = 0
+                print(f"eth_getLogs {start}-{end} rejected ({e}), retrying with {self.log_block_range} blocks")
+                continue
+            
+            logs.extend(batch)
+            # A full window went through, so probe a slightly larger one next time
+            if end - start + 1 == window:
+                if window >= self.max_log_block_range:
+                    self.full_windows_at_ceiling += 1
+                    # Result-count limits depend on activity, so retry a higher ceiling after a quiet stretch
+                    if self.full_windows_at_ceiling >= LOG_RANGE_RECOVERY_WINDOWS:
+                        self.max_log_block_range = min(self.max_log_block_range * 2, self.configured_max_log_block_range)
+                        self.full_windows_at_ceiling = 0
+                self.log_block_range = min(window + window // 4 + 1, self.max_log_block_range)
+            start = end + 1
+        return logs
+    
+    def touched_market_ids(self, from_block: int, to_block: int) -> List[int]:
+        """Ids of markets with any contract event in the block range (marketId is topic 1 of every event)"""
+        market_ids = set()
+        for log in self.get_logs(from_block, to_block):
+            if len(log['topics']) > 1:
+                market_ids.add(int(Web3.to_hex(log['topics'][1]), 16))
+        return sorted(market_ids)
+    
     def get_user_bet(self, market_id: int, user_address: str) -> Optional[Dict]:
         """Get user's bet for a market"""
         if not self.contract:
             return None
             
         try:
-            bet_data = self.contract.functions.bets(market_id, user_address).call()
+            bet_data = self.cached_call('bets', market_id, Web3.to_checksum_address(user_address))
             
             return {
                 'amount': bet_data[0],
@@ -1,16 +1,32 @@
 """
 Smart Contract Event Listener Service
 Listens to blockchain events and syncs data to database
+
+Events are pulled with eth_getLogs over block ranges (all four event topics in
+one request) instead of node-side filters, and the last processed block is
+checkpointed in the database. After a restart the listener backfills from the
+checkpoint, so no events are lost while the process was down.
 """
 import os
 import time
 import threading
+from collections import deque
 from typing import Dict, List, Optional
+from sqlalchemy import tuple_
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from app import db
-from app.models import Market, Prediction, User
+from app.models import Market, Prediction, User, SyncCheckpoint
+from app.models.market import UPSERT_CHUNK_SIZE
 from app.services.contract_service import contract_service
+from app.utils.tagged_cache import tagged_cache
+from app.utils.bulk import insert_ignore
+from app.utils.metrics import (
+    LISTENER_EVENTS, LISTENER_HEAD_BLOCK, LISTENER_LAG_BLOCKS, SYNC_PHASE_ERRORS, SYNC_PHASE_SECONDS, timed
+)
+from app.services.trending_service import trending_engine
+
+CHECKPOINT_NAME = 'event_listener'
 
 class EventListener:
     """Listens to smart contract events and syncs to database"""
@@ -18,49 +34,54 @@ class EventListener:
     def __init__(self):
         self.w3 = contract_service.w3
         self.contract = contract_service.contract
+        self.app = None
         self.is_running = False
         self.sync_thread = None
         self.last_sync_block = None
+        # Poll interval adapts: back to the minimum when a pass finds events,
+        # growing by backoff_factor per empty pass up to the maximum
+        self.min_poll_interval = float(os.getenv('EVENT_POLL_INTERVAL_MIN', 2))
+        self.max_poll_interval = float(os.getenv('EVENT_POLL_INTERVAL_MAX', 60))
+        self.backoff_factor = float(os.getenv('EVENT_POLL_BACKOFF', 1.5))
+        self.poll_interval = float(os.getenv('EVENT_POLL_INTERVAL', 10))
+        self.confirmations = int(os.getenv('EVENT_CONFIRMATIONS', 3))
+        # Blocks covered per checkpointed pass while catching up
+        self.max_blocks_per_pass = int(os.getenv('EVENT_MAX_BLOCKS_PER_PASS', 10000))
+        self.stats = {
+            'events_processed': 0,
+            'events_skipped': 0,
+            'passes': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': None,
+            'last_batch_events_per_second': None,
+            'head_block': None,
+            'lag_blocks': None
+        }
+        self.batch_latencies = deque(maxlen=200)
         
-        # Event filters
-        self.market_created_filter = None
-        self.bet_placed_filter = None
-        self.market_resolved_filter = None
-        self.payout_claimed_filter = None
+        # topic0 -> event name, and the events this listener applies
+        self.event_topics = {}
+        self.event_names = ()
         
-        self._setup_event_filters()
+        self._setup_event_decoders()
     
-    def _setup_event_filters(self):
-        """Setup event filters for listening"""
+    def _setup_event_decoders(self):
+        """Map event topics to the event names they decode as"""
         if not self.contract:
             print("Contract not available for event listening")
             return
         
-        try:
-            # Create event filters
-            self.market_created_filter = self.contract.events.MarketCreated.create_filter(
-                fromBlock='latest'
-            )
-            self.bet_placed_filter = self.contract.events.BetPlaced.create_filter(
-                fromBlock='latest'
-            )
-            self.market_resolved_filter = self.contract.events.MarketResolved.create_filter(
-                fromBlock='latest'
-            )
-            self.payout_claimed_filter = self.contract.events.PayoutClaimed.create_filter(
-                fromBlock='latest'
-            )
-            
-            print("Event filters created successfully")
-        except Exception as e:
-            print(f"Error setting up event filters: {e}")
+        self.event_topics = contract_service.event_topics()
+        self.event_names = ('MarketCreated', 'BetPlaced', 'MarketResolved', 'PayoutClaimed')
     
-    def start_listening(self):
+    def start_listening(self, app=None):
         """Start the event listener in a separate thread"""
         if self.is_running:
             print("Event listener already running")
             return
         
+        self.app = app
         self.is_running = True
         self.sync_thread = threading.Thread(target=self._listen_loop, daemon=True)
         self.sync_thread.start()
@@ -77,221 +98,319 @@ class EventListener:
         """Main listening loop"""
         while self.is_running:
             try:
-                self._process_events()
-                time.sleep(10)  # Check every 10 seconds
+                if self.app:
+                    with self.app.app_context():
+                        self.poll()
+                else:
+                    self.poll()
+                time.sleep(self.poll_interval)
             except Exception as e:
                 print(f"Error in event listener loop: {e}")
                 time.sleep(30)  # Wait longer on error
     
-    def _process_events(self):
-        """Process all pending events"""
+    def poll(self):
+        """Process block ranges until caught up with the head (the job scheduler's event_listener job)"""
+        processed = self.stats['events_processed']
+        # Keep going without sleeping while backfilling
+        while not self._process_events():
+            pass
+        
+        if self.stats['events_processed'] > processed:
+            self.poll_interval = self.min_poll_interval
+        else:
+            self.poll_interval = min(self.poll_interval * self.backoff_factor, self.max_poll_interval)
+    
+    def _process_events(self) -> bool:
+        """Process one checkpointed block range; returns True once caught up with the head"""
         if not self.contract:
-            return
+            return True
         
         try:
-            # Process MarketCreated events
-            self._process_market_created_events()
+            head = contract_service.get_block_number() - self.confirmations
+            self.stats['head_block'] = head
+            LISTENER_HEAD_BLOCK.set(head)
             
-            # Process BetPlaced events
-            self._process_bet_placed_events()
+            checkpoint = SyncCheckpoint.get(CHECKPOINT_NAME)
+            if checkpoint is None:
+                # First run: start at EVENT_START_BLOCK if given, otherwise at the head
+                start_block = os.getenv('EVENT_START_BLOCK')
+                last_block = int(start_block) - 1 if start_block else head
+                SyncCheckpoint.save(CHECKPOINT_NAME, last_block)
+                db.session.commit()
+            else:
+                last_block = checkpoint.block_number
             
-            # Process MarketResolved events
-            self._process_market_resolved_events()
+            if head <= last_block:
+                self.stats['lag_blocks'] = 0
+                LISTENER_LAG_BLOCKS.set(0)
+                return True
             
-            # Process PayoutClaimed events
-            self._process_payout_claimed_events()
+            to_block = min(head, last_block + self.max_blocks_per_pass)
+            with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='listener_get_logs'):
+                logs = contract_service.get_logs(last_block + 1, to_block)
+            logs.sort(key=lambda log: (log['blockNumber'], log['logIndex']))
+            events = [event for event in (self._decode_log(log) for log in logs) if event is not None]
+            # Warm the block timestamp cache outside the batch: an RPC failure here
+            # retries the whole range next pass instead of skipping events while bisecting
+            contract_service.get_block_timestamps({e['blockNumber'] for e in events if e['event'] == 'BetPlaced'})
+            
+            started = time.perf_counter()
+            try:
+                self.apply_events(events, checkpoint_block=to_block)
+            except Exception as e:
+                print(f"Error applying batch of {len(events)} events, bisecting: {e}")
+                db.session.rollback()
+                self._apply_bisected(events)
+                SyncCheckpoint.save(CHECKPOINT_NAME, to_block)
+                db.session.commit()
+            duration = time.perf_counter() - started
+            self._record_batch(len(events), duration)
+            SYNC_PHASE_SECONDS.labels(phase='listener_apply').observe(duration)
+            
+            self.last_sync_block = to_block
+            self.stats['passes'] += 1
+            self.stats['events_processed'] += len(events)
+            self.stats['lag_blocks'] = head - to_block
+            LISTENER_EVENTS.inc(len(events))
+            LISTENER_LAG_BLOCKS.set(head - to_block)
+            return to_block >= head
             
         except Exception as e:
             print(f"Error processing events: {e}")
+            db.session.rollback()
+            return True
     
-    def _process_market_created_events(self):
-        """Process MarketCreated events"""
-        if not self.market_created_filter:
-            return
+    def _decode_log(self, log):
+        """Decode a raw log into its ABI event, None for unknown topics"""
+        topic = Web3.to_hex(log['topics'][0]) if log['topics'] else None
+        event_name = self.event_topics.get(topic)
+        if not event_name or event_name not in self.event_names:
+            return None
         
         try:
-            events = self.market_created_filter.get_new_entries()
-            for event in events:
-                self._handle_market_created(event)
+            return getattr(self.contract.events, event_name)().process_log(log)
         except Exception as e:
-            print(f"Error processing MarketCreated events: {e}")
+            print(f"Error decoding {event_name} log: {e}")
+            return None
     
-    def _process_bet_placed_events(self):
-        """Process BetPlaced events"""
-        if not self.bet_placed_filter:
+    def _apply_bisected(self, events: List):
+        """Retry a failed batch in halves so a single bad event cannot stall ingestion"""
+        if not events:
             return
         
         try:
-            events = self.bet_placed_filter.get_new_entries()
-            for event in events:
-                self._handle_bet_placed(event)
+            self.apply_events(events)
         except Exception as e:
-            print(f"Error processing BetPlaced events: {e}")
+            db.session.rollback()
+            if len(events) == 1:
+                self.stats['events_skipped'] += 1
+                print(f"Skipping {events[0]['event']} event in tx {events[0]['transactionHash'].hex()}: {e}")
+                return
+            
+            middle = len(events) // 2
+            self._apply_bisected(events[:middle])
+            self._apply_bisected(events[middle:])
     
-    def _process_market_resolved_events(self):
-        """Process MarketResolved events"""
-        if not self.market_resolved_filter:
+    def _record_batch(self, size: int, duration: float):
+        """Per-batch throughput and latency"""
+        if not size:
             return
         
-        try:
-            events = self.market_resolved_filter.get_new_entries()
-            for event in events:
-                self._handle_market_resolved(event)
-        except Exception as e:
-            print(f"Error processing MarketResolved events: {e}")
+        duration_ms = duration * 1000
+        self.batch_latencies.append(duration_ms)
+        self.stats['batches'] += 1
+        self.stats['last_batch_size'] = size
+        self.stats['last_batch_ms'] = round(duration_ms, 3)
+        self.stats['last_batch_events_per_second'] = round(size / duration, 1) if duration > 0 else None
     
-    def _process_payout_claimed_events(self):
-        """Process PayoutClaimed events"""
-        if not self.payout_claimed_filter:
-            return
+    def get_stats(self) -> Dict:
+        """Get listener statistics"""
+        checkpoint = SyncCheckpoint.get(CHECKPOINT_NAME)
+        latencies = sorted(self.batch_latencies)
+        return {
+            'is_running': self.is_running,
+            'checkpoint_block': checkpoint.block_number if checkpoint else None,
+            'log_block_range': contract_service.log_block_range,
+            'poll_interval': round(self.poll_interval, 2),
+            'batch_latency_ms': {
+                'p50': round(latencies[len(latencies) // 2], 3) if latencies else None,
+                'p95': round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None,
+                'max': round(latencies[-1], 3) if latencies else None
+            },
+            'stats': self.stats
+        }
+    
+    def apply_events(self, events: List, checkpoint_block: Optional[int] = None):
+        """Apply a batch of decoded events in one transaction (plus the checkpoint, if given)"""
+        by_type = {name: [] for name in self.event_names}
+        for event in events:
+            by_type[event['event']].append(event)
         
-        try:
-            events = self.payout_claimed_filter.get_new_entries()
-            for event in events:
-                self._handle_payout_claimed(event)
-        except Exception as e:
-            print(f"Error processing PayoutClaimed events: {e}")
+        touched_ids = set()
+        touched_ids |= self._apply_market_created(by_type['MarketCreated'])
+        new_bets = self._apply_bets_placed(by_type['BetPlaced'])
+        touched_ids |= {market_id for market_id, _, _, _ in new_bets}
+        resolved_ids = self._apply_markets_resolved(by_type['MarketResolved'])
+        touched_ids |= set(resolved_ids)
+        self._apply_payouts_claimed(by_type['PayoutClaimed'])
+        
+        if checkpoint_block is not None:
+            SyncCheckpoint.save(CHECKPOINT_NAME, checkpoint_block)
+        db.session.commit()
+        
+        # Side effects only after the batch is durable
+        if touched_ids:
+            tagged_cache.invalidate_markets(touched_ids, Market.categories_of(touched_ids))
+        for market_id, amount, new_participant, timestamp in new_bets:
+            trending_engine.record_prediction(market_id, amount, new_participant=new_participant, ts=timestamp)
+        for market_id in resolved_ids:
+            trending_engine.record_resolved(market_id)
     
-    def _handle_market_created(self, event):
-        """Handle MarketCreated event"""
-        try:
-            market_id = event['args']['marketId']
-            question = event['args']['question']
-            end_time = event['args']['endTime']
-            creator = event['args']['creator']
-            
-            # Check if market already exists
-            existing_market = Market.query.get(str(market_id))
-            if existing_market:
-                print(f"Market {market_id} already exists, updating...")
-                existing_market.question = question
-                existing_market.end_time = end_time
-                existing_market.creator = creator
-            else:
-                # Create new market
-                market_data = contract_service.get_market(market_id)
-                if market_data:
-                    market = Market(**market_data)
-                    db.session.add(market)
-                    print(f"Created new market {market_id}: {question}")
-            
-            db.session.commit()
-            
-        except Exception as e:
-            print(f"Error handling MarketCreated event: {e}")
-            db.session.rollback()
+    def _apply_market_created(self, events) -> set:
+        """Create unseen markets from one batched contract read, refresh the known ones"""
+        if not events:
+            return set()
+        
+        created = {str(e['args']['marketId']): e['args'] for e in events}
+        ids = list(created)
+        existing = {}
+        for i in range(0, len(ids), UPSERT_CHUNK_SIZE):
+            existing.update((m.id, m) for m in Market.query.filter(Market.id.in_(ids[i:i + UPSERT_CHUNK_SIZE])))
+        
+        for market_id, args in created.items():
+            if market_id in existing:
+                market = existing[market_id]
+                market.question = args['question']
+                market.end_time = args['endTime']
+                market.creator = args['creator']
+        
+        self._create_markets([market_id for market_id in created if market_id not in existing])
+        return set(created)
     
-    def _handle_bet_placed(self, event):
-        """Handle BetPlaced event"""
-        try:
-            market_id = event['args']['marketId']
-            user_address = event['args']['user']
-            outcome = event['args']['outcome']
-            amount = event['args']['amount']
-            
-            # Check if prediction already exists
-            existing_prediction = Prediction.query.filter_by(
-                market_id=str(market_id),
-                user_address=user_address
-            ).first()
-            
-            if existing_prediction:
-                print(f"Prediction already exists for market {market_id}, user {user_address}")
-                return
-            
-            # Create new prediction
-            prediction = Prediction(
-                market_id=str(market_id),
-                user_address=user_address,
-                outcome=outcome,
-                amount=amount,
-                timestamp=int(time.time()),
-                transaction_hash=event['transactionHash'].hex()
+    def _create_markets(self, market_ids) -> set:
+        """Insert markets from one batched contract read; returns the ids created"""
+        markets_data = contract_service.get_markets([int(market_id) for market_id in market_ids])
+        created, _ = Market.upsert_from_chain(markets_data)
+        for market_id in created:
+            print(f"Created new market {market_id}")
+        return set(created)
+    
+    def _apply_bets_placed(self, events) -> List:
+        """Bulk insert predictions keyed on transaction_hash
+        
+        Rows are stamped with their block's timestamp, so backfilled bets keep the time
+        they were placed. Returns (market_id, amount, new_participant, timestamp) per new row.
+        """
+        if not events:
+            return []
+        
+        block_timestamps = contract_service.get_block_timestamps({e['blockNumber'] for e in events})
+        rows = [{
+            'market_id': str(e['args']['marketId']),
+            'user_address': e['args']['user'],
+            'outcome': e['args']['outcome'],
+            'amount': e['args']['amount'],
+            'timestamp': block_timestamps[e['blockNumber']],
+            'transaction_hash': e['transactionHash'].hex()
+        } for e in events]
+        
+        market_ids = {row['market_id'] for row in rows}
+        users = {row['user_address'] for row in rows}
+        
+        # Participants that already had a position before this batch
+        pairs = list({(row['market_id'], row['user_address']) for row in rows})
+        known_pairs = set()
+        for i in range(0, len(pairs), UPSERT_CHUNK_SIZE):
+            known_pairs.update(
+                db.session.query(Prediction.market_id, Prediction.user_address).filter(
+                    tuple_(Prediction.market_id, Prediction.user_address).in_(pairs[i:i + UPSERT_CHUNK_SIZE])
+                ).distinct()
             )
-            
-            db.session.add(prediction)
-            db.session.commit()
-            
-            print(f"Created prediction for market {market_id}, user {user_address}, amount {amount}")
-            
-        except Exception as e:
-            print(f"Error handling BetPlaced event: {e}")
-            db.session.rollback()
+        
+        # Markets must exist for the foreign key; load any created before the checkpoint
+        market_list = list(market_ids)
+        known_markets = set()
+        for i in range(0, len(market_list), UPSERT_CHUNK_SIZE):
+            known_markets.update(
+                market_id for (market_id,) in
+                db.session.query(Market.id).filter(Market.id.in_(market_list[i:i + UPSERT_CHUNK_SIZE]))
+            )
+        known_markets |= self._create_markets(market_ids - known_markets)
+        db.session.flush()
+        rows = [row for row in rows if row['market_id'] in known_markets]
+        
+        # insert_ignore splits rows to the bind parameter limit, so backfill batches of any size fit
+        insert_ignore(User, [{'address': address} for address in users], ['address'])
+        inserted = insert_ignore(
+            Prediction, rows, ['transaction_hash'],
+            returning=('market_id', 'user_address', 'amount', 'timestamp')
+        )
+        
+        counts = {}
+        new_bets = []
+        for market_id, user_address, amount, timestamp in inserted:
+            counts[market_id] = counts.get(market_id, 0) + 1
+            new_participant = (market_id, user_address) not in known_pairs
+            known_pairs.add((market_id, user_address))
+            new_bets.append((market_id, amount, new_participant, timestamp))
+        
+        for market_id, count in counts.items():
+            Market.increment_prediction_count(market_id, by=count)
+        
+        print(f"Inserted {len(inserted)} of {len(events)} BetPlaced events")
+        return new_bets
     
-    def _handle_market_resolved(self, event):
-        """Handle MarketResolved event"""
-        try:
-            market_id = event['args']['marketId']
-            winning_outcome = event['args']['winningOutcome']
-            
-            # Update market
-            market = Market.query.get(str(market_id))
-            if market:
-                market.resolved = True
-                market.winning_outcome = winning_outcome
-                db.session.commit()
-                print(f"Resolved market {market_id} with outcome {winning_outcome}")
-            else:
-                print(f"Market {market_id} not found in database")
-            
-        except Exception as e:
-            print(f"Error handling MarketResolved event: {e}")
-            db.session.rollback()
+    def _apply_markets_resolved(self, events) -> List[str]:
+        """Resolve markets with one UPDATE per winning outcome"""
+        if not events:
+            return []
+        
+        by_outcome = {}
+        for e in events:
+            by_outcome.setdefault(e['args']['winningOutcome'], []).append(str(e['args']['marketId']))
+        
+        for winning_outcome, market_ids in by_outcome.items():
+            for i in range(0, len(market_ids), UPSERT_CHUNK_SIZE):
+                Market.query.filter(Market.id.in_(market_ids[i:i + UPSERT_CHUNK_SIZE])).update(
+                    {Market.resolved: True, Market.winning_outcome: winning_outcome},
+                    synchronize_session=False
+                )
+            print(f"Resolved markets {market_ids} with outcome {winning_outcome}")
+        
+        return [market_id for market_ids in by_outcome.values() for market_id in market_ids]
     
-    def _handle_payout_claimed(self, event):
-        """Handle PayoutClaimed event"""
-        try:
-            market_id = event['args']['marketId']
-            user_address = event['args']['user']
-            payout = event['args']['payout']
-            
-            # Update prediction
-            prediction = Prediction.query.filter_by(
-                market_id=str(market_id),
-                user_address=user_address
-            ).first()
-            
-            if prediction:
-                prediction.claimed = True
-                prediction.actual_payout = payout
-                db.session.commit()
-                print(f"Updated payout claim for market {market_id}, user {user_address}, payout {payout}")
-            else:
-                print(f"Prediction not found for market {market_id}, user {user_address}")
-            
-        except Exception as e:
-            print(f"Error handling PayoutClaimed event: {e}")
-            db.session.rollback()
+    def _apply_payouts_claimed(self, events):
+        """Mark claimed positions with a single UPDATE"""
+        if not events:
+            return
+        
+        pairs = list({(str(e['args']['marketId']), e['args']['user']) for e in events})
+        for i in range(0, len(pairs), UPSERT_CHUNK_SIZE):
+            Prediction.query.filter(
+                tuple_(Prediction.market_id, Prediction.user_address).in_(pairs[i:i + UPSERT_CHUNK_SIZE])
+            ).update({Prediction.claimed: True}, synchronize_session=False)
     
     def manual_sync_all(self):
         """Manually sync all data from blockchain"""
         try:
             print("Starting manual sync of all data...")
             
-            # Sync all markets
+            # Sync all markets; only rows whose chain fingerprint changed are written
             markets_data = contract_service.fetch_all_markets()
-            synced_markets = 0
-            
-            for market_data in markets_data:
-                market = Market.query.get(market_data['id'])
-                if market:
-                    # Update existing market
-                    for key, value in market_data.items():
-                        if hasattr(market, key):
-                            setattr(market, key, value)
-                else:
-                    # Create new market
-                    market = Market(**market_data)
-                    db.session.add(market)
-                
-                synced_markets += 1
+            created, updated = Market.upsert_from_chain(markets_data)
+            synced_markets = len(markets_data)
             
             db.session.commit()
-            print(f"Synced {synced_markets} markets")
+            changed = set(created + updated)
+            if changed:
+                tagged_cache.invalidate_markets(changed, Market.categories_of(changed))
+            print(f"Synced {synced_markets} markets ({len(created)} created, {len(updated)} updated)")
             
             return {
                 'success': True,
                 'synced_markets': synced_markets,
+                'created_markets': len(created),
+                'updated_markets': len(updated),
                 'message': f'Successfully synced {synced_markets} markets'
             }
             
@@ -0,0 +1,350 @@
+"""
+Job Scheduler
+One scheduler thread per process owns every periodic background job.
+
+Each job has its own interval (a number of seconds, or a callable returning
+one so cadence can adapt), a jitter fraction so workers do not fire in
+lockstep, and overlap protection: a job still running when it comes due is
+skipped rather than started twice.
+
+Jobs that write shared state (chain sync, event ingestion) are leader-only.
+Exactly one process in the cluster holds a leader lease, either a Postgres
+advisory lock on a dedicated connection or a Redis key with a TTL, and only
+that process runs them. Jobs that maintain per-process in-memory state
+(trending index, Gamma event index) run in every process.
+"""
+import os
+import time
+import uuid
+import zlib
+import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional, Union
+from sqlalchemy import text
+from app import db
+
+class LocalLease:
+    """Single-process deployments (SQLite, no Redis): always the leader"""
+    
+    backend = 'local'
+    
+    def acquire(self) -> bool:
+        return True
+    
+    def release(self):
+        pass
+
+class PostgresLease:
+    """Session-level pg_try_advisory_lock held on a dedicated connection
+    
+    The lock dies with the connection, so a crashed leader frees it
+    immediately; every renewal pings the connection to notice that.
+    """
+    
+    backend = 'postgres'
+    
+    def __init__(self, name: str):
+        self.key = zlib.crc32(name.encode())
+        self.conn = None
+    
+    def acquire(self) -> bool:
+        try:
+            if self.conn is not None:
+                self.conn.execute(text('SELECT 1'))
+                self.conn.commit()
+                return True
+            
+            conn = db.engine.connect()
+            held = conn.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': self.key}).scalar()
+            # Do not sit idle in a transaction; the session-level lock survives the commit
+            conn.commit()
+            if held:
+                self.conn = conn
+                return True
+            conn.close()
+            return False
+        except Exception as e:
+            print(f"Leader lease lost: {e}")
+            self._close()
+            return False
+    
+    def release(self):
+        if self.conn is not None:
+            try:
+                self.conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': self.key})
+                self.conn.commit()
+            except Exception as e:
+                print(f"Error releasing leader lease: {e}")
+        self._close()
+    
+    def _close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+class RedisLease:
+    """SET NX PX lease renewed by its holder; expires if the leader stops renewing"""
+    
+    backend = 'redis'
+    
+    # Extend or delete the key only while it still holds our token
+    RENEW_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+    
+    def __init__(self, name: str, url: str, ttl: float):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key = f"lease:{name}"
+        self.ttl_ms = int(ttl * 1000)
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self.held = False
+    
+    def acquire(self) -> bool:
+        try:
+            if self.held:
+                self.held = bool(self.client.eval(self.RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms))
+            if not self.held:
+                self.held = bool(self.client.set(self.key, self.token, nx=True, px=self.ttl_ms))
+        except Exception as e:
+            print(f"Leader lease lost: {e}")
+            self.held = False
+        return self.held
+    
+    def release(self):
+        if self.held:
+            try:
+                self.client.eval(self.RELEASE_SCRIPT, 1, self.key, self.token)
+            except Exception as e:
+                print(f"Error releasing leader lease: {e}")
+        self.held = False
+
+def create_lease(name: str, ttl: float):
+    """Lease backend from JOB_LEADER_BACKEND (auto: Redis if REDIS_URL, else Postgres, else local)"""
+    backend = os.getenv('JOB_LEADER_BACKEND', 'auto')
+    redis_url = os.getenv('REDIS_URL')
+    
+    if backend == 'redis' or (backend == 'auto' and redis_url):
+        return RedisLease(name, redis_url or 'redis://localhost:6379/0', ttl)
+    if backend == 'postgres' or (backend == 'auto' and db.engine.dialect.name == 'postgresql'):
+        return PostgresLease(name)
+    return LocalLease()
+
+class Job:
+    """A periodic job and its run statistics"""
+    
+    def __init__(self, name: str, fn: Callable, interval: Union[float, Callable[[], float]],
+                 jitter: float = 0.1, leader_only: bool = True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.leader_only = leader_only
+        self.next_run = 0.0
+        self.running = threading.Lock()
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'skipped_overlap': 0,
+            'last_run': None,
+            'last_duration_ms': None,
+            'last_error': None
+        }
+    
+    def current_interval(self) -> float:
+        return float(self.interval() if callable(self.interval) else self.interval)
+    
+    def schedule_next(self, now: float):
+        interval = self.current_interval()
+        self.next_run = now + interval * (1 + random.uniform(-self.jitter, self.jitter))
+    
+    def to_dict(self) -> Dict:
+        return {
+            'interval': self.current_interval(),
+            'leader_only': self.leader_only,
+            'running': self.running.locked(),
+            'next_run_in': round(max(self.next_run - time.time(), 0), 2) if self.next_run != float('inf') else None,
+            **self.stats
+        }
+
+class JobScheduler:
+    """Runs registered jobs on their cadence; leader-only jobs only in the lease holder"""
+    
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.app = None
+        self.lease = None
+        self.is_leader = False
+        self.lease_name = os.getenv('JOB_LEADER_LOCK', 'seti-job-leader')
+        self.lease_ttl = float(os.getenv('JOB_LEADER_TTL', 30))
+        self.max_workers = int(os.getenv('JOB_WORKERS', 4))
+        self.pool = None
+        self.is_running = False
+        self.scheduler_thread = None
+        self.wakeup = threading.Event()
+        self.last_lease_check = 0.0
+        # One-off background tasks (admin operations too long for a request), by name
+        self.tasks: Dict[str, Dict] = {}
+        self.tasks_lock = threading.Lock()
+    
+    def register(self, name: str, fn: Callable, interval: Union[float, Callable[[], float]],
+                 jitter: float = 0.1, leader_only: bool = True) -> Job:
+        """Add a job; it first runs as soon as the scheduler (and, if leader_only, the lease) allows"""
+        job = Job(name, fn, interval, jitter=jitter, leader_only=leader_only)
+        self.jobs[name] = job
+        return job
+    
+    def start(self, app):
+        """Start the scheduler thread for this process"""
+        if self.is_running:
+            print("Job scheduler already running")
+            return
+        
+        self.app = app
+        with app.app_context():
+            self.lease = create_lease(self.lease_name, self.lease_ttl)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self.is_running = True
+        self.wakeup.clear()
+        self.scheduler_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
+        self.scheduler_thread.start()
+        print(f"Job scheduler started with {len(self.jobs)} jobs ({self.lease.backend} leader lease)")
+    
+    def stop(self):
+        """Stop scheduling, wait for running jobs and give up the lease"""
+        self.is_running = False
+        self.wakeup.set()
+        if self.scheduler_thread:
+            self.scheduler_thread.join(timeout=10)
+        if self.pool:
+            self.pool.shutdown(wait=True)
+        if self.lease:
+            with self.app.app_context():
+                self.lease.release()
+        self.is_leader = False
+        print("Job scheduler stopped")
+    
+    def _scheduler_loop(self):
+        while self.is_running:
+            try:
+                now = time.time()
+                if now - self.last_lease_check >= self.lease_ttl / 3:
+                    self._check_lease()
+                    self.last_lease_check = now
+                
+                for job in self.jobs.values():
+                    if job.next_run <= now and (self.is_leader or not job.leader_only):
+                        self._dispatch(job, now)
+                
+                # Sleep until the next job is due or the lease needs renewing
+                due = [job.next_run for job in self.jobs.values() if self.is_leader or not job.leader_only]
+                next_wake = min(due + [self.last_lease_check + self.lease_ttl / 3])
+                self.wakeup.wait(min(max(next_wake - time.time(), 0.05), 5))
+                self.wakeup.clear()
+            except Exception as e:
+                print(f"Error in job scheduler loop: {e}")
+                self.wakeup.wait(5)
+    
+    def _check_lease(self):
+        with self.app.app_context():
+            leader = self.lease.acquire()
+        if leader != self.is_leader:
+            print(f"{'Acquired' if leader else 'Lost'} job leader lease ({self.lease.backend}, pid {os.getpid()})")
+            if leader:
+                # A new leader runs its jobs right away instead of waiting out their intervals
+                for job in self.jobs.values():
+                    if job.leader_only:
+                        job.next_run = 0.0
+        self.is_leader = leader
+    
+    def _dispatch(self, job: Job, now: float):
+        # Overlap protection: a job still running from its last slot is skipped
+        if not job.running.acquire(blocking=False):
+            job.stats['skipped_overlap'] += 1
+            job.schedule_next(now)
+            return
+        # Not due again until _run reschedules it from the interval the run itself chose
+        job.next_run = float('inf')
+        self.pool.submit(self._run, job)
+    
+    def _run(self, job: Job):
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                job.fn()
+            job.stats['last_error'] = None
+        except Exception as e:
+            job.stats['failures'] += 1
+            job.stats['last_error'] = str(e)
+            print(f"Job {job.name} failed: {e}")
+        finally:
+            job.stats['runs'] += 1
+            job.stats['last_run'] = datetime.utcnow().isoformat()
+            job.stats['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            # Adaptive intervals (sync cadence, listener backoff) take effect from this run on
+            if job.next_run == float('inf'):
+                job.schedule_next(time.time())
+            job.running.release()
+            self.wakeup.set()
+    
+    def run_in_background(self, name: str, fn: Callable, app=None) -> Dict:
+        """Run fn once on its own thread in an app context; at most one task per name per process
+        
+        Returns the task's status dict; raises RuntimeError if it is already running.
+        """
+        app = app or self.app
+        with self.tasks_lock:
+            task = self.tasks.get(name)
+            if task and task['running']:
+                raise RuntimeError(f"Task {name} is already running")
+            task = {
+                'name': name,
+                'running': True,
+                'pid': os.getpid(),
+                'started_at': datetime.utcnow().isoformat(),
+                'finished_at': None,
+                'result': None,
+                'error': None
+            }
+            self.tasks[name] = task
+        
+        def run():
+            try:
+                with app.app_context():
+                    task['result'] = fn()
+            except Exception as e:
+                task['error'] = str(e)
+                print(f"Task {name} failed: {e}")
+            finally:
+                task['finished_at'] = datetime.utcnow().isoformat()
+                task['running'] = False
+        
+        threading.Thread(target=run, name=f'task-{name}', daemon=True).start()
+        return dict(task)
+    
+    def get_task(self, name: str) -> Optional[Dict]:
+        """Status of this process's last task with that name"""
+        task = self.tasks.get(name)
+        return dict(task) if task else None
+    
+    def run_now(self, name: str):
+        """Make a job due immediately"""
+        self.jobs[name].next_run = 0.0
+        self.wakeup.set()
+    
+    def get_stats(self) -> Dict:
+        return {
+            'is_running': self.is_running,
+            'is_leader': self.is_leader,
+            'lease_backend': self.lease.backend if self.lease else None,
+            'pid': os.getpid(),
+            'jobs': {name: job.to_dict() for name, job in self.jobs.items()}
+        }
+
+# Global instance
+job_scheduler = JobScheduler()
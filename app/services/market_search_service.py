@@ -0,0 +1,212 @@
+"""
+Market Full-Text Search Service
+Ranked, prefix-aware search over market questions and descriptions.
+Uses a tsvector column with a GIN index on Postgres and an FTS5 table on SQLite.
+
+The index is created by scripts/create_search_index.py (the Postgres generated
+column rewrites the table, so it never runs in a request). Until it exists,
+searches fall back to ILIKE matching.
+"""
+import re
+import time
+import threading
+from typing import List, Optional, Tuple
+from sqlalchemy import case, func, literal_column, select, table, column, text
+from app import db
+from app.models import Market
+
+# Question matches weigh more than description matches
+QUESTION_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+MAX_TERMS = 8
+# Seconds between checks for an index that was missing
+INDEX_RECHECK_INTERVAL = 60
+
+fts_table = table('markets_fts', column('rowid'), column('markets_fts'))
+search_vector = literal_column('markets.search_vector')
+
+class MarketSearchService:
+    """Full-text search over markets with a dialect-specific index"""
+
+    def __init__(self):
+        self.index_ready = False
+        self.index_checked_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def dialect(self) -> str:
+        return db.engine.dialect.name
+
+    def index_available(self) -> bool:
+        """Whether the search index exists; a missing index is rechecked at most every INDEX_RECHECK_INTERVAL"""
+        if self.index_ready or time.time() - self.index_checked_at < INDEX_RECHECK_INTERVAL:
+            return self.index_ready
+
+        with self.lock:
+            if self.index_ready or time.time() - self.index_checked_at < INDEX_RECHECK_INTERVAL:
+                return self.index_ready
+
+            try:
+                if self.dialect == 'postgresql':
+                    found = db.session.execute(text(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'markets' AND column_name = 'search_vector'"
+                    )).first()
+                elif self.dialect == 'sqlite':
+                    found = db.session.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'markets_fts'"
+                    )).first()
+                else:
+                    found = None
+                self.index_ready = found is not None
+            except Exception as e:
+                print(f"Error checking market search index: {e}")
+                db.session.rollback()
+            self.index_checked_at = time.time()
+            if not self.index_ready:
+                print("Market search index missing; using ILIKE search (run scripts/create_search_index.py)")
+
+        return self.index_ready
+
+    def create_index(self) -> bool:
+        """Create the search index (idempotent); run from scripts/create_search_index.py, not in requests"""
+        try:
+            if self.dialect == 'postgresql':
+                self._ensure_postgres_index()
+            elif self.dialect == 'sqlite':
+                self._ensure_sqlite_index()
+            else:
+                return False
+
+            db.session.commit()
+        except Exception as e:
+            print(f"Error creating market search index: {e}")
+            db.session.rollback()
+            return False
+
+        self.index_ready = True
+        return True
+
+    def _ensure_postgres_index(self):
+        """Weighted tsvector generated column plus GIN index"""
+        db.session.execute(text("""
+            ALTER TABLE markets ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(question, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+        """))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_markets_search_vector ON markets USING GIN (search_vector)"
+        ))
+
+    def _ensure_sqlite_index(self):
+        """External-content FTS5 table kept in step with markets by triggers"""
+        exists = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'markets_fts'"
+        )).first()
+
+        db.session.execute(text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS markets_fts USING fts5(
+                question, description,
+                content='markets', content_rowid='rowid',
+                tokenize='porter unicode61'
+            )
+        """))
+        db.session.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS markets_fts_ai AFTER INSERT ON markets BEGIN
+                INSERT INTO markets_fts(rowid, question, description)
+                VALUES (new.rowid, new.question, new.description);
+            END
+        """))
+        db.session.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS markets_fts_ad AFTER DELETE ON markets BEGIN
+                INSERT INTO markets_fts(markets_fts, rowid, question, description)
+                VALUES ('delete', old.rowid, old.question, old.description);
+            END
+        """))
+        db.session.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS markets_fts_au AFTER UPDATE OF question, description ON markets BEGIN
+                INSERT INTO markets_fts(markets_fts, rowid, question, description)
+                VALUES ('delete', old.rowid, old.question, old.description);
+                INSERT INTO markets_fts(rowid, question, description)
+                VALUES (new.rowid, new.question, new.description);
+            END
+        """))
+
+        if not exists:
+            db.session.execute(text("INSERT INTO markets_fts(markets_fts) VALUES ('rebuild')"))
+
+    def build_query(self, term: str) -> Optional[str]:
+        """Turn free text into a prefix-matching AND query for the current dialect"""
+        terms = re.findall(r'\w+', (term or '').lower())[:MAX_TERMS]
+        if not terms:
+            return None
+
+        if self.dialect == 'postgresql':
+            return ' & '.join(f'{t}:*' for t in terms)
+        return ' '.join(f'"{t}"*' for t in terms)
+
+    def _match_clause(self, fts_query: str):
+        if self.dialect == 'postgresql':
+            return search_vector.op('@@')(func.to_tsquery('english', fts_query))
+        return literal_column('markets.rowid').in_(
+            select(fts_table.c.rowid).where(fts_table.c.markets_fts.op('MATCH')(fts_query))
+        )
+
+    def filter_query(self, query, term: str):
+        """Restrict a Market query to rows matching term (ordering is left to the caller)"""
+        fts_query = self.build_query(term)
+        if not fts_query or not self.index_available():
+            return query.filter(self._ilike_clause(term))
+
+        return query.filter(self._match_clause(fts_query))
+
+    def _ilike_clause(self, term: str):
+        return db.or_(
+            Market.question.ilike(f'%{term}%'),
+            Market.description.ilike(f'%{term}%')
+        )
+
+    def search(self, term: str, limit: int = 20, offset: int = 0,
+               category: Optional[str] = None, status: Optional[str] = None,
+               now: Optional[int] = None) -> List[Tuple[Market, float]]:
+        """Return (market, score) pairs ordered by relevance, best first"""
+        fts_query = self.build_query(term)
+        if not fts_query:
+            return []
+
+        if not self.index_available():
+            # Unranked fallback: question matches before description-only matches
+            score = case((Market.question.ilike(f'%{term}%'), QUESTION_WEIGHT), else_=DESCRIPTION_WEIGHT)
+            query = db.session.query(Market, score.label('score')).filter(self._ilike_clause(term))
+        elif self.dialect == 'postgresql':
+            ts_query = func.to_tsquery('english', fts_query)
+            score = func.ts_rank_cd(search_vector, ts_query)
+            query = db.session.query(Market, score.label('score')).filter(
+                search_vector.op('@@')(ts_query)
+            )
+        else:
+            # bm25() is lower-is-better, negate it so higher scores rank first
+            score = -func.bm25(fts_table.c.markets_fts, QUESTION_WEIGHT, DESCRIPTION_WEIGHT)
+            query = db.session.query(Market, score.label('score')).join(
+                fts_table, fts_table.c.rowid == literal_column('markets.rowid')
+            ).filter(
+                fts_table.c.markets_fts.op('MATCH')(fts_query)
+            )
+
+        query = query.filter(~func.lower(Market.id).like('%polymarket%'))
+
+        if category and category != 'All':
+            query = query.filter(Market.category == category)
+
+        if status == 'active' and now is not None:
+            query = query.filter(Market.resolved == False, Market.end_time > now)
+        elif status == 'resolved':
+            query = query.filter(Market.resolved == True)
+
+        rows = query.order_by(literal_column('score').desc(), Market.id).offset(offset).limit(limit).all()
+        return [(market, float(score or 0)) for market, score in rows]
+
+# Global instance
+market_search_service = MarketSearchService()
@@ -2,6 +2,7 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from app.models import Market
 from .polymarket_gamma_service import polymarket_gamma_service
+from .polymarket_event_index import polymarket_event_index
 
 class MarketSportsService:
     """Service for integrating live sports data with prediction markets using Polymarket Gamma API"""
@@ -13,12 +14,15 @@ class MarketSportsService:
     
     
     def get_live_scores_for_markets(self, markets: List[Market]) -> Dict[str, Dict]:
-        """Get live data for a list of markets using Polymarket Gamma API"""
-        return polymarket_gamma_service.get_live_scores_for_markets(markets)
+        """Get live data for a list of markets from the background-refreshed event index"""
+        return polymarket_event_index.get_live_scores_for_markets(markets)
     
     def update_market_with_live_score(self, market_id: str) -> Optional[Dict]:
         """Update a specific market with live data from Polymarket"""
-        return polymarket_gamma_service.update_market_with_live_data(market_id)
+        market = Market.query.get(market_id)
+        if not market:
+            return None
+        return polymarket_event_index.get_live_data_for_market(market)
     
     def get_rate_limit_status(self) -> Dict:
         """Get current API rate limit status"""
@@ -26,7 +30,8 @@ class MarketSportsService:
             'api_available': self.api_available,
             'api_type': self.api_type,
             'api_base_url': 'https://gamma-api.polymarket.com',
-            'message': 'Using Polymarket Gamma API (public, no authentication required)'
+            'message': 'Using Polymarket Gamma API (public, no authentication required)',
+            'event_index': polymarket_event_index.get_stats()
         }
     
     def clear_api_cache(self) -> None:
@@ -0,0 +1,277 @@
+"""
+Polymarket Event Index
+Keeps open Gamma API events in memory behind inverted indexes (title tokens and
+normalized team names) so live sports enrichment is a local lookup instead of an
+HTTP call per request.
+
+A background loop re-pulls events every GAMMA_INDEX_REFRESH_INTERVAL seconds and
+swaps in a freshly built index; if any page fails the previous index is kept.
+Lookups never block on the upstream API; an index older than
+GAMMA_INDEX_MAX_STALENESS is treated as empty.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from app.models import Market
+from .polymarket_gamma_service import polymarket_gamma_service
+
+# Words that carry no identity for matching a market to an event
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'at', 'to', 'for', 'and', 'or', 'by',
+    'will', 'win', 'wins', 'beat', 'be', 'is', 'vs', 'v', 'versus', 'game', 'match'
+}
+
+# Binary outcomes that name no team
+NON_TEAM_OUTCOMES = {'yes', 'no', 'draw', 'tie', 'over', 'under'}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords, in order"""
+    return [t for t in re.findall(r'[a-z0-9]+', (text or '').lower()) if t not in STOPWORDS]
+
+def normalize_team(name: str) -> str:
+    """Team name as an index key: lowercased alphanumeric words, e.g. 'LA Lakers' -> 'la lakers'"""
+    return ' '.join(re.findall(r'[a-z0-9]+', (name or '').lower()))
+
+def event_teams(event: Dict) -> Set[str]:
+    """Normalized team names of an event, from its teams list and its markets' outcomes"""
+    names = []
+    for team in event.get('teams') or []:
+        names.append(team.get('name') if isinstance(team, dict) else team)
+    for market in event.get('markets') or []:
+        outcomes = market.get('outcomes') or []
+        if isinstance(outcomes, str):
+            # Gamma serializes outcomes as a JSON string
+            try:
+                outcomes = json.loads(outcomes)
+            except ValueError:
+                outcomes = []
+        names.extend(outcome for outcome in outcomes if isinstance(outcome, str))
+    
+    teams = {normalize_team(name) for name in names if isinstance(name, str)}
+    return {team for team in teams if team and team not in NON_TEAM_OUTCOMES}
+
+class PolymarketEventIndex:
+    """In-memory, periodically rebuilt index of open Gamma events"""
+    
+    def __init__(self):
+        self.refresh_interval = float(os.getenv('GAMMA_INDEX_REFRESH_INTERVAL', 60))
+        self.max_staleness = float(os.getenv('GAMMA_INDEX_MAX_STALENESS', 600))
+        self.max_events = int(os.getenv('GAMMA_INDEX_MAX_EVENTS', 1000))
+        self.page_size = 200
+        
+        # Replaced wholesale on refresh so readers never see a half-built index
+        self.events: List[Dict] = []
+        self.event_tokens: List[frozenset] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.team_postings: Dict[str, List[int]] = {}
+        self.built_at = 0.0
+        
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.is_running = False
+        self.index_thread = None
+        self.stats = {
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'last_refresh_duration_ms': 0.0,
+            'lookups': 0,
+            'matches': 0
+        }
+    
+    def start(self):
+        """Build the index once and keep it fresh in the background"""
+        if self.is_running:
+            print("Polymarket event index already running")
+            return
+        
+        self.is_running = True
+        self.index_thread = threading.Thread(target=self._index_loop, daemon=True)
+        self.index_thread.start()
+        print("Polymarket event index started")
+    
+    def stop(self):
+        """Stop the refresh loop"""
+        self.is_running = False
+        if self.index_thread:
+            self.index_thread.join(timeout=5)
+        print("Polymarket event index stopped")
+    
+    def _index_loop(self):
+        while self.is_running:
+            self.refresh()
+            time.sleep(self.refresh_interval)
+    
+    def _fetch_events(self) -> List[Dict]:
+        """Page through open events up to max_events; a failed page raises rather than truncating"""
+        events = []
+        offset = 0
+        while len(events) < self.max_events:
+            page = polymarket_gamma_service.get_events({
+                'closed': False,
+                'limit': self.page_size,
+                'offset': offset
+            }, strict=True)
+            events.extend(page)
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size
+        return events[:self.max_events]
+    
+    def refresh(self) -> bool:
+        """Pull events and swap in a rebuilt index; keeps the old index on failure"""
+        with self.lock:
+            if self.refreshing:
+                return False
+            self.refreshing = True
+        
+        started = time.perf_counter()
+        try:
+            events = self._fetch_events()
+            if not events and self.events:
+                # An empty pull is far more likely an upstream failure than zero open events
+                raise RuntimeError("Gamma API returned no events")
+            
+            event_tokens = []
+            postings = defaultdict(list)
+            team_postings = defaultdict(list)
+            for i, event in enumerate(events):
+                tokens = frozenset(tokenize(event.get('title', '')))
+                event_tokens.append(tokens)
+                for token in tokens:
+                    postings[token].append(i)
+                for team in event_teams(event):
+                    team_postings[team].append(i)
+            
+            self.events, self.event_tokens, self.postings, self.team_postings = (
+                events, event_tokens, dict(postings), dict(team_postings))
+            self.built_at = time.time()
+            self.stats['refreshes'] += 1
+            return True
+        except Exception as e:
+            print(f"Error refreshing Polymarket event index: {e}")
+            self.stats['refresh_errors'] += 1
+            return False
+        finally:
+            self.stats['last_refresh_duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            self.refreshing = False
+    
+    def _refresh_in_background(self):
+        """Kick off a one-off refresh without blocking the caller"""
+        if not self.refreshing:
+            threading.Thread(target=self.refresh, daemon=True).start()
+    
+    def age(self) -> Optional[float]:
+        """Seconds since the last successful refresh, None if never built"""
+        return time.time() - self.built_at if self.built_at else None
+    
+    def is_fresh(self) -> bool:
+        age = self.age()
+        return age is not None and age <= self.max_staleness
+    
+    def find_event(self, question: str, teams: Iterable[str] = ()) -> Optional[Dict]:
+        """Best open event for a market
+        
+        With team names, an event listing every one of them wins (the most title
+        overlap breaks ties). Otherwise, the event whose title contains the
+        question's tokens or vice versa.
+        """
+        # Snapshot the references; refresh swaps them atomically
+        events, event_tokens = self.events, self.event_tokens
+        postings, team_postings = self.postings, self.team_postings
+        
+        question_tokens = set(tokenize(question))
+        team_keys = {normalize_team(team) for team in teams if team}
+        team_keys.discard('')
+        if team_keys:
+            candidates = set.intersection(*(set(team_postings.get(team, ())) for team in team_keys))
+            if candidates:
+                best = max(sorted(candidates), key=lambda i: len(event_tokens[i] & question_tokens))
+                return events[best]
+        
+        if not question_tokens:
+            return None
+        
+        overlap = defaultdict(int)
+        for token in question_tokens:
+            for i in postings.get(token, ()):
+                overlap[i] += 1
+        
+        best, best_score = None, 0.0
+        for i, shared in overlap.items():
+            title_size = len(event_tokens[i])
+            # Containment either way, as the substring match this replaces required
+            if shared != title_size and shared != len(question_tokens):
+                continue
+            score = shared / max(title_size, len(question_tokens))
+            if score > best_score:
+                best, best_score = events[i], score
+        
+        return best
+    
+    def _live_data(self, market: Market, event: Dict) -> Optional[Dict]:
+        markets_data = event.get('markets', [])
+        if not markets_data:
+            return None
+        
+        return {
+            'market_id': market.id,
+            'market_question': market.question,
+            'event_title': event.get('title', ''),
+            'event_slug': event.get('slug', ''),
+            'is_closed': event.get('closed', False),
+            'end_date': event.get('endDate', ''),
+            'outcomes': markets_data[0].get('outcomes', []),
+            'last_updated': datetime.utcfromtimestamp(self.built_at).isoformat(),
+            'data_source': 'polymarket_gamma_api'
+        }
+    
+    def get_live_scores_for_markets(self, markets: List[Market]) -> Dict[str, Dict]:
+        """Live data for sports markets from the local index (no upstream call)"""
+        if not self.is_running and not self.is_fresh():
+            self._refresh_in_background()
+        if not self.is_fresh():
+            return {}
+        
+        live_data = {}
+        for market in markets:
+            if not market.category or 'sport' not in market.category.lower():
+                continue
+            
+            self.stats['lookups'] += 1
+            event = self.find_event(market.question, (market.home_team, market.away_team))
+            data = self._live_data(market, event) if event else None
+            if data:
+                live_data[market.id] = data
+                self.stats['matches'] += 1
+        
+        return live_data
+    
+    def get_live_data_for_market(self, market: Market) -> Optional[Dict]:
+        """Live data for a single market regardless of category"""
+        if not self.is_running and not self.is_fresh():
+            self._refresh_in_background()
+        if not self.is_fresh():
+            return None
+        
+        event = self.find_event(market.question, (market.home_team, market.away_team))
+        return self._live_data(market, event) if event else None
+    
+    def get_stats(self) -> Dict:
+        """Get index statistics"""
+        return {
+            'is_running': self.is_running,
+            'events': len(self.events),
+            'tokens': len(self.postings),
+            'teams': len(self.team_postings),
+            'age_seconds': round(self.age(), 3) if self.built_at else None,
+            'max_staleness_seconds': self.max_staleness,
+            'stats': self.stats
+        }
+
+# Global instance
+polymarket_event_index = PolymarketEventIndex()
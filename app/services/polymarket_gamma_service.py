@@ -2,11 +2,13 @@
 Service for fetching markets and events from Polymarket Gamma API
 Replaces RapidAPI integration
 """
+import time
 import requests
 from typing import List, Dict, Optional
 from datetime import datetime
 from app.models import Market
 from app import db
+from app.utils.metrics import GAMMA_ERRORS, GAMMA_REQUEST_SECONDS, upstream_error_reason
 
 
 class PolymarketGammaService:
@@ -22,6 +24,9 @@ class PolymarketGammaService:
     
     def _make_request(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
         """Make API request with error handling"""
+        # Path only, so slug lookups share the /events and /markets labels
+        label = '/' + endpoint[len(self.base_url):].strip('/').split('/')[0]
+        started = time.perf_counter()
         try:
             response = requests.get(
                 endpoint,
@@ -32,18 +37,23 @@ class PolymarketGammaService:
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
+            GAMMA_ERRORS.labels(endpoint=label, reason=upstream_error_reason(e)).inc()
             print(f"Polymarket API request failed: {e}")
             return None
         except Exception as e:
+            GAMMA_ERRORS.labels(endpoint=label, reason=upstream_error_reason(e)).inc()
             print(f"Unexpected error in Polymarket API request: {e}")
             return None
+        finally:
+            GAMMA_REQUEST_SECONDS.labels(endpoint=label).observe(time.perf_counter() - started)
     
-    def get_events(self, params: Dict = None) -> List[Dict]:
+    def get_events(self, params: Dict = None, strict: bool = False) -> List[Dict]:
         """
         Fetch events from Polymarket Gamma API
         
         Args:
             params: Query parameters (limit, offset, order, ascending, closed, tag_id, etc.)
+            strict: Raise on a failed request instead of returning an empty list
             
         Returns:
             List of event dictionaries
@@ -59,6 +69,8 @@ class PolymarketGammaService:
             default_params.update(params)
         
         data = self._make_request(self.events_endpoint, default_params)
+        if strict and not isinstance(data, list):
+            raise RuntimeError("Gamma API events request failed")
         return data if isinstance(data, list) else []
     
     def get_markets(self, params: Dict = None) -> List[Dict]:
@@ -2,6 +2,8 @@ import requests
 from typing import List, Dict, Optional
 from datetime import datetime
 import os
+import time
+from app.utils.metrics import GAMMA_ERRORS, GAMMA_REQUEST_SECONDS, upstream_error_reason
 
 class PolymarketTeamsService:
     """Service for fetching teams data from Polymarket Gamma API"""
@@ -33,8 +35,12 @@ class PolymarketTeamsService:
                 'color': str
             }
         """
+        started = time.perf_counter()
         try:
-            response = requests.get(self.teams_endpoint, timeout=10)
+            try:
+                response = requests.get(self.teams_endpoint, timeout=10)
+            finally:
+                GAMMA_REQUEST_SECONDS.labels(endpoint='/teams').observe(time.perf_counter() - started)
             response.raise_for_status()
             teams = response.json()
             
@@ -46,9 +52,11 @@ class PolymarketTeamsService:
             return teams
             
         except requests.exceptions.RequestException as e:
+            GAMMA_ERRORS.labels(endpoint='/teams', reason=upstream_error_reason(e)).inc()
             print(f"❌ Error fetching teams from Polymarket API: {e}")
             return []
         except Exception as e:
+            GAMMA_ERRORS.labels(endpoint='/teams', reason=upstream_error_reason(e)).inc()
             print(f"❌ Unexpected error: {e}")
             return []
     
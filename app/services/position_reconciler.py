@@ -0,0 +1,206 @@
+"""
+Position Reconciler
+Checks the predictions table against on-chain bets(marketId, user) state.
+
+The contract keeps one Bet per (market, user), so DB rows are grouped into
+positions (summed amount, claimed flags) and streamed in keyset pages. Each
+page is verified with batched multicall reads. Mismatches are collected into
+a drift report and, unless it is a dry run, fixed with bulk UPDATEs.
+"""
+import os
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import case, func, tuple_, update
+from web3 import Web3
+from app import db
+from app.models import Market, Prediction
+from app.services.contract_service import contract_service
+from app.utils.tagged_cache import tagged_cache
+
+UPDATE_CHUNK_SIZE = 500
+
+class PositionReconciler:
+    """Verifies DB positions against the contract in bulk"""
+    
+    def __init__(self):
+        self.page_size = int(os.getenv('RECONCILE_PAGE_SIZE', 5000))
+        self.last_report = None
+    
+    def _position_pages(self, market_id: Optional[str] = None):
+        """Yield pages of grouped positions in (market_id, user_address) order"""
+        claimed_rows = func.sum(case((Prediction.claimed.is_(True), 1), else_=0))
+        last_key = None
+        while True:
+            query = db.session.query(
+                Prediction.market_id,
+                Prediction.user_address,
+                func.sum(Prediction.amount),
+                func.count(Prediction.id),
+                claimed_rows,
+                func.max(Prediction.id)
+            )
+            if market_id is not None:
+                query = query.filter(Prediction.market_id == market_id)
+            if last_key is not None:
+                query = query.filter(tuple_(Prediction.market_id, Prediction.user_address) > last_key)
+            
+            page = query.group_by(Prediction.market_id, Prediction.user_address) \
+                .order_by(Prediction.market_id, Prediction.user_address) \
+                .limit(self.page_size).all()
+            if not page:
+                return
+            
+            yield page
+            last_key = (page[-1][0], page[-1][1])
+    
+    def _check_position(self, position, bet) -> Optional[Dict]:
+        """Drift entry for one position, or None if it matches the chain"""
+        market_id, user_address, amount, rows, claimed_rows, latest_id = position
+        amount = int(amount or 0)
+        claimed_rows = int(claimed_rows or 0)
+        
+        kinds = []
+        if bet is None:
+            kinds.append('unreadable')
+        else:
+            chain_amount, chain_outcome, chain_claimed = bet
+            if chain_amount == 0:
+                kinds.append('missing_on_chain')
+            elif chain_amount != amount:
+                kinds.append('amount')
+            if (chain_claimed and claimed_rows < rows) or (not chain_claimed and claimed_rows > 0):
+                kinds.append('claimed')
+        
+        if not kinds:
+            return None
+        
+        return {
+            'market_id': market_id,
+            'user_address': user_address,
+            'kinds': kinds,
+            'latest_prediction_id': latest_id,
+            'db': {'amount': amount, 'rows': rows, 'claimed_rows': claimed_rows},
+            'chain': None if bet is None else {
+                'amount': bet[0],
+                'outcome': bet[1],
+                'claimed': bet[2]
+            },
+            'fixed': False
+        }
+    
+    def reconcile(self, market_id: Optional[str] = None, dry_run: bool = True,
+                  report_path: Optional[str] = None) -> Dict:
+        """Verify every position (or one market's) and optionally fix amount/claimed drift"""
+        started = time.time()
+        report = {
+            'started_at': datetime.utcnow().isoformat(),
+            'dry_run': dry_run,
+            'market_id': market_id,
+            'positions_checked': 0,
+            'skipped': 0,
+            'blocks': None,
+            'by_kind': {},
+            'fixed': 0,
+            'drifts': []
+        }
+        
+        if not contract_service.contract:
+            raise RuntimeError("Contract not available")
+        
+        for page in self._position_pages(market_id):
+            # Only numeric market ids and valid addresses exist on chain
+            positions = [p for p in page if str(p[0]).isdigit() and Web3.is_address(p[1])]
+            report['skipped'] += len(page) - len(positions)
+            if not positions:
+                continue
+            
+            bets = contract_service.batch_call(
+                'bets', [(int(p[0]), Web3.to_checksum_address(p[1])) for p in positions]
+            )
+            block = contract_service.read_cache.block
+            low, high = report['blocks'] or (block, block)
+            report['blocks'] = (min(low, block), max(high, block))
+            
+            for position, bet in zip(positions, bets):
+                drift = self._check_position(position, bet)
+                if drift:
+                    report['drifts'].append(drift)
+                    for kind in drift['kinds']:
+                        report['by_kind'][kind] = report['by_kind'].get(kind, 0) + 1
+            report['positions_checked'] += len(positions)
+        
+        if not dry_run and report['drifts']:
+            report['fixed'] = self._apply_fixes(report['drifts'])
+        
+        report['duration'] = round(time.time() - started, 2)
+        report['drift_count'] = len(report['drifts'])
+        print(f"Reconciled {report['positions_checked']} positions: {report['drift_count']} drifted, "
+              f"{report['fixed']} fixed in {report['duration']}s")
+        
+        if report_path:
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+        
+        self.last_report = {k: v for k, v in report.items() if k != 'drifts'}
+        return report
+    
+    def _apply_fixes(self, drifts: List[Dict]) -> int:
+        """Bulk-correct claimed flags and amounts; unreadable and missing positions are report-only"""
+        claimed_pairs = {True: [], False: []}
+        amount_updates = []
+        fixed = []
+        
+        for drift in drifts:
+            chain = drift['chain']
+            if chain is None or 'missing_on_chain' in drift['kinds']:
+                continue
+            
+            if 'claimed' in drift['kinds']:
+                claimed_pairs[chain['claimed']].append((drift['market_id'], drift['user_address']))
+            if 'amount' in drift['kinds']:
+                # The contract only stores the total, so the difference goes on the latest bet
+                delta = chain['amount'] - drift['db']['amount']
+                amount_updates.append({'id': drift['latest_prediction_id'], 'delta': delta})
+            fixed.append(drift)
+        
+        try:
+            for claimed, pairs in claimed_pairs.items():
+                for i in range(0, len(pairs), UPDATE_CHUNK_SIZE):
+                    Prediction.query.filter(
+                        tuple_(Prediction.market_id, Prediction.user_address).in_(pairs[i:i + UPDATE_CHUNK_SIZE])
+                    ).update({Prediction.claimed: claimed}, synchronize_session=False)
+            
+            if amount_updates:
+                current = dict(
+                    db.session.query(Prediction.id, Prediction.amount)
+                    .filter(Prediction.id.in_([u['id'] for u in amount_updates]))
+                )
+                rows = [
+                    {'id': u['id'], 'amount': current[u['id']] + u['delta']}
+                    for u in amount_updates
+                    if current.get(u['id'], 0) + u['delta'] > 0
+                ]
+                if rows:
+                    db.session.execute(update(Prediction), rows)
+                skipped_ids = {u['id'] for u in amount_updates} - {row['id'] for row in rows}
+                fixed = [d for d in fixed if d['latest_prediction_id'] not in skipped_ids
+                         or 'amount' not in d['kinds']]
+            
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        for drift in fixed:
+            drift['fixed'] = True
+        market_ids = {drift['market_id'] for drift in fixed}
+        tagged_cache.invalidate_markets(market_ids, Market.categories_of(market_ids))
+        return len(fixed)
+    
+    def get_stats(self) -> Dict:
+        return {'page_size': self.page_size, 'last_report': self.last_report}
+
+# Global instance
+position_reconciler = PositionReconciler()
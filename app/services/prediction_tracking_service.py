@@ -25,6 +25,12 @@ class PredictionTrackingService:
         
         market = prediction.market
         
+        # Pools are parimutuel: winners split the whole pot pro rata (outcome 1 = YES)
+        amount = prediction.amount / 1_000_000_000
+        yes_pool, no_pool = market.yes_pool or 0, market.no_pool or 0
+        side_pool = yes_pool if prediction.outcome == 1 else no_pool
+        payout = amount * (yes_pool + no_pool) / side_pool if side_pool else amount
+        
         # Check if market is resolved
         if market.resolved:
             is_winner = market.winning_outcome == prediction.outcome
@@ -33,26 +39,25 @@ class PredictionTrackingService:
                 'message': 'Market resolved',
                 'progress': 100,
                 'current_price': 100 if is_winner else 0,
-                'potential_payout': prediction.shares / 1_000_000_000 if is_winner else 0,
+                'potential_payout': payout if is_winner else 0,
                 'is_resolved': True,
                 'winning_outcome': market.winning_outcome,
                 'is_winner': is_winner,
-                'profit_loss': (prediction.shares / 1_000_000_000) - (prediction.amount / 1_000_000_000) if is_winner else -(prediction.amount / 1_000_000_000)
+                'profit_loss': payout - amount if is_winner else -amount
             }
         
         # For active markets, calculate current status
-        from app.models import calculate_prices
-        yes_price, no_price = calculate_prices(market.outcome_a_shares, market.outcome_b_shares)
-        current_price = yes_price if prediction.outcome == 'YES' else no_price
+        prices = market.calculate_prices()
+        current_price = prices['yes_price'] if prediction.outcome == 1 else prices['no_price']
         
         # Calculate time progress
         now = datetime.utcnow()
-        start_time = datetime.fromtimestamp(market.created_timestamp)
+        start_time = datetime.fromtimestamp(market.created_timestamp or prediction.timestamp)
         end_time = datetime.fromtimestamp(market.end_time)
         
         total_duration = (end_time - start_time).total_seconds()
         elapsed_time = (now - start_time).total_seconds()
-        progress = min(max((elapsed_time / total_duration) * 100, 0), 100)
+        progress = min(max((elapsed_time / total_duration) * 100, 0), 100) if total_duration > 0 else 100
         
         # Determine status based on time and market activity
         if progress >= 100:
@@ -68,8 +73,7 @@ class PredictionTrackingService:
             status = 'early'
             message = 'Early stage'
         
-        # Calculate potential payout
-        potential_payout = (prediction.amount / 1_000_000_000) * (100 / current_price) if current_price > 0 else 0
+        potential_payout = payout
         
         return {
             'status': status,
@@ -82,8 +86,8 @@ class PredictionTrackingService:
             'is_winner': None,
             'profit_loss': None,
             'time_remaining': max(0, (end_time - now).total_seconds()),
-            'volume_24h': market.volume_24h / 1_000_000_000,
-            'total_liquidity': market.total_liquidity / 1_000_000_000
+            'volume_24h': (market.volume_24h or 0) / 1_000_000_000,
+            'total_liquidity': (market.total_liquidity or 0) / 1_000_000_000
         }
     
     def get_user_predictions_status(self, user_address: str) -> List[Dict]:
@@ -132,8 +136,8 @@ class PredictionTrackingService:
         
         predictions = Prediction.query.filter_by(market_id=market_id).all()
         
-        yes_predictions = [p for p in predictions if p.outcome == 'YES']
-        no_predictions = [p for p in predictions if p.outcome == 'NO']
+        yes_predictions = [p for p in predictions if p.outcome == 1]
+        no_predictions = [p for p in predictions if p.outcome == 0]
         
         total_volume = sum(p.amount for p in predictions) / 1_000_000_000
         yes_volume = sum(p.amount for p in yes_predictions) / 1_000_000_000
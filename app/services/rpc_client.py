@@ -0,0 +1,370 @@
+"""
+Shared JSON-RPC Client
+Pooled keep-alive HTTP connections to a list of RPC endpoints, with
+latency-based endpoint selection, failover and hedged requests.
+
+Endpoints are ranked by an EWMA of observed latency. A failing endpoint is put
+on an exponential cooldown and the request fails over to the next one. When
+hedging is enabled and a request has not answered within the hedge delay, a
+duplicate goes to the next-best endpoint and the first answer wins.
+
+Blocking callers use call()/batch(); call_many() runs many calls concurrently
+on asyncio (aiohttp) from synchronous code, and acall() is the coroutine form.
+call_many() submits to one event loop thread per process that keeps a single
+aiohttp session, so its keep-alive connections are reused across calls.
+"""
+import os
+import time
+import json
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers import JSONBaseProvider
+from app.utils.metrics import RPC_ERRORS, RPC_REQUEST_SECONDS, timed
+
+EWMA_ALPHA = 0.2
+MAX_COOLDOWN = 60
+
+class RpcError(Exception):
+    """JSON-RPC error returned by a node (not retried on another endpoint)"""
+    
+    def __init__(self, error):
+        self.error = error
+        super().__init__(f"RPC Error: {error}")
+
+class RpcEndpoint:
+    """One RPC URL and its health"""
+    
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None  # EWMA seconds
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def available(self) -> bool:
+        return time.time() >= self.cooldown_until
+    
+    def record_success(self, latency: float):
+        with self.lock:
+            self.requests += 1
+            self.failures = 0
+            self.latency = latency if self.latency is None else \
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+    
+    def record_failure(self):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+            self.failures += 1
+            self.cooldown_until = time.time() + min(2 ** self.failures, MAX_COOLDOWN)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'url': self.url,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'available': self.available,
+            'requests': self.requests,
+            'errors': self.errors
+        }
+
+class RpcClient:
+    """Multi-endpoint JSON-RPC client shared by the chain services"""
+    
+    def __init__(self, urls: Sequence[str], timeout: float = 10, hedge_delay: float = 0.0,
+                 pool_size: int = 20):
+        self.endpoints = [RpcEndpoint(url) for url in dict.fromkeys(u.strip() for u in urls if u.strip())]
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.pool_size = pool_size
+        self.ids = itertools.count(1)
+        # Updated from request threads, the hedge pool and the event loop thread
+        self.stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'failovers': 0}
+        self.stats_lock = threading.Lock()
+        
+        # One keep-alive pool per endpoint host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.endpoints) or 1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.hedge_pool = ThreadPoolExecutor(max_workers=pool_size) if hedge_delay > 0 else None
+        
+        # call_many() event loop and its session, started on first use in each process
+        self.loop = None
+        self.loop_pid = None
+        self.loop_lock = threading.Lock()
+        self.loop_session = None
+    
+    @classmethod
+    def from_env(cls, urls_var: str, default_url: str) -> 'RpcClient':
+        """Endpoints from a comma-separated env var, tuning from RPC_* vars"""
+        urls = (os.getenv(urls_var) or default_url).split(',')
+        return cls(
+            urls,
+            timeout=float(os.getenv('RPC_TIMEOUT', 10)),
+            hedge_delay=float(os.getenv('RPC_HEDGE_DELAY_MS', 0)) / 1000,
+            pool_size=int(os.getenv('RPC_POOL_SIZE', 20))
+        )
+    
+    @property
+    def primary_url(self) -> Optional[str]:
+        ranked = self.ranked_endpoints()
+        return ranked[0].url if ranked else None
+    
+    def ranked_endpoints(self) -> List[RpcEndpoint]:
+        """Available endpoints by latency (unmeasured first), then cooled-down ones"""
+        def key(endpoint):
+            return (not endpoint.available, endpoint.latency if endpoint.latency is not None else -1)
+        return sorted(self.endpoints, key=key)
+    
+    def _count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+    
+    def _payload(self, method: str, params: Any) -> Dict:
+        return {'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': params}
+    
+    # Blocking interface
+    
+    def _post(self, endpoint: RpcEndpoint, payload) -> Any:
+        started = time.perf_counter()
+        try:
+            response = self.session.post(endpoint.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - started)
+        return body
+    
+    def _send(self, payload) -> Any:
+        """POST to the best endpoint, hedging and failing over as configured"""
+        self._count('calls')
+        ranked = self.ranked_endpoints()
+        if not ranked:
+            raise ConnectionError("No RPC endpoints configured")
+        
+        last_error = None
+        if self.hedge_pool is not None and len(ranked) > 1:
+            try:
+                return self._send_hedged(ranked[0], ranked[1], payload)
+            except Exception as e:
+                last_error = e
+                ranked = ranked[2:]
+        
+        for i, endpoint in enumerate(ranked):
+            if i:
+                self._count('failovers')
+            try:
+                return self._post(endpoint, payload)
+            except Exception as e:
+                last_error = e
+        raise ConnectionError(f"All RPC endpoints failed: {last_error}")
+    
+    def _send_hedged(self, primary: RpcEndpoint, backup: RpcEndpoint, payload) -> Any:
+        first = self.hedge_pool.submit(self._post, primary, payload)
+        done, _ = wait([first], timeout=self.hedge_delay)
+        if done and first.exception() is None:
+            return first.result()
+        
+        self._count('hedged')
+        second = self.hedge_pool.submit(self._post, backup, payload)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def call_raw(self, method: str, params: Any) -> Dict:
+        """Full JSON-RPC response object (result or error)"""
+        with timed(RPC_REQUEST_SECONDS, RPC_ERRORS, method=method, kind='call'):
+            body = self._send(self._payload(method, params))
+        if 'error' in body:
+            RPC_ERRORS.labels(method=method, kind='call').inc()
+        return body
+    
+    def call(self, method: str, params: Any = None) -> Any:
+        """Result of one call, raising RpcError for node-side errors"""
+        body = self.call_raw(method, params if params is not None else [])
+        if 'error' in body:
+            raise RpcError(body['error'])
+        return body.get('result')
+    
+    def batch(self, calls: Sequence[Tuple[str, Any]]) -> List[Any]:
+        """One JSON-RPC batch request; results in call order, RpcError instances for failed entries"""
+        if not calls:
+            return []
+        
+        payloads = [self._payload(method, params) for method, params in calls]
+        methods = {method for method, _ in calls}
+        method = methods.pop() if len(methods) == 1 else 'mixed'
+        with timed(RPC_REQUEST_SECONDS, RPC_ERRORS, method=method, kind='batch'):
+            body = self._send(payloads)
+        by_id = {item.get('id'): item for item in body} if isinstance(body, list) else {}
+        
+        results = []
+        for payload in payloads:
+            item = by_id.get(payload['id'], {'error': 'missing from batch response'})
+            results.append(RpcError(item['error']) if 'error' in item else item.get('result'))
+        return results
+    
+    # Asyncio interface
+    
+    async def _apost(self, session: aiohttp.ClientSession, endpoint: RpcEndpoint, payload) -> Any:
+        started = time.perf_counter()
+        try:
+            async with session.post(endpoint.url, data=json.dumps(payload),
+                                    headers={'Content-Type': 'application/json'}) as response:
+                response.raise_for_status()
+                body = await response.json(content_type=None)
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - started)
+        return body
+    
+    async def _asend(self, session: aiohttp.ClientSession, payload) -> Any:
+        self._count('calls')
+        ranked = self.ranked_endpoints()
+        if not ranked:
+            raise ConnectionError("No RPC endpoints configured")
+        
+        if self.hedge_delay > 0 and len(ranked) > 1:
+            first = asyncio.ensure_future(self._apost(session, ranked[0], payload))
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+            if done and first.exception() is None:
+                return first.result()
+            
+            self._count('hedged')
+            second = asyncio.ensure_future(self._apost(session, ranked[1], payload))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        for other in pending:
+                            other.cancel()
+                        if task is second:
+                            self._count('hedge_wins')
+                        return task.result()
+            ranked = ranked[2:]
+        
+        last_error = None
+        for i, endpoint in enumerate(ranked):
+            if i:
+                self._count('failovers')
+            try:
+                return await self._apost(session, endpoint, payload)
+            except Exception as e:
+                last_error = e
+        raise ConnectionError(f"All RPC endpoints failed: {last_error}")
+    
+    def async_session(self) -> aiohttp.ClientSession:
+        """aiohttp session with a keep-alive pool; use as an async context manager"""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+    
+    async def acall(self, method: str, params: Any = None, session: Optional[aiohttp.ClientSession] = None) -> Any:
+        """Coroutine form of call(); pass a session to reuse its connection pool"""
+        if session is None:
+            async with self.async_session() as own_session:
+                return await self.acall(method, params, own_session)
+        
+        with timed(RPC_REQUEST_SECONDS, RPC_ERRORS, method=method, kind='call'):
+            body = await self._asend(session, self._payload(method, params if params is not None else []))
+        if 'error' in body:
+            RPC_ERRORS.labels(method=method, kind='call').inc()
+            raise RpcError(body['error'])
+        return body.get('result')
+    
+    async def agather(self, calls: Sequence[Tuple[str, Any]], concurrency: int = 50,
+                      session: Optional[aiohttp.ClientSession] = None) -> List[Any]:
+        """Run many calls concurrently (at most `concurrency` in flight); exceptions are returned in place"""
+        if session is None:
+            async with self.async_session() as own_session:
+                return await self.agather(calls, concurrency, own_session)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        async def run(method, params):
+            async with semaphore:
+                return await self.acall(method, params, session)
+        return await asyncio.gather(*(run(m, p) for m, p in calls), return_exceptions=True)
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """This process's call_many() event loop, running on a daemon thread"""
+        with self.loop_lock:
+            # A loop inherited through fork has no thread running it
+            if self.loop is None or self.loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='rpc-client-loop', daemon=True).start()
+                self.loop, self.loop_pid, self.loop_session = loop, os.getpid(), None
+            return self.loop
+    
+    async def _shared_session(self) -> aiohttp.ClientSession:
+        # Only touched by coroutines on the background loop, so no lock is needed
+        if self.loop_session is None or self.loop_session.closed:
+            self.loop_session = self.async_session()
+        return self.loop_session
+    
+    async def _gather_shared(self, calls: Sequence[Tuple[str, Any]], concurrency: int) -> List[Any]:
+        return await self.agather(calls, concurrency, await self._shared_session())
+    
+    def call_many(self, calls: Sequence[Tuple[str, Any]], concurrency: int = 50) -> List[Any]:
+        """Blocking wrapper around agather() for thread-based callers"""
+        if not calls:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self._gather_shared(calls, concurrency), self._background_loop())
+        return future.result()
+    
+    def get_stats(self) -> Dict:
+        with self.stats_lock:
+            stats = dict(self.stats)
+        return {
+            'endpoints': [endpoint.to_dict() for endpoint in self.ranked_endpoints()],
+            'hedge_delay_ms': self.hedge_delay * 1000,
+            'stats': stats
+        }
+
+class RpcClientProvider(JSONBaseProvider):
+    """web3 provider that sends every request through an RpcClient"""
+    
+    def __init__(self, client: RpcClient):
+        super().__init__()
+        self.client = client
+    
+    def make_request(self, method, params):
+        # Round-trip through web3's encoder so HexBytes and friends serialize like HTTPProvider
+        params = json.loads(self.encode_rpc_request(method, params))['params']
+        return self.client.call_raw(method, params)
+    
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            return 'result' in self.client.call_raw('web3_clientVersion', [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+
+# Shared clients
+evm_rpc_client = RpcClient.from_env(
+    'BASE_RPC_URLS',
+    os.getenv('BASE_RPC_URL') or os.getenv('ETH_RPC_URL', 'https://base-sepolia.api.onfinality.io/public')
+)
+sui_rpc_client = RpcClient.from_env('SUI_RPC_URLS', os.getenv('SUI_RPC_URL', 'https://fullnode.devnet.sui.io:443'))
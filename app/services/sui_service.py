@@ -1,97 +1,123 @@
 import os
-import requests
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Sequence
+from app.services.rpc_client import sui_rpc_client
+
+OBJECT_OPTIONS = {
+    "showType": True,
+    "showOwner": True,
+    "showPreviousTransaction": True,
+    "showDisplay": False,
+    "showContent": True,
+    "showBcs": False,
+    "showStorageRebate": False
+}
 
 class SuiService:
     """Service for interacting with Sui blockchain"""
     
     def __init__(self):
-        self.rpc_url = os.getenv('SUI_RPC_URL', 'https://fullnode.devnet.sui.io:443')
+        # SUI_RPC_URLS (comma-separated) or SUI_RPC_URL, through the shared pooled client
+        self.rpc = sui_rpc_client
+        self.rpc_url = self.rpc.primary_url
         self.package_id = os.getenv('SUI_PACKAGE_ID')
         self.module = 'polymarket'
+        # Sui caps query pages and multiGet requests at 50 objects
+        self.page_size = int(os.getenv('SUI_PAGE_SIZE', 50))
+        self.multi_get_batch_size = int(os.getenv('SUI_MULTI_GET_BATCH_SIZE', 50))
+        self.concurrency = int(os.getenv('SUI_RPC_CONCURRENCY', 4))
     
     def _rpc_call(self, method: str, params: List) -> Dict:
         """Make a JSON-RPC call to Sui node"""
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": method,
-            "params": params
-        }
-        
         try:
-            response = requests.post(self.rpc_url, json=payload, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            
-            if 'error' in result:
-                raise Exception(f"RPC Error: {result['error']}")
-            
-            return result.get('result', {})
+            result = self.rpc.call(method, params)
+            return result if result is not None else {}
         except Exception as e:
             print(f"RPC call failed: {e}")
             return {}
     
     def get_market(self, market_id: str) -> Optional[Dict]:
         """Fetch a single market from blockchain"""
-        try:
-            result = self._rpc_call('sui_getObject', [
-                market_id,
-                {
-                    "showType": True,
-                    "showOwner": True,
-                    "showPreviousTransaction": True,
-                    "showDisplay": False,
-                    "showContent": True,
-                    "showBcs": False,
-                    "showStorageRebate": False
-                }
-            ])
-            
-            if not result or 'data' not in result:
-                return None
-            
-            content = result['data'].get('content', {})
-            fields = content.get('fields', {})
-            
-            return self._parse_market_data(fields, market_id)
-        except Exception as e:
-            print(f"Error fetching market {market_id}: {e}")
-            return None
+        markets = self.get_markets([market_id])
+        return markets[0] if markets else None
     
-    def fetch_all_markets(self) -> List[Dict]:
-        """Fetch all markets from blockchain"""
-        try:
-            # Query for all objects of type Market
-            result = self._rpc_call('suix_queryObjects', [{
+    def get_markets(self, market_ids: Sequence[str]) -> List[Dict]:
+        """Fetch many markets with batched sui_multiGetObjects calls
+        
+        Missing or deleted objects are skipped. A failed request raises, since
+        dropping its chunk would silently truncate the result.
+        """
+        market_ids = list(market_ids)
+        if not market_ids:
+            return []
+        
+        chunks = [
+            market_ids[i:i + self.multi_get_batch_size]
+            for i in range(0, len(market_ids), self.multi_get_batch_size)
+        ]
+        # Up to `concurrency` multiGet requests are in flight at once
+        responses = self.rpc.call_many(
+            [('sui_multiGetObjects', [chunk, OBJECT_OPTIONS]) for chunk in chunks],
+            concurrency=self.concurrency
+        )
+        
+        markets = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                raise ConnectionError(f"sui_multiGetObjects failed for {len(chunk)} objects: {response}") from response
+            for obj in response or []:
+                market_data = self._parse_object(obj)
+                if market_data:
+                    markets.append(market_data)
+        return markets
+    
+    def iter_market_ids(self) -> Iterator[List[str]]:
+        """Yield pages of Market object ids, following nextCursor until the last page
+        
+        A failed page raises instead of ending the listing early, so callers
+        never mistake a truncated listing for the full set of markets.
+        """
+        cursor = None
+        while True:
+            result = self.rpc.call('suix_queryObjects', [{
                 "filter": {
                     "StructType": f"{self.package_id}::{self.module}::Market"
                 },
-                "options": {
-                    "showType": True,
-                    "showOwner": True,
-                    "showPreviousTransaction": True,
-                    "showDisplay": False,
-                    "showContent": True,
-                    "showBcs": False,
-                    "showStorageRebate": False
-                }
-            }])
+                # Ids only; content is hydrated in batches
+                "options": {"showType": True}
+            }, cursor, self.page_size]) or {}
             
-            markets = []
-            if result and 'data' in result:
-                for obj in result['data']:
-                    if 'data' in obj and 'content' in obj['data']:
-                        fields = obj['data']['content'].get('fields', {})
-                        market_id = obj['data']['objectId']
-                        market_data = self._parse_market_data(fields, market_id)
-                        if market_data:
-                            markets.append(market_data)
+            ids = [obj['data']['objectId'] for obj in result.get('data', []) if 'data' in obj]
+            if ids:
+                yield ids
             
-            return markets
-        except Exception as e:
-            print(f"Error fetching all markets: {e}")
-            return []
+            cursor = result.get('nextCursor')
+            if not result.get('hasNextPage') or cursor is None:
+                return
+    
+    def iter_markets(self) -> Iterator[Dict]:
+        """Stream every market, holding at most one round of concurrent multiGet batches in memory
+        
+        This is the way to read all markets: consume it incrementally (e.g. upsert
+        per window) rather than collecting it into a list. Listing or hydration
+        failures raise mid-stream instead of ending it early.
+        """
+        window = self.multi_get_batch_size * self.concurrency
+        pending = []
+        for ids in self.iter_market_ids():
+            pending.extend(ids)
+            if len(pending) >= window:
+                yield from self.get_markets(pending[:window])
+                pending = pending[window:]
+        if pending:
+            yield from self.get_markets(pending)
+    
+    def _parse_object(self, obj: Dict) -> Optional[Dict]:
+        """Market fields of a sui object response, None for missing or deleted objects"""
+        data = obj.get('data') if obj else None
+        if not data or 'content' not in data:
+            return None
+        fields = data['content'].get('fields', {})
+        return self._parse_market_data(fields, data['objectId']) or None
     
     def _parse_market_data(self, fields: Dict, market_id: str) -> Dict:
         """Parse market data from blockchain response matching smart contract"""
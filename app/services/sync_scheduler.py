@@ -1,14 +1,29 @@
 """
 Background Sync Scheduler
 Periodically syncs data between smart contract and database
+
+Each cycle is incremental: contract logs since the last synced block name the
+markets that changed, and only those are refetched. A full reconciliation
+(every market, plus orphan cleanup) runs every SYNC_FULL_INTERVAL seconds.
+
+Between full passes every open market is also refetched on a cadence set by
+its lifecycle: hot while bets are flowing, closing near end_time (and for a
+grace period after it, while a resolution is expected), cold otherwise, and
+never once resolved. The next cycle runs when the
+earliest market is due, so busy periods sync often and quiet ones rarely.
 """
+import os
 import time
 import threading
 from datetime import datetime, timedelta
-from app import db, cache
-from app.models import Market, Prediction
+from sqlalchemy import delete, exists, func, select, update
+from app import db
+from app.models import Market, Prediction, SyncCheckpoint
 from app.services.contract_service import contract_service
 from app.services.event_listener import event_listener
+from app.utils.bulk import staged_ids
+from app.utils.metrics import SYNC_MARKETS, SYNC_PHASE_ERRORS, SYNC_PHASE_SECONDS, timed
+from app.utils.tagged_cache import tagged_cache
 
 class SyncScheduler:
     """Schedules periodic sync operations"""
@@ -17,12 +32,43 @@ class SyncScheduler:
         self.is_running = False
         self.sync_thread = None
         self.sync_interval = 300  # 5 minutes
+        self.full_sync_interval = int(os.getenv('SYNC_FULL_INTERVAL', 6 * 3600))
+        # Stay this many blocks behind the head so shallow reorgs are not checkpointed
+        self.confirmations = int(os.getenv('SYNC_CONFIRMATIONS', 3))
+        # Seconds between refetches of one market, by lifecycle state
+        self.cadence = {
+            'hot': int(os.getenv('SYNC_HOT_INTERVAL', 15)),
+            'closing': int(os.getenv('SYNC_CLOSING_INTERVAL', 30)),
+            'cold': int(os.getenv('SYNC_COLD_INTERVAL', 900))
+        }
+        # A contract event within hot_window makes a market hot; closing starts closing_window before end_time
+        self.hot_window = int(os.getenv('SYNC_HOT_WINDOW', 900))
+        self.closing_window = int(os.getenv('SYNC_CLOSING_WINDOW', 3600))
+        # Ended markets still unresolved this long after end_time drop back to cold
+        self.closing_grace = int(os.getenv('SYNC_CLOSING_GRACE', 6 * 3600))
+        self.min_interval = int(os.getenv('SYNC_MIN_INTERVAL', 10))
+        # Report orphaned markets from full syncs without deleting them
+        self.cleanup_dry_run = os.getenv('SYNC_CLEANUP_DRY_RUN', 'false').lower() == 'true'
+        self.last_cleanup = None
+        self.next_cycle_in = self.min_interval
+        self.last_activity = None  # market_id -> time of its last contract event
+        self.last_refreshed = {}   # market_id -> time it was last refetched
+        self.market_states = {}
         self.last_sync_time = None
         self.sync_stats = {
             'total_syncs': 0,
             'successful_syncs': 0,
             'failed_syncs': 0,
-            'last_sync_duration': 0
+            'consecutive_failures': 0,
+            'last_sync_duration': 0,
+            'full_syncs': 0,
+            'incremental_syncs': 0,
+            'last_sync_mode': None,
+            'last_markets_fetched': 0,
+            'cadence_refreshes': 0,
+            'markets_created': 0,
+            'markets_updated': 0,
+            'markets_unchanged': 0
         }
     
     def start(self):
@@ -47,103 +93,308 @@ class SyncScheduler:
         """Main sync loop"""
         while self.is_running:
             try:
-                start_time = time.time()
-                
-                # Perform sync operations
-                self._sync_markets()
-                self._sync_predictions()
-                self._cleanup_old_data()
-                
-                # Update stats
-                duration = time.time() - start_time
-                self.sync_stats['total_syncs'] += 1
-                self.sync_stats['successful_syncs'] += 1
-                self.sync_stats['last_sync_duration'] = duration
-                self.last_sync_time = datetime.utcnow()
-                
-                print(f"Sync completed in {duration:.2f} seconds")
+                self.run_cycle()
                 
-                # Wait for next sync
-                time.sleep(self.sync_interval)
+                # Wait until the next market is due
+                time.sleep(self.next_cycle_in)
                 
             except Exception as e:
                 print(f"Error in sync loop: {e}")
-                self.sync_stats['failed_syncs'] += 1
                 time.sleep(60)  # Wait 1 minute on error
     
+    def run_cycle(self):
+        """One sync pass (the job scheduler's market_sync job)"""
+        try:
+            start_time = time.time()
+            
+            # Perform sync operations (orphan cleanup is part of the full pass)
+            with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='cycle'):
+                self._sync_markets()
+            
+            # Update stats
+            duration = time.time() - start_time
+            self.sync_stats['total_syncs'] += 1
+            self.sync_stats['successful_syncs'] += 1
+            self.sync_stats['consecutive_failures'] = 0
+            self.sync_stats['last_sync_duration'] = duration
+            self.last_sync_time = datetime.utcnow()
+            
+            print(f"Sync completed in {duration:.2f} seconds")
+        except Exception:
+            self.sync_stats['total_syncs'] += 1
+            self.sync_stats['failed_syncs'] += 1
+            self.sync_stats['consecutive_failures'] += 1
+            # Back off exponentially from the minimum interval while the chain or DB is failing
+            self.next_cycle_in = min(
+                self.min_interval * 2 ** self.sync_stats['consecutive_failures'], self.sync_interval
+            )
+            raise
+    
     def _sync_markets(self):
-        """Sync markets from blockchain to database"""
+        """Sync markets from blockchain to database, incrementally when possible"""
         try:
-            # Get all markets from blockchain
-            blockchain_markets = contract_service.fetch_all_markets()
+            checkpoint = SyncCheckpoint.get('market_sync')
+            last_full = SyncCheckpoint.get('market_full_sync')
             
-            for market_data in blockchain_markets:
-                market_id = market_data['id']
-                
-                # Check if market exists in database
-                db_market = Market.query.get(market_id)
-                
-                if db_market:
-                    # Update existing market
-                    updated = False
-                    for key, value in market_data.items():
-                        if hasattr(db_market, key) and getattr(db_market, key) != value:
-                            setattr(db_market, key, value)
-                            updated = True
-                    
-                    if updated:
-                        print(f"Updated market {market_id}")
-                else:
-                    # Create new market
-                    new_market = Market(**market_data)
-                    db.session.add(new_market)
-                    print(f"Created new market {market_id}: {market_data.get('question', 'Unknown')}")
+            full_due = (
+                checkpoint is None or last_full is None or
+                datetime.utcnow() - last_full.updated_at >= timedelta(seconds=self.full_sync_interval)
+            )
             
-            db.session.commit()
+            if full_due:
+                with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='full_sync'):
+                    self._full_sync()
+            else:
+                with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='incremental_sync'):
+                    self._incremental_sync(checkpoint.block_number)
+                with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='cadence_refresh'):
+                    self._refresh_due_markets()
             
         except Exception as e:
             print(f"Error syncing markets: {e}")
             db.session.rollback()
+            raise
     
-    def _sync_predictions(self):
-        """Sync predictions from blockchain to database"""
-        try:
-            # Get all markets to check for predictions
-            markets = Market.query.all()
-            
-            for market in markets:
-                market_id = int(market.id)
-                
-                # Get all predictions for this market from blockchain
-                # Note: This is a simplified approach - in production you'd want to track
-                # which addresses have placed bets more efficiently
-                
-                # For now, we'll rely on the event listener to catch new predictions
-                # This method can be enhanced to do bulk syncs if needed
-                pass
+    def _full_sync(self):
+        """Refetch every market, remove orphans and reset the block checkpoint"""
+        # Take the block before reading so events during the fetch are replayed next cycle
+        to_block = max(contract_service.get_block_number() - self.confirmations, 0)
+        
+        with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='fetch_all_markets'):
+            next_market_id = contract_service.get_next_market_id()
+            blockchain_markets = contract_service.get_markets(range(next_market_id))
+        with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='apply_markets'):
+            changed_ids = self._apply_markets(blockchain_markets)
+        
+        SyncCheckpoint.save('market_sync', to_block)
+        SyncCheckpoint.save('market_full_sync', to_block)
+        db.session.commit()
+        if changed_ids:
+            tagged_cache.invalidate_markets(changed_ids, Market.categories_of(changed_ids))
+        
+        with timed(SYNC_PHASE_SECONDS, SYNC_PHASE_ERRORS, phase='cleanup'):
+            self.last_cleanup = self._cleanup_old_data(blockchain_markets, next_market_id=next_market_id)
+        
+        now = time.time()
+        self.last_refreshed = {market['id']: now for market in blockchain_markets}
+        self.next_cycle_in = self.min_interval
+        
+        self.sync_stats['full_syncs'] += 1
+        self.sync_stats['last_sync_mode'] = 'full'
+        self.sync_stats['last_markets_fetched'] = len(blockchain_markets)
+        print(f"Full sync up to block {to_block}: {len(blockchain_markets)} markets, {len(changed_ids)} changed")
+    
+    def _incremental_sync(self, from_block: int):
+        """Refetch only markets that emitted contract events since the checkpoint"""
+        to_block = contract_service.get_block_number() - self.confirmations
+        if to_block <= from_block:
+            return
+        
+        touched_ids = contract_service.touched_market_ids(from_block + 1, to_block)
+        blockchain_markets = contract_service.get_markets(touched_ids) if touched_ids else []
+        changed_ids = self._apply_markets(blockchain_markets)
+        
+        SyncCheckpoint.save('market_sync', to_block)
+        db.session.commit()
+        if changed_ids:
+            tagged_cache.invalidate_markets(changed_ids, Market.categories_of(changed_ids))
+        
+        now = time.time()
+        activity = self._activity()
+        for market_id in touched_ids:
+            activity[str(market_id)] = now
+            self.last_refreshed[str(market_id)] = now
+        
+        self.sync_stats['incremental_syncs'] += 1
+        self.sync_stats['last_sync_mode'] = 'incremental'
+        self.sync_stats['last_markets_fetched'] = len(blockchain_markets)
+        print(f"Incremental sync of blocks {from_block + 1}-{to_block}: "
+              f"{len(touched_ids)} touched, {len(changed_ids)} changed")
+    
+    def _activity(self):
+        """Last event time per market, seeded from recent predictions after a restart"""
+        if self.last_activity is None:
+            since = int(time.time()) - self.hot_window
+            self.last_activity = {
+                market_id: float(timestamp) for market_id, timestamp in
+                db.session.query(Prediction.market_id, db.func.max(Prediction.timestamp))
+                .filter(Prediction.timestamp >= since)
+                .group_by(Prediction.market_id)
+            }
+        return self.last_activity
+    
+    def market_state(self, market_id: str, end_time: int, resolved: bool, now: float) -> str:
+        """Lifecycle state that sets a market's refetch cadence"""
+        if resolved:
+            return 'resolved'
+        if end_time - now <= self.closing_window and now - end_time <= self.closing_grace:
+            # Includes recently ended markets, which are waiting on a resolution
+            return 'closing'
+        if now - self._activity().get(market_id, 0) <= self.hot_window:
+            return 'hot'
+        return 'cold'
+    
+    def _refresh_due_markets(self):
+        """Refetch open markets whose cadence has elapsed and schedule the next cycle"""
+        now = time.time()
+        rows = db.session.query(Market.id, Market.end_time, Market.resolved).all()
+        
+        due = []
+        states = {'hot': 0, 'closing': 0, 'cold': 0, 'resolved': 0}
+        next_due = now + self.sync_interval
+        for market_id, end_time, resolved in rows:
+            if not market_id.isdigit():
+                continue  # not a contract market
+            state = self.market_state(market_id, end_time, resolved, now)
+            states[state] += 1
+            if state == 'resolved':
+                continue
             
-        except Exception as e:
-            print(f"Error syncing predictions: {e}")
+            due_at = self.last_refreshed.get(market_id, 0) + self.cadence[state]
+            if due_at <= now:
+                due.append(market_id)
+                due_at = now + self.cadence[state]
+            next_due = min(next_due, due_at)
+        
+        if due:
+            blockchain_markets = contract_service.get_markets([int(market_id) for market_id in due])
+            changed_ids = self._apply_markets(blockchain_markets)
+            db.session.commit()
+            if changed_ids:
+                tagged_cache.invalidate_markets(changed_ids, Market.categories_of(changed_ids))
+            for market_id in due:
+                self.last_refreshed[market_id] = now
+            self.sync_stats['cadence_refreshes'] += len(due)
+        
+        self.market_states = states
+        self.next_cycle_in = min(max(next_due - time.time(), self.min_interval), self.sync_interval)
+    
+    def _apply_markets(self, blockchain_markets):
+        """Upsert fetched markets into the session; returns ids that changed (caller commits)"""
+        created, updated = Market.upsert_from_chain(blockchain_markets)
+        self.sync_stats['markets_created'] += len(created)
+        self.sync_stats['markets_updated'] += len(updated)
+        self.sync_stats['markets_unchanged'] += len(blockchain_markets) - len(created) - len(updated)
+        SYNC_MARKETS.labels(result='created').inc(len(created))
+        SYNC_MARKETS.labels(result='updated').inc(len(updated))
+        SYNC_MARKETS.labels(result='unchanged').inc(len(blockchain_markets) - len(created) - len(updated))
+        if created or updated:
+            print(f"Created {len(created)} and updated {len(updated)} of {len(blockchain_markets)} markets")
+        return created + updated
+    
+    def cleanup_orphans(self, dry_run=None):
+        """Fetch every chain market and clean up orphans (admin task; see _cleanup_old_data)"""
+        next_market_id = contract_service.get_next_market_id()
+        blockchain_markets = contract_service.get_markets(range(next_market_id))
+        report = self._cleanup_old_data(blockchain_markets, dry_run=dry_run, next_market_id=next_market_id)
+        self.last_cleanup = report
+        return report
     
-    def _cleanup_old_data(self):
-        """Clean up old or invalid data"""
+    def _cleanup_old_data(self, blockchain_markets, dry_run=None, next_market_id=None):
+        """Delete markets missing from a full chain fetch with set-based SQL; returns a report
+        
+        blockchain_markets must be the reads of ids 0 .. next_market_id - 1.
+        get_markets skips ids whose read failed, so cleanup only runs when every
+        one of them was read; otherwise a partial RPC failure would delete live
+        markets. Numeric ids >= next_market_id were created after the fetch and
+        are never treated as orphans.
+        
+        Chain ids are staged in a temporary table and orphans found with one
+        anti-join, so no Market rows are loaded. Rows that the ORM would have
+        cascaded (predictions, comments, ...) are removed with one DELETE per
+        table first; nullable references without a cascade are set to NULL.
+        """
+        dry_run = self.cleanup_dry_run if dry_run is None else dry_run
+        report = {'dry_run': dry_run, 'chain_markets': len(blockchain_markets), 'orphans': 0,
+                  'orphan_ids': [], 'dependents': {}}
         try:
             # Remove markets that don't exist on blockchain anymore
-            blockchain_markets = contract_service.fetch_all_markets()
-            blockchain_market_ids = {str(m['id']) for m in blockchain_markets}
+            if not blockchain_markets:
+                # An empty fetch is an RPC problem, not a chain without markets
+                report['skipped'] = 'empty chain fetch'
+                return report
+            if next_market_id is None:
+                report['skipped'] = 'chain market count unknown'
+                return report
+            
+            fetched = {str(m['id']) for m in blockchain_markets}
+            unread = sum(1 for market_id in range(next_market_id) if str(market_id) not in fetched)
+            if unread:
+                report['skipped'] = 'incomplete chain fetch'
+                report['unread'] = unread
+                print(f"Skipping orphan cleanup: {unread} of {next_market_id} market reads failed")
+                return report
             
-            # Find markets in DB that don't exist on blockchain
-            db_markets = Market.query.all()
-            for db_market in db_markets:
-                if db_market.id not in blockchain_market_ids:
-                    print(f"Removing orphaned market {db_market.id}")
-                    db.session.delete(db_market)
+            with staged_ids(fetched, name='sync_chain_market_ids') as chain_ids:
+                candidates = db.session.execute(
+                    select(Market.id).where(~exists().where(chain_ids.c.id == Market.id))
+                ).scalars().all()
+                newer = [market_id for market_id in candidates
+                         if market_id.isdigit() and int(market_id) >= next_market_id]
+                
+                orphan_query = select(Market.id).where(~exists().where(chain_ids.c.id == Market.id))
+                if newer:
+                    orphan_query = orphan_query.where(Market.id.notin_(newer))
+                orphan_ids = orphan_query.scalar_subquery()
+                
+                removed = db.session.execute(
+                    select(Market.id, Market.category).where(Market.id.in_(orphan_ids))
+                ).all()
+                report['orphans'] = len(removed)
+                report['orphan_ids'] = [market_id for market_id, _ in removed[:100]]
+                
+                if removed:
+                    for table, column, action in self._market_references():
+                        rows = db.session.execute(
+                            select(func.count()).select_from(table).where(column.in_(orphan_ids))
+                        ).scalar()
+                        if not rows:
+                            continue
+                        report['dependents'][table.name] = rows
+                        if dry_run:
+                            continue
+                        if action == 'delete':
+                            db.session.execute(delete(table).where(column.in_(orphan_ids)))
+                        else:
+                            db.session.execute(update(table).where(column.in_(orphan_ids)).values({column.name: None}))
+                    
+                    if not dry_run:
+                        db.session.execute(delete(Market.__table__).where(Market.id.in_(orphan_ids)))
             
+            # Nothing but the staging table was written on a dry run
             db.session.commit()
+            if dry_run:
+                if removed:
+                    print(f"Cleanup dry run: {len(removed)} orphaned markets would be removed")
+                return report
+            
+            if removed:
+                print(f"Removed {len(removed)} orphaned markets")
+                tagged_cache.invalidate_markets(
+                    [market_id for market_id, _ in removed],
+                    {category for _, category in removed}
+                )
             
         except Exception as e:
             print(f"Error cleaning up data: {e}")
             db.session.rollback()
+            report['error'] = str(e)
+        return report
+    
+    def _market_references(self):
+        """(table, column, 'delete' | 'nullify') for every column referencing markets.id, children first"""
+        cascaded = {
+            rel.target.name for rel in Market.__mapper__.relationships if rel.cascade.delete
+        }
+        references = []
+        for table in reversed(db.metadata.sorted_tables):
+            for fk in table.foreign_keys:
+                if fk.column is not Market.__table__.c.id:
+                    continue
+                column = fk.parent
+                delete_rows = table.name in cascaded or fk.ondelete == 'CASCADE' or not column.nullable
+                references.append((table, column, 'delete' if delete_rows else 'nullify'))
+        return references
     
     def force_sync(self):
         """Force an immediate sync"""
@@ -173,9 +424,16 @@ class SyncScheduler:
     
     def get_stats(self):
         """Get sync statistics"""
+        checkpoint = SyncCheckpoint.get('market_sync')
         return {
             'is_running': self.is_running,
             'sync_interval': self.sync_interval,
+            'next_cycle_in': round(self.next_cycle_in, 1),
+            'cadence': self.cadence,
+            'market_states': self.market_states,
+            'last_cleanup': self.last_cleanup,
+            'full_sync_interval': self.full_sync_interval,
+            'last_synced_block': checkpoint.block_number if checkpoint else None,
             'last_sync_time': self.last_sync_time.isoformat() if self.last_sync_time else None,
             'stats': self.sync_stats
         }
@@ -0,0 +1,366 @@
+"""
+Trending Ranking Engine
+Maintains a time-decayed trending score per market from prediction volume,
+unique participants, views and comments, updated incrementally as events arrive.
+
+Scores use forward decay: every event is weighted by 2^((t - epoch) / half_life)
+instead of decaying all stored scores on each tick. Relative order therefore
+never changes without new events, so refreshing the ranking is a partial sort
+over the scores dict and history is never rescanned.
+
+Markets.trending_score is the score shared by all worker processes, stored
+forward-decayed against one epoch kept in the trending_epoch checkpoint, so
+stored scores never need a decay pass either. Each worker adds its own events
+to it as deltas and after every flush reloads its index from it, so the ranking
+is the same whichever worker serves /markets/trending. Readers divide by the
+boost at read time (decayed()). Before the boost grows too large for a float the
+job leader moves the epoch forward, rescaling the stored scores once.
+"""
+import os
+import math
+import time
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from app import db
+from app.models import Market, SyncCheckpoint
+from app.services.job_scheduler import job_scheduler
+from app.utils.tagged_cache import tagged_cache, market_tag
+
+AMOUNT_UNIT = 1_000_000_000  # amounts are stored in base units
+
+# Epoch (unix seconds, in block_number) that markets.trending_score is forward-decayed against
+EPOCH_CHECKPOINT = 'trending_epoch'
+# Half-lives after which the leader moves the epoch forward (2^1024 overflows a float)
+REBASE_HALF_LIVES = 32
+
+class TrendingEngine:
+    """Incremental, time-decayed market ranking with a precomputed ordered index"""
+    
+    def __init__(self):
+        self.half_life = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 6)) * 3600
+        self.refresh_interval = float(os.getenv('TRENDING_REFRESH_INTERVAL', 0.5))
+        self.persist_interval = float(os.getenv('TRENDING_PERSIST_INTERVAL', 30))
+        self.index_size = int(os.getenv('TRENDING_INDEX_SIZE', 500))
+        
+        # Signal weights
+        self.weights = {
+            'volume': 1.0,        # per log1p(amount in whole units)
+            'participant': 3.0,   # per new unique participant
+            'view': 0.1,          # per market view
+            'comment': 1.5        # per comment
+        }
+        
+        # Replaced by the shared epoch on the first load from the database
+        self.epoch = time.time()
+        self.epoch_loaded = False
+        self.scores: Dict[str, float] = {}
+        self.index: List[str] = []
+        # Forward-decayed weight of local events not yet added to trending_score
+        self.pending: Dict[str, float] = {}
+        self.view_deltas = Counter()
+        self.participant_deltas = Counter()
+        self.index_stale = True
+        self.last_refresh = 0.0
+        self.last_persist = time.time()
+        
+        self.lock = threading.Lock()
+        self.app = None
+        self.is_running = False
+        self.engine_thread = None
+        self.stats = {
+            'events': 0,
+            'refreshes': 0,
+            'last_refresh_duration_ms': 0.0,
+            'persisted_markets': 0,
+            'rebases': 0,
+            'reloads': 0
+        }
+    
+    def start(self, app):
+        """Warm the engine from the database and start the refresh loop"""
+        if self.is_running:
+            print("Trending engine already running")
+            return
+        
+        self.app = app
+        with app.app_context():
+            self.warm_start()
+        
+        self.is_running = True
+        self.engine_thread = threading.Thread(target=self._engine_loop, daemon=True)
+        self.engine_thread.start()
+        print("Trending engine started")
+    
+    def stop(self):
+        """Stop the refresh loop and flush pending state"""
+        self.is_running = False
+        if self.engine_thread:
+            self.engine_thread.join(timeout=5)
+        if self.app:
+            with self.app.app_context():
+                self.persist()
+        print("Trending engine stopped")
+    
+    def _engine_loop(self):
+        """Refresh the ordered index often, persist scores less often"""
+        while self.is_running:
+            try:
+                with self.app.app_context():
+                    self.tick()
+                time.sleep(self.refresh_interval)
+            except Exception as e:
+                print(f"Error in trending engine loop: {e}")
+                time.sleep(5)
+    
+    def tick(self):
+        """Refresh the index, persisting scores when due (the job scheduler's trending job)"""
+        self.refresh()
+        if time.time() - self.last_persist >= self.persist_interval:
+            self.persist()
+    
+    def _shared_epoch(self, for_update: bool = False, read: bool = False) -> float:
+        """Epoch of the stored scores, created on first use
+        
+        With for_update the checkpoint row stays locked until the caller commits:
+        a shared (read) lock while adding deltas, an exclusive one while rebasing,
+        so deltas are never scaled against an epoch that is being replaced.
+        """
+        query = SyncCheckpoint.query.filter_by(name=EPOCH_CHECKPOINT)
+        if for_update:
+            query = query.with_for_update(read=read)
+        checkpoint = query.first()
+        if checkpoint is None:
+            checkpoint = SyncCheckpoint.save(EPOCH_CHECKPOINT, int(time.time()))
+            db.session.flush()
+        return float(checkpoint.block_number)
+    
+    def warm_start(self, quiet: bool = False):
+        """Load scores from the shared trending_score of active markets, keeping unflushed local events"""
+        try:
+            epoch = self._shared_epoch()
+            rows = db.session.query(Market.id, Market.trending_score).filter(
+                Market.resolved == False,
+                Market.trending_score > 0
+            ).all()
+            db.session.commit()
+            
+            with self.lock:
+                self._adopt_epoch(epoch)
+                self.scores = {market_id: float(score) for market_id, score in rows}
+                for market_id, weight in self.pending.items():
+                    self.scores[market_id] = self.scores.get(market_id, 0.0) + weight
+                self.index_stale = True
+            
+            self.stats['reloads'] += 1
+            if not quiet:
+                print(f"Trending engine warmed with {len(rows)} markets")
+        except Exception as e:
+            print(f"Error warming trending engine: {e}")
+            db.session.rollback()
+    
+    def _adopt_epoch(self, epoch: float):
+        """Switch to the shared epoch, rescaling unflushed weights (caller holds the lock)"""
+        factor = self._boost(epoch)
+        self.pending = {k: v / factor for k, v in self.pending.items()}
+        self.epoch = epoch
+        self.epoch_loaded = True
+    
+    def _boost(self, ts: float) -> float:
+        return 2 ** ((ts - self.epoch) / self.half_life)
+    
+    def _add(self, market_id, weight: float, ts: Optional[float] = None):
+        """Apply one weighted event (caller holds the lock)"""
+        ts = ts or time.time()
+        market_id = str(market_id)
+        
+        # Weighted against the shared epoch, so pending weights add straight onto trending_score
+        boosted = weight * self._boost(ts)
+        self.scores[market_id] = self.scores.get(market_id, 0.0) + boosted
+        self.pending[market_id] = self.pending.get(market_id, 0.0) + boosted
+        self.index_stale = True
+        self.stats['events'] += 1
+    
+    def record_prediction(self, market_id, amount: int, new_participant: bool = False, ts: Optional[float] = None):
+        """Record a prediction; new participants add a separate boost"""
+        weight = self.weights['volume'] * math.log1p(max(amount or 0, 0) / AMOUNT_UNIT)
+        if new_participant:
+            weight += self.weights['participant']
+        
+        with self.lock:
+            self._add(market_id, weight, ts)
+            if new_participant:
+                self.participant_deltas[str(market_id)] += 1
+    
+    def record_view(self, market_id):
+        """Record a market view (view_count is flushed in batches)"""
+        with self.lock:
+            self._add(market_id, self.weights['view'])
+            self.view_deltas[str(market_id)] += 1
+    
+    def record_comment(self, market_id):
+        """Record a new comment"""
+        with self.lock:
+            self._add(market_id, self.weights['comment'])
+    
+    def record_resolved(self, market_id):
+        """Drop a resolved market from the ranking"""
+        with self.lock:
+            self.pending.pop(str(market_id), None)
+            if self.scores.pop(str(market_id), None) is not None:
+                self.index_stale = True
+    
+    def current_score(self, market_id, now: Optional[float] = None) -> float:
+        """Score decayed to now"""
+        return self.decayed(self.scores.get(str(market_id), 0.0), now)
+    
+    def decayed(self, stored: Optional[float], now: Optional[float] = None) -> float:
+        """A stored (forward-decayed) trending_score as of now"""
+        if not stored:
+            return 0.0
+        if not self.epoch_loaded:
+            # A stored score implies the epoch checkpoint exists
+            checkpoint = SyncCheckpoint.get(EPOCH_CHECKPOINT)
+            if checkpoint is not None:
+                with self.lock:
+                    self._adopt_epoch(float(checkpoint.block_number))
+        now = now or time.time()
+        return stored / self._boost(now)
+    
+    def refresh(self):
+        """Rebuild the ordered index if any event arrived since the last rebuild"""
+        if not self.index_stale:
+            return
+        
+        started = time.perf_counter()
+        with self.lock:
+            scores = self.scores
+            self.index = heapq.nlargest(self.index_size, scores, key=scores.get)
+            self.index_stale = False
+        
+        self.last_refresh = time.time()
+        self.stats['refreshes'] += 1
+        self.stats['last_refresh_duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    
+    def get_trending(self, limit: int = 20, offset: int = 0) -> List[Tuple[str, float]]:
+        """Top markets from the precomputed index as (market_id, score) pairs"""
+        # Without a background loop or scheduler job (auto-sync disabled) refresh and persist lazily on read
+        if not self.is_running and not job_scheduler.is_running:
+            if time.time() - self.last_refresh >= self.refresh_interval:
+                self.refresh()
+            if time.time() - self.last_persist >= self.persist_interval:
+                self.persist()
+        
+        now = time.time()
+        ids = self.index[offset:offset + limit]
+        return [(market_id, self.current_score(market_id, now)) for market_id in ids]
+    
+    def persist(self):
+        """Add local score deltas and view/participant counters to the DB, then reload the shared scores"""
+        with self.lock:
+            pending = self.pending
+            views = self.view_deltas
+            participants = self.participant_deltas
+            self.pending = {}
+            self.view_deltas = Counter()
+            self.participant_deltas = Counter()
+        
+        self.last_persist = time.time()
+        if job_scheduler.is_leader or not job_scheduler.is_running:
+            self._rebase_if_due()
+        if not pending and not views and not participants:
+            # Nothing to add, but other workers' events still need to be picked up
+            self.warm_start(quiet=True)
+            return
+        
+        existing = set()
+        try:
+            if pending:
+                # Markets deleted since their last event are dropped from the ranking
+                existing = {
+                    market_id for (market_id,) in db.session.query(Market.id).filter(Market.id.in_(list(pending)))
+                }
+                for market_id in set(pending) - existing:
+                    self.record_resolved(market_id)
+            
+            if existing:
+                # Additive, so concurrent workers never overwrite each other's contributions.
+                # The shared lock keeps a rebase from committing until these deltas are in.
+                factor = self._boost(self._shared_epoch(for_update=True, read=True))
+                markets = Market.__table__
+                db.session.execute(
+                    markets.update()
+                    .where(markets.c.id == db.bindparam('market_id'))
+                    .values(trending_score=db.func.coalesce(markets.c.trending_score, 0) + db.bindparam('delta')),
+                    [{'market_id': market_id, 'delta': pending[market_id] / factor} for market_id in existing]
+                )
+            for market_id, delta in views.items():
+                Market.query.filter_by(id=market_id).update(
+                    {Market.view_count: db.func.coalesce(Market.view_count, 0) + delta},
+                    synchronize_session=False
+                )
+            for market_id, delta in participants.items():
+                Market.query.filter_by(id=market_id).update(
+                    {Market.participant_count: db.func.coalesce(Market.participant_count, 0) + delta},
+                    synchronize_session=False
+                )
+            db.session.commit()
+            self.stats['persisted_markets'] += len(existing)
+        except Exception as e:
+            print(f"Error persisting trending scores: {e}")
+            db.session.rollback()
+            with self.lock:
+                for market_id, weight in pending.items():
+                    self.pending[market_id] = self.pending.get(market_id, 0.0) + weight
+                self.view_deltas.update(views)
+                self.participant_deltas.update(participants)
+            return
+        
+        # Detail responses embed these counters; lists pick them up on expiry
+        touched = existing | set(views) | set(participants)
+        if touched:
+            tagged_cache.invalidate(*[market_tag(market_id) for market_id in touched])
+        self.warm_start(quiet=True)
+    
+    def _rebase_if_due(self):
+        """Move the shared epoch forward once scores near float range (leader only)
+        
+        This is the only write that touches every scored market, once per
+        REBASE_HALF_LIVES half-lives. Resolved markets are zeroed rather than
+        rescaled and last_updated is kept, so HTTP validators do not change.
+        """
+        try:
+            now = int(time.time())
+            if now - self._shared_epoch() < self.half_life * REBASE_HALF_LIVES:
+                db.session.commit()
+                return
+            
+            epoch = self._shared_epoch(for_update=True)
+            factor = 2 ** ((now - epoch) / self.half_life)
+            Market.query.filter(Market.trending_score > 0).update({
+                Market.trending_score: db.case((Market.resolved == True, 0.0), else_=Market.trending_score / factor),
+                Market.last_updated: Market.last_updated
+            }, synchronize_session=False)
+            SyncCheckpoint.save(EPOCH_CHECKPOINT, now)
+            db.session.commit()
+            self.stats['rebases'] += 1
+            print(f"Trending epoch moved forward {(now - epoch) / 3600:.1f} hours")
+        except Exception as e:
+            print(f"Error rebasing trending scores: {e}")
+            db.session.rollback()
+    
+    def get_stats(self) -> Dict:
+        """Get engine statistics"""
+        return {
+            'is_running': self.is_running,
+            'tracked_markets': len(self.scores),
+            'index_size': len(self.index),
+            'half_life_seconds': self.half_life,
+            'epoch': self.epoch,
+            'last_refresh': self.last_refresh,
+            'stats': self.stats
+        }
+
+# Global instance
+trending_engine = TrendingEngine()
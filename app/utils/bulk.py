@@ -0,0 +1,105 @@
+"""
+Bulk write helpers
+Multi-row INSERT ... ON CONFLICT statements for the dialects the app runs on
+(Postgres in production, SQLite locally). Other dialects are not supported:
+insert_ignore and upsert raise NotImplementedError before writing anything.
+
+Rows are split into as many statements as the dialect's bind parameter limit
+requires, so callers can pass batches of any size.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence
+from sqlalchemy import Column, MetaData, String, Table, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+STAGE_CHUNK_SIZE = 5000
+
+# Bind parameters allowed in one statement; SQLite before 3.32 allowed only 999
+MAX_BIND_PARAMS = {
+    'postgresql': 65535,
+    'sqlite': 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+}
+# Left free for parameters outside the VALUES list (e.g. literals in an ON CONFLICT SET clause)
+BIND_PARAM_HEADROOM = 100
+
+def _dialect_insert(model):
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Bulk upsert is not supported on {db.engine.dialect.name}")
+
+def _chunks(rows: List[Dict]) -> Iterator[List[Dict]]:
+    """Split rows so each multi-row VALUES list stays under the dialect's bind parameter limit"""
+    limit = MAX_BIND_PARAMS.get(db.engine.dialect.name, 999) - BIND_PARAM_HEADROOM
+    size = max(limit // max(len(row) for row in rows), 1)
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def insert_ignore(model, rows: List[Dict], conflict_columns: Sequence[str], returning: Sequence[str] = ()):
+    """Insert rows, skipping rows that conflict on conflict_columns
+    
+    Returns the requested columns of the rows actually inserted.
+    """
+    if not rows:
+        return []
+    
+    inserted = []
+    for chunk in _chunks(rows):
+        stmt = _dialect_insert(model).values(chunk).on_conflict_do_nothing(index_elements=list(conflict_columns))
+        if returning:
+            stmt = stmt.returning(*[getattr(model, column) for column in returning])
+            inserted.extend(db.session.execute(stmt).all())
+        else:
+            db.session.execute(stmt)
+    return inserted
+
+def upsert(model, rows: List[Dict], conflict_columns: Sequence[str], update: Callable):
+    """Insert rows, updating rows that conflict on conflict_columns
+    
+    update(excluded) returns the SET clause as {column: expression}; excluded
+    refers to the row that failed to insert, so expressions can combine it
+    with the stored values (e.g. model.volume + excluded.volume).
+    """
+    if not rows:
+        return
+    
+    for chunk in _chunks(rows):
+        stmt = _dialect_insert(model).values(chunk)
+        stmt = stmt.on_conflict_do_update(index_elements=list(conflict_columns), set_=update(stmt.excluded))
+        db.session.execute(stmt)
+
+def greatest(*values):
+    """SQL maximum of its arguments (GREATEST on Postgres, multi-argument max() on SQLite)"""
+    return func.max(*values) if db.engine.dialect.name == 'sqlite' else func.greatest(*values)
+
+def least(*values):
+    """SQL minimum of its arguments (LEAST on Postgres, multi-argument min() on SQLite)"""
+    return func.min(*values) if db.engine.dialect.name == 'sqlite' else func.least(*values)
+
+@contextmanager
+def staged_ids(values: Iterable[str], name: str = 'staged_ids', length: int = 66):
+    """Stage ids in a temporary one-column table on the session's connection
+    
+    Yields the Table so callers can join or anti-join against it in SQL instead
+    of comparing in Python. The table is dropped on exit.
+    """
+    table = Table(name, MetaData(), Column('id', String(length), primary_key=True), prefixes=['TEMPORARY'])
+    conn = db.session.connection()
+    # A failed run can leave the table behind where DDL is not transactional (SQLite)
+    table.create(conn, checkfirst=True)
+    conn.execute(table.delete())
+    try:
+        values = list(dict.fromkeys(values))
+        for i in range(0, len(values), STAGE_CHUNK_SIZE):
+            conn.execute(table.insert(), [{'id': value} for value in values[i:i + STAGE_CHUNK_SIZE]])
+        yield table
+    finally:
+        try:
+            table.drop(conn)
+        except Exception:
+            # An aborted transaction discards the temporary table on rollback
+            pass
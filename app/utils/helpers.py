@@ -1,3 +1,6 @@
+import base64
+import json
+from collections import OrderedDict
 from datetime import datetime
 
 def format_sui_amount(amount_mist: int) -> float:
@@ -60,3 +63,39 @@ def paginate_results(query, page: int, per_page: int, max_per_page: int = 100):
     per_page = min(per_page, max_per_page)
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
+def encode_cursor(sort_by: str, value, item_id: str) -> str:
+    """Encode a keyset position (sort column value + id) as an opaque cursor"""
+    payload = json.dumps({'s': sort_by, 'v': value, 'id': item_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode an opaque cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid cursor')
+    
+    if not isinstance(payload, dict) or not {'s', 'v', 'id'} <= payload.keys():
+        raise ValueError('Invalid cursor')
+    
+    return payload
+
+class LRUSet:
+    """Set that forgets its least recently seen members beyond maxsize"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+    
+    def __contains__(self, item) -> bool:
+        return item in self.items
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def add(self, item):
+        self.items[item] = None
+        self.items.move_to_end(item)
+        if len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
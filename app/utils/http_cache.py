@@ -0,0 +1,62 @@
+"""
+Conditional GET helpers (ETag / Last-Modified)
+
+Endpoints compute a cheap version for the data they would serve (a timestamp,
+a count, a max id) before doing any serialization work. If the client already
+holds that version a bodyless 304 is returned.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+from flask import request, make_response
+
+def make_etag(*parts) -> str:
+    """Strong ETag value from the parts that identify a representation version"""
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+def body_etag(response) -> str:
+    """ETag from a response body (e.g. one served from cache), so it changes only when the content does"""
+    return hashlib.sha1(response.get_data()).hexdigest()[:32]
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return value.replace(microsecond=0)
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None, weak: bool = False):
+    """Return a 304 response if the client's validators match, otherwise None
+    
+    Pass weak=True for representations that embed volatile fields (e.g. the
+    time of rendering): the ETag is then sent and compared as a weak validator.
+    """
+    last_modified = _as_utc(last_modified)
+    
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag) if weak else request.if_none_match.contains(etag)
+    elif last_modified is not None and request.if_modified_since:
+        matched = last_modified <= request.if_modified_since
+    else:
+        matched = False
+    
+    if not matched:
+        return None
+    
+    response = make_response('', 304)
+    return add_validators(response, etag, last_modified, weak=weak)
+
+def add_validators(response, etag: str, last_modified: Optional[datetime] = None,
+                   cache_control: str = 'no-cache', weak: bool = False):
+    """Attach ETag / Last-Modified headers to a successful response"""
+    if response.status_code not in (200, 304):
+        return response
+    
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    # Clients may store the response but must revalidate before reuse
+    response.headers['Cache-Control'] = cache_control
+    return response
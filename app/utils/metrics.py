@@ -0,0 +1,136 @@
+"""
+Prometheus Metrics
+Process metrics for the API, database, chain RPC, sync jobs and Gamma API.
+
+Under gunicorn every worker is a separate process with its own counters. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this before workers
+fork) prometheus_client writes each process's values to memory-mapped files
+in that directory and /metrics merges them, so any worker can answer a scrape
+with cluster-wide totals. Without it (python run.py) the in-process registry
+is served directly.
+"""
+import os
+import time
+from contextlib import contextmanager
+import requests
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds; RPC and Gamma calls sit between 10ms and a few seconds, sync phases up to minutes
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'seti_http_request_duration_seconds', 'API request latency',
+    ['endpoint', 'method', 'status'], buckets=FAST_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    'seti_db_query_duration_seconds', 'Database statement latency (count gives queries executed)',
+    ['operation'], buckets=FAST_BUCKETS
+)
+DB_QUERY_ERRORS = Counter('seti_db_query_errors_total', 'Database statements that raised', ['operation'])
+RPC_REQUEST_SECONDS = Histogram(
+    'seti_rpc_request_duration_seconds', 'Chain JSON-RPC latency including failover and hedging',
+    ['method', 'kind'], buckets=FAST_BUCKETS
+)
+RPC_ERRORS = Counter('seti_rpc_errors_total', 'Chain JSON-RPC calls that failed or returned an error', ['method', 'kind'])
+SYNC_PHASE_SECONDS = Histogram(
+    'seti_sync_phase_duration_seconds', 'Duration of each chain sync phase', ['phase'], buckets=SLOW_BUCKETS
+)
+SYNC_PHASE_ERRORS = Counter('seti_sync_phase_errors_total', 'Chain sync phases that raised', ['phase'])
+SYNC_MARKETS = Counter('seti_sync_markets_total', 'Markets seen by chain sync, by outcome', ['result'])
+# Only the job leader runs the listener; livemax reports its value and ignores idle followers
+LISTENER_LAG_BLOCKS = Gauge(
+    'seti_event_listener_lag_blocks', 'Confirmed head block minus last processed block',
+    multiprocess_mode='livemax'
+)
+LISTENER_HEAD_BLOCK = Gauge(
+    'seti_event_listener_head_block', 'Confirmed head block seen by the event listener',
+    multiprocess_mode='livemax'
+)
+LISTENER_EVENTS = Counter('seti_event_listener_events_total', 'Contract events applied by the event listener')
+GAMMA_REQUEST_SECONDS = Histogram(
+    'seti_gamma_request_duration_seconds', 'Polymarket Gamma API latency', ['endpoint'], buckets=FAST_BUCKETS
+)
+GAMMA_ERRORS = Counter('seti_gamma_request_errors_total', 'Polymarket Gamma API failures', ['endpoint', 'reason'])
+
+@contextmanager
+def timed(histogram: Histogram, errors: Counter = None, **labels):
+    """Observe the block's duration; count it in errors if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            errors.labels(**labels).inc()
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+def upstream_error_reason(error: Exception) -> str:
+    """Low-cardinality reason label for a failed upstream HTTP call"""
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return f'http_{error.response.status_code // 100}xx'
+    if isinstance(error, requests.exceptions.RequestException):
+        return 'connection'
+    return 'invalid_response'
+
+def _statement_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else 'UNKNOWN'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_started'].pop()
+    DB_QUERY_SECONDS.labels(operation=_statement_operation(statement)).observe(time.perf_counter() - started)
+
+def _handle_error(context):
+    started = context.connection.info.get('metrics_query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+    DB_QUERY_ERRORS.labels(operation=_statement_operation(context.statement or '')).inc()
+
+def _start_request_timer():
+    g.metrics_started = time.perf_counter()
+
+def _observe_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.labels(
+            # The route's endpoint name keeps label cardinality bounded (404s share one label)
+            endpoint=request.endpoint or 'unmatched',
+            method=request.method,
+            status=response.status_code
+        ).observe(time.perf_counter() - started)
+    return response
+
+def metrics_response() -> Response:
+    """Prometheus exposition of every worker's metrics (or this process's outside gunicorn)"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+def init_app(app):
+    """Time every request and statement and serve GET /metrics"""
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    
+    # Engine class-level listeners also cover engines created after this call
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    
+    app.add_url_rule('/metrics', 'metrics', metrics_response)
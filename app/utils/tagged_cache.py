@@ -0,0 +1,224 @@
+"""
+Tag-based response caching on top of Flask-Caching
+
+Each cached entry is tagged (e.g. "market:42", "category:Sports", "market-list",
+"analytics"). Every tag has a version stored in the cache backend and the
+versions are folded into the entry key, so invalidating a tag is a single
+version bump that orphans exactly the entries carrying that tag - no scans
+and no cache.clear().
+
+Tag versions expire too, well after the longest-lived entry that can carry
+them, so tags of deleted markets do not pile up in the backend. An expired
+version is replaced by a fresh random one, which only turns the (already
+expired) entries it covered into misses.
+"""
+
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from flask import request, make_response
+from app import cache
+
+MARKET_LIST_TAG = 'market-list'
+ANALYTICS_TAG = 'analytics'
+
+# Tag versions outlive the longest entry timeout by this factor, and never live less than the floor
+TAG_TIMEOUT_FACTOR = 2
+MIN_TAG_TIMEOUT = 3600
+
+def market_tag(market_id) -> str:
+    return f'market:{market_id}'
+
+def category_tag(category) -> str:
+    return f'category:{category}'
+
+class TaggedCache:
+    """Caches view responses under versioned tags"""
+    
+    def __init__(self, cache):
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'evictions': 0})
+        # TTL of tag version keys; 0 (never expire) once any entry is cached without a timeout
+        self.tag_timeout = MIN_TAG_TIMEOUT
+    
+    def _cover_timeout(self, timeout: Optional[int]):
+        """Stretch the tag TTL so tag versions outlive entries cached with this timeout"""
+        if not timeout:
+            self.tag_timeout = 0
+        elif self.tag_timeout:
+            self.tag_timeout = max(self.tag_timeout, timeout * TAG_TIMEOUT_FACTOR)
+    
+    def _version_key(self, tag: str) -> str:
+        return f'tagver:{tag}'
+    
+    def _new_version(self) -> str:
+        # Random versions never repeat, so an evicted version key cannot revive stale entries
+        return uuid.uuid4().hex[:12]
+    
+    def _get_versions(self, tags: List[str]) -> List[str]:
+        keys = [self._version_key(tag) for tag in tags]
+        versions = list(self.cache.get_many(*keys)) if keys else []
+        
+        missing = {}
+        for i, version in enumerate(versions):
+            if version is None:
+                versions[i] = self._new_version()
+                missing[keys[i]] = versions[i]
+        
+        if missing:
+            self.cache.set_many(missing, timeout=self.tag_timeout)
+        
+        return versions
+    
+    def _record(self, tags: Iterable[str], field: str):
+        with self.lock:
+            for tag in tags:
+                self.stats[tag][field] += 1
+    
+    def _fingerprint(self, tags: List[str], versions: List[str]) -> str:
+        return hashlib.sha1('|'.join(f'{t}={v}' for t, v in zip(tags, versions)).encode()).hexdigest()
+    
+    def _entry_key(self, base_key: str, tags: List[str]) -> str:
+        versions = self._get_versions(tags)
+        return f'tagged:{base_key}:{self._fingerprint(tags, versions)}'
+    
+    def _entry_keys(self, entries: Dict[str, List[str]]) -> Dict[str, str]:
+        """Entry keys for many base keys with a single round trip for all tag versions"""
+        all_tags = sorted({tag for tags in entries.values() for tag in tags})
+        versions = dict(zip(all_tags, self._get_versions(all_tags)))
+        
+        keys = {}
+        for base_key, tags in entries.items():
+            tags = sorted(set(tags))
+            keys[base_key] = f'tagged:{base_key}:{self._fingerprint(tags, [versions[t] for t in tags])}'
+        return keys
+    
+    def get_many(self, entries: Dict[str, List[str]]) -> Tuple[Dict[str, object], Dict[str, str]]:
+        """Look up many tagged objects at once
+        
+        entries maps a base key to its tags. Returns (hits, keys): keys are the
+        entry keys the lookup used, to pass to set_many for the misses so a tag
+        invalidated in between is not written over with pre-invalidation data.
+        """
+        if not entries:
+            return {}, {}
+        
+        try:
+            keys = self._entry_keys(entries)
+            values = self.cache.get_many(*keys.values())
+        except Exception as e:
+            print(f"Tagged cache unavailable: {e}")
+            return {}, {}
+        
+        hits = {}
+        for (base_key, key), value in zip(keys.items(), values):
+            self._record(entries[base_key], 'hits' if value is not None else 'misses')
+            if value is not None:
+                hits[base_key] = value
+        return hits, keys
+    
+    def set_many(self, values: Dict[str, object], keys: Dict[str, str], timeout: int = 300):
+        """Store many tagged objects under the entry keys get_many returned (like cached(), never re-versioned)"""
+        self._cover_timeout(timeout)
+        values = {base_key: value for base_key, value in values.items() if base_key in keys}
+        if not values:
+            return
+        
+        try:
+            self.cache.set_many({keys[base_key]: value for base_key, value in values.items()}, timeout=timeout)
+        except Exception as e:
+            print(f"Error writing tagged cache entries: {e}")
+    
+    def cached(self, timeout: int = 300, tags: Union[Iterable[str], Callable[..., Iterable[str]]] = (),
+               query_string: bool = False):
+        """Cache a view's successful responses under the given tags
+        
+        tags may be a list or a callable receiving the view kwargs.
+        """
+        self._cover_timeout(timeout)
+        
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                entry_tags = sorted(set(tags(**kwargs) if callable(tags) else tags))
+                
+                base_key = request.path
+                if query_string:
+                    base_key += '?' + '&'.join(
+                        f'{k}={v}' for k, v in sorted(request.args.items(multi=True))
+                    )
+                
+                try:
+                    key = self._entry_key(base_key, entry_tags)
+                    cached = self.cache.get(key)
+                except Exception as e:
+                    print(f"Tagged cache unavailable: {e}")
+                    return f(*args, **kwargs)
+                
+                if cached is not None:
+                    self._record(entry_tags, 'hits')
+                    body, status, mimetype = cached
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    return response
+                
+                self._record(entry_tags, 'misses')
+                response = make_response(f(*args, **kwargs))
+                
+                if response.status_code == 200:
+                    try:
+                        self.cache.set(key, (response.get_data(), 200, response.mimetype), timeout=timeout)
+                    except Exception as e:
+                        print(f"Error writing tagged cache entry: {e}")
+                
+                return response
+            return decorated_function
+        return decorator
+    
+    def invalidate(self, *tags: str):
+        """Evict every entry carrying any of the given tags"""
+        tags = sorted({tag for tag in tags if tag})
+        if not tags:
+            return
+        
+        try:
+            self.cache.set_many(
+                {self._version_key(tag): self._new_version() for tag in tags}, timeout=self.tag_timeout
+            )
+            self._record(tags, 'evictions')
+        except Exception as e:
+            print(f"Error invalidating cache tags {tags}: {e}")
+    
+    def invalidate_markets(self, market_ids: Iterable = (), categories: Iterable = ()):
+        """Evict the per-market, per-category, list and analytics entries touched by a market write"""
+        self.invalidate(
+            MARKET_LIST_TAG,
+            ANALYTICS_TAG,
+            *[market_tag(market_id) for market_id in market_ids],
+            *[category_tag(category) for category in categories if category]
+        )
+    
+    def get_stats(self, tag: Optional[str] = None) -> Dict:
+        """Per-tag hit/miss/eviction counters for this process"""
+        with self.lock:
+            stats = {t: dict(s) for t, s in self.stats.items() if tag is None or t == tag}
+        
+        for tag_stats in stats.values():
+            lookups = tag_stats['hits'] + tag_stats['misses']
+            tag_stats['hit_ratio'] = round(tag_stats['hits'] / lookups, 4) if lookups else 0.0
+        
+        return stats
+
+def market_list_tags(**kwargs) -> List[str]:
+    """Category-filtered lists only depend on their category; unfiltered lists on all markets"""
+    category = request.args.get('category')
+    if category and category != 'All':
+        return [category_tag(category)]
+    return [MARKET_LIST_TAG]
+
+# Global instance
+tagged_cache = TaggedCache(cache)
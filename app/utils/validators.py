@@ -51,3 +51,15 @@ def validate_market_data(data: dict) -> tuple[bool, str]:
     
     return True, ""
 
+
+def parse_flag(value, default: bool) -> bool:
+    """Strictly parse a JSON/query boolean flag; raises ValueError for anything ambiguous"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', '1', 'yes'):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean flag: {value!r}")
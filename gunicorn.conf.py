@@ -0,0 +1,24 @@
+"""
+Gunicorn settings picked up automatically from the working directory
+
+Workers share Prometheus metrics through PROMETHEUS_MULTIPROC_DIR (see
+app/utils/metrics.py). It has to be set before any worker imports
+prometheus_client, i.e. here in the master.
+"""
+import os
+import shutil
+import tempfile
+
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'seti-prometheus')
+)
+
+def on_starting(server):
+    # Files left by a previous master would be merged into this run's totals
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters and histograms keep counting
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Sync pipeline benchmark against the local chain stand-in (scripts/fake_chain.py)
+
+Runs each sync path on a fresh database and reports throughput, RPC requests
+and DB write latency:
+    fetch_all_markets      markets/sec from batched contract reads
+    listener_backfill      events/sec for EventListener catching up from block 1
+    full_sync              markets/sec for SyncScheduler's full reconciliation
+    listener_incremental   events/sec for new bets placed after the backfill
+    incremental_sync       markets/sec for SyncScheduler's log-driven sync
+
+Results can be saved with --json and compared against a previous run with
+--baseline; a phase slower than the baseline by more than --tolerance makes
+the script exit non-zero.
+
+Usage:
+    python scripts/benchmark_sync.py --markets 2000 --bets-per-market 20 --latency-ms 5
+    python scripts/benchmark_sync.py --json bench.json --baseline main-bench.json --tolerance 0.25
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_chain import add_chain_arguments, build_chain
+
+class DbTimer:
+    """Counts statements and time spent in writes via engine events"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.reads = 0
+        self.writes = 0
+        self.write_seconds = 0.0
+    
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['bench_started'] = time.perf_counter()
+    
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('bench_started', time.perf_counter())
+        if statement.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.writes += 1
+            self.write_seconds += elapsed
+        else:
+            self.reads += 1
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the chain sync paths against a local RPC stand-in')
+    add_chain_arguments(parser)
+    parser.add_argument('--new-bets', type=int, default=500, help='Bets placed before the incremental phases')
+    parser.add_argument('--database', help='Database URL (default: a temporary SQLite file)')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Compare against results saved with --json')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed throughput drop vs the baseline')
+    parser.add_argument('--verbose', action='store_true', help='Show service output')
+    args = parser.parse_args()
+    
+    chain = build_chain(args)
+    server, url = chain.serve()
+    
+    # Services read their configuration at import time
+    db_path = None
+    if not args.database:
+        db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ.update({
+        'BASE_RPC_URL': url,
+        'BASE_RPC_URLS': url,
+        'PREDICTION_MARKET_CONTRACT_ADDRESS': chain.contract_address,
+        'DATABASE_URL': args.database or f'sqlite:///{db_path}',
+        'EVENT_START_BLOCK': '1',
+        'EVENT_CONFIRMATIONS': '0',
+        'SYNC_CONFIRMATIONS': '0'
+    })
+    
+    quiet = contextlib.nullcontext if args.verbose else lambda: contextlib.redirect_stdout(io.StringIO())
+    with quiet():
+        from sqlalchemy import event
+        from app import create_app, db
+        from app.models import SyncCheckpoint
+        from app.services.contract_service import contract_service
+        from app.services.event_listener import event_listener, CHECKPOINT_NAME
+        from app.services.sync_scheduler import sync_scheduler
+        
+        app = create_app()
+    
+    ctx = app.app_context()
+    ctx.push()
+    if not contract_service.contract:
+        print(f"Contract service could not connect to the stand-in at {url}")
+        sys.exit(1)
+    db.create_all()
+    
+    timer = DbTimer()
+    event.listen(db.engine, 'before_cursor_execute', timer.before)
+    event.listen(db.engine, 'after_cursor_execute', timer.after)
+    
+    print(f"Fake chain: {len(chain.markets)} markets, {len(chain.events)} events, head {chain.head}, "
+          f"latency {args.latency_ms}ms, failure rate {args.failure_rate}")
+    
+    results = []
+    
+    def run_phase(name, unit, fn):
+        timer.reset()
+        requests_before = chain.requests
+        started = time.perf_counter()
+        with quiet():
+            count = fn()
+        seconds = time.perf_counter() - started
+        result = {
+            'phase': name,
+            'count': count,
+            'seconds': round(seconds, 3),
+            'unit': unit,
+            'per_second': round(count / seconds, 1) if seconds else None,
+            'rpc_requests': chain.requests - requests_before,
+            'db_reads': timer.reads,
+            'db_writes': timer.writes,
+            'db_write_ms': round(timer.write_seconds * 1000, 1),
+            'db_write_ms_avg': round(timer.write_seconds * 1000 / timer.writes, 3) if timer.writes else None
+        }
+        results.append(result)
+        return result
+    
+    def listener_catch_up():
+        before = event_listener.stats['events_processed']
+        while not event_listener._process_events():
+            pass
+        return event_listener.stats['events_processed'] - before
+    
+    def full_sync():
+        sync_scheduler._full_sync()
+        return sync_scheduler.sync_stats['last_markets_fetched']
+    
+    def incremental_sync():
+        sync_scheduler._incremental_sync(SyncCheckpoint.get('market_sync').block_number)
+        return sync_scheduler.sync_stats['last_markets_fetched']
+    
+    run_phase('fetch_all_markets', 'markets', lambda: len(contract_service.fetch_all_markets()))
+    backfill = run_phase('listener_backfill', 'events', listener_catch_up)
+    backfill['batch_latency_ms'] = event_listener.get_stats()['batch_latency_ms']
+    run_phase('full_sync', 'markets', full_sync)
+    
+    chain.add_bets(args.new_bets)
+    run_phase('listener_incremental', 'events', listener_catch_up)
+    run_phase('incremental_sync', 'markets', incremental_sync)
+    
+    checkpoint = SyncCheckpoint.get(CHECKPOINT_NAME)
+    caught_up = checkpoint is not None and checkpoint.block_number >= chain.head
+    
+    print(f"\n{'phase':<22}{'count':>8}{'secs':>9}{'per sec':>11}{'rpc':>7}{'writes':>8}{'write ms':>10}")
+    for r in results:
+        print(f"{r['phase']:<22}{r['count']:>8}{r['seconds']:>9}{str(r['per_second']):>11}"
+              f"{r['rpc_requests']:>7}{r['db_writes']:>8}{r['db_write_ms']:>10}")
+    print(f"\nListener batch latency (ms): {backfill['batch_latency_ms']}")
+    print(f"RPC requests served: {chain.requests}, injected failures: {chain.failures}")
+    if not caught_up:
+        print(f"Warning: listener stopped at block {checkpoint.block_number if checkpoint else None} "
+              f"of {chain.head}; see --verbose output")
+    
+    report = {
+        'chain': {'markets': len(chain.markets), 'events': len(chain.events), 'head': chain.head,
+                  'latency_ms': args.latency_ms, 'failure_rate': args.failure_rate},
+        'caught_up': caught_up,
+        'phases': results
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+    
+    server.shutdown()
+    
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r['phase']: r for r in json.load(f)['phases']}
+        for r in results:
+            previous = baseline.get(r['phase'])
+            if previous and previous['per_second'] and r['per_second'] is not None \
+                    and r['per_second'] < previous['per_second'] * (1 - args.tolerance):
+                regressions.append(f"{r['phase']}: {r['per_second']} {r['unit']}/s vs {previous['per_second']} baseline")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+    
+    if regressions or not caught_up:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Create the full-text search index used by /api/v1/markets/search
+- Postgres: weighted tsvector generated column + GIN index
+- SQLite: FTS5 table kept in sync with markets by triggers
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.services.market_search_service import market_search_service
+
+def create_search_index():
+    """Create the market search index for the configured database"""
+    app = create_app()
+
+    with app.app_context():
+        print(f"Database dialect: {db.engine.dialect.name}")
+        return market_search_service.create_index()
+
+if __name__ == "__main__":
+    print("🔄 Creating market full-text search index")
+    print("=" * 60)
+
+    if create_search_index():
+        print("\n🎉 Search index is ready!")
+    else:
+        print("\n💥 Search index could not be created (unsupported database or missing FTS support)")
+        sys.exit(1)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Local JSON-RPC stand-in for the prediction market contract
+
+Serves markets(), bets(), nextMarketId() (directly or through Multicall3
+aggregate3), eth_blockNumber, eth_getBlockByNumber and eth_getLogs from synthetic or recorded
+chain data, with configurable latency, failure rate and eth_getLogs block
+range limit. Point BASE_RPC_URL at it to run the sync services offline.
+
+Usage:
+    python scripts/fake_chain.py --markets 2000 --bets-per-market 20 --port 8545
+    python scripts/fake_chain.py --fixture chain.json --latency-ms 50 --failure-rate 0.02
+"""
+
+import json
+import bisect
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from eth_abi import decode, encode
+from eth_utils import event_signature_to_log_topic, function_signature_to_4byte_selector, to_checksum_address
+
+DEFAULT_CONTRACT = '0x63c0c19a282a1B52b07dD5a65b58948A07DAE32B'
+MULTICALL3 = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# Synthetic block times: block n is mined GENESIS_TIME + n * BLOCK_TIME
+GENESIS_TIME = 1_700_000_000
+BLOCK_TIME = 2
+
+MARKET_TYPES = ['string', 'string', 'uint256', 'bool', 'uint8', 'uint256', 'uint256', 'uint256', 'uint256', 'uint256', 'address']
+
+SELECTORS = {
+    function_signature_to_4byte_selector('nextMarketId()'): 'nextMarketId',
+    function_signature_to_4byte_selector('markets(uint256)'): 'markets',
+    function_signature_to_4byte_selector('bets(uint256,address)'): 'bets',
+    function_signature_to_4byte_selector('aggregate3((address,bool,bytes)[])'): 'aggregate3',
+}
+
+# name -> (signature, indexed types, data types)
+EVENTS = {
+    'MarketCreated': ('MarketCreated(uint256,string,uint256,address)', ['uint256', 'address'], ['string', 'uint256']),
+    'BetPlaced': ('BetPlaced(uint256,address,uint8,uint256)', ['uint256', 'address'], ['uint8', 'uint256']),
+    'MarketResolved': ('MarketResolved(uint256,uint8)', ['uint256'], ['uint8']),
+    'PayoutClaimed': ('PayoutClaimed(uint256,address,uint256)', ['uint256', 'address'], ['uint256']),
+}
+EVENT_TOPICS = {name: '0x' + event_signature_to_log_topic(sig).hex() for name, (sig, _, _) in EVENTS.items()}
+
+# Argument order of each event: indexed first, then data (matches EVENTS)
+EVENT_ARGS = {
+    'MarketCreated': (['marketId', 'creator'], ['question', 'endTime']),
+    'BetPlaced': (['marketId', 'user'], ['outcome', 'amount']),
+    'MarketResolved': (['marketId'], ['winningOutcome']),
+    'PayoutClaimed': (['marketId', 'user'], ['payout']),
+}
+
+class RpcFailure(Exception):
+    """Injected failure: status is the HTTP status, or None for a JSON-RPC error"""
+    
+    def __init__(self, status, message):
+        self.status = status
+        super().__init__(message)
+
+class FakeChain:
+    """Contract state and event log replayed block by block"""
+    
+    def __init__(self, contract_address=DEFAULT_CONTRACT, events_per_block=20):
+        self.contract_address = to_checksum_address(contract_address)
+        self.events_per_block = events_per_block
+        self.lock = threading.Lock()
+        self.markets = []
+        self.bets = {}  # (market_id, user) -> [amount, outcome, claimed]
+        self.events = []  # {'block', 'log_index', 'event', 'args'}
+        self.event_blocks = []  # block of each event, for bisecting eth_getLogs windows
+        self.head = 0
+        self.block_events = 0  # events already in the head block
+        # Randomness and bettor addresses for add_bets()
+        self.rng = random.Random(1)
+        self.users = []
+        
+        # Serving behaviour
+        self.latency = 0.0
+        self.failure_rate = 0.0
+        self.max_log_range = None
+        self.requests = 0
+        self.failures = 0
+    
+    # Building state
+    
+    def _next_slot(self):
+        """(block, log index) for the next event, events_per_block per block"""
+        if self.head == 0 or self.block_events >= self.events_per_block:
+            self.mine()
+        self.block_events += 1
+        return self.head, self.block_events - 1
+    
+    def mine(self):
+        """Start a new block; later events never land in a block that was already served"""
+        self.head += 1
+        self.block_events = 0
+    
+    def emit(self, event, **args):
+        """Append an event and apply it to contract state"""
+        block, log_index = self._next_slot()
+        self.events.append({'block': block, 'log_index': log_index, 'event': event, 'args': args})
+        self.event_blocks.append(block)
+        market_id = args.get('marketId')
+        
+        if event == 'MarketCreated':
+            self.markets.append({
+                'question': args['question'], 'description': f"Synthetic market {market_id}",
+                'end_time': args['endTime'], 'resolved': False, 'winning_outcome': 0,
+                'total_liquidity': 0, 'yes_pool': 0, 'no_pool': 0, 'creator': args['creator']
+            })
+        elif event == 'BetPlaced':
+            market = self.markets[market_id]
+            market['total_liquidity'] += args['amount']
+            market['yes_pool' if args['outcome'] == 1 else 'no_pool'] += args['amount']
+            bet = self.bets.setdefault((market_id, args['user'].lower()), [0, args['outcome'], False])
+            bet[0] += args['amount']
+        elif event == 'MarketResolved':
+            self.markets[market_id]['resolved'] = True
+            self.markets[market_id]['winning_outcome'] = args['winningOutcome']
+        elif event == 'PayoutClaimed':
+            self.bets[(market_id, args['user'].lower())][2] = True
+    
+    def add_market(self, bets_per_market, resolve=False):
+        """Create one market with random bets, optionally resolving it and paying out winners"""
+        rng, users = self.rng, self.users
+        with self.lock:
+            market_id = len(self.markets)
+            self.emit('MarketCreated', marketId=market_id, question=f"Will synthetic team {market_id} win?",
+                      endTime=2000000000 + market_id, creator=users[market_id % len(users)])
+            bettors = rng.sample(users, min(bets_per_market, len(users)))
+            for user in bettors:
+                self.emit('BetPlaced', marketId=market_id, user=user,
+                          outcome=rng.randint(0, 1), amount=rng.randint(1, 1000) * 10 ** 12)
+            if resolve:
+                winner = rng.randint(0, 1)
+                self.emit('MarketResolved', marketId=market_id, winningOutcome=winner)
+                for user in bettors:
+                    if self.bets[(market_id, user.lower())][1] == winner and rng.random() < 0.5:
+                        self.emit('PayoutClaimed', marketId=market_id, user=user, payout=1)
+            return market_id
+    
+    def add_bets(self, count):
+        """Place count more bets on random unresolved markets (new blocks for incremental syncs)"""
+        open_ids = [i for i, m in enumerate(self.markets) if not m['resolved']]
+        with self.lock:
+            self.mine()
+            for _ in range(count):
+                self.emit('BetPlaced', marketId=self.rng.choice(open_ids), user=self.rng.choice(self.users),
+                          outcome=self.rng.randint(0, 1), amount=self.rng.randint(1, 1000) * 10 ** 12)
+    
+    @classmethod
+    def synthetic(cls, markets=1000, bets_per_market=10, users=500, resolved_ratio=0.2, seed=1, **kwargs):
+        chain = cls(**kwargs)
+        chain.rng = random.Random(seed)
+        chain.users = [to_checksum_address('0x%040x' % (0x1000 + i)) for i in range(users)]
+        for _ in range(markets):
+            chain.add_market(bets_per_market, resolve=chain.rng.random() < resolved_ratio)
+        return chain
+    
+    @classmethod
+    def from_fixture(cls, path, **kwargs):
+        """Replay a recorded event list ({"events": [{"event", "args"}, ...]})"""
+        with open(path) as f:
+            fixture = json.load(f)
+        chain = cls(contract_address=fixture.get('contract_address', DEFAULT_CONTRACT), **kwargs)
+        for event in fixture['events']:
+            chain.emit(event['event'], **event['args'])
+        chain.users = sorted({to_checksum_address(user) for (_, user) in chain.bets}) or [chain.markets[0]['creator']]
+        return chain
+    
+    def save_fixture(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'contract_address': self.contract_address,
+                'events': [{'event': e['event'], 'args': e['args']} for e in self.events]
+            }, f)
+    
+    # Contract reads
+    
+    def call(self, data: bytes) -> bytes:
+        selector, body = data[:4], data[4:]
+        name = SELECTORS.get(selector)
+        if name == 'nextMarketId':
+            return encode(['uint256'], [len(self.markets)])
+        if name == 'markets':
+            (market_id,) = decode(['uint256'], body)
+            if market_id >= len(self.markets):
+                return encode(MARKET_TYPES, ['', '', 0, False, 0, 0, 0, 0, 0, 0, '0x' + '00' * 20])
+            m = self.markets[market_id]
+            return encode(MARKET_TYPES, [
+                m['question'], m['description'], m['end_time'], m['resolved'], m['winning_outcome'],
+                m['total_liquidity'], m['yes_pool'], m['no_pool'], m['yes_pool'], m['no_pool'], m['creator']
+            ])
+        if name == 'bets':
+            market_id, user = decode(['uint256', 'address'], body)
+            amount, outcome, claimed = self.bets.get((market_id, user.lower()), (0, 0, False))
+            return encode(['uint256', 'uint8', 'bool'], [amount, outcome, claimed])
+        raise RpcFailure(None, f"execution reverted: unknown selector 0x{selector.hex()}")
+    
+    def multicall(self, data: bytes) -> bytes:
+        (calls,) = decode(['(address,bool,bytes)[]'], data[4:])
+        results = []
+        for target, allow_failure, call_data in calls:
+            try:
+                results.append((True, self.call(call_data)))
+            except RpcFailure:
+                if not allow_failure:
+                    raise
+                results.append((False, b''))
+        return encode(['(bool,bytes)[]'], [results])
+    
+    # Logs
+    
+    def _log(self, event) -> dict:
+        name = event['event']
+        indexed_names, data_names = EVENT_ARGS[name]
+        _, indexed_types, data_types = EVENTS[name]
+        topics = [EVENT_TOPICS[name]] + [
+            '0x' + encode([t], [event['args'][n]]).hex() for t, n in zip(indexed_types, indexed_names)
+        ]
+        tx_hash = '0x%064x' % (event['block'] * 1000 + event['log_index'])
+        return {
+            'address': self.contract_address,
+            'topics': topics,
+            'data': '0x' + encode(data_types, [event['args'][n] for n in data_names]).hex(),
+            'blockNumber': hex(event['block']),
+            'blockHash': '0x%064x' % event['block'],
+            'transactionHash': tx_hash,
+            'transactionIndex': hex(event['log_index']),
+            'logIndex': hex(event['log_index']),
+            'removed': False
+        }
+    
+    def get_logs(self, params: dict) -> list:
+        from_block = int(params.get('fromBlock', '0x0'), 16)
+        to_block = self.head if params.get('toBlock', 'latest') == 'latest' else int(params['toBlock'], 16)
+        if self.max_log_range and to_block - from_block + 1 > self.max_log_range:
+            raise RpcFailure(None, f"block range too large, max {self.max_log_range}")
+        
+        topic_filter = (params.get('topics') or [None])[0]
+        if isinstance(topic_filter, str):
+            topic_filter = [topic_filter]
+        wanted = {t.lower() for t in topic_filter} if topic_filter else None
+        
+        # Events are stored in block order, so bisect the window
+        lo = bisect.bisect_left(self.event_blocks, from_block)
+        hi = bisect.bisect_right(self.event_blocks, to_block)
+        return [
+            self._log(event) for event in self.events[lo:hi]
+            if wanted is None or EVENT_TOPICS[event['event']] in wanted
+        ]
+    
+    # JSON-RPC
+    
+    def handle(self, method, params):
+        if method == 'eth_blockNumber':
+            return hex(self.head)
+        if method == 'eth_chainId':
+            return hex(84532)
+        if method in ('web3_clientVersion', 'net_version'):
+            return 'fake-chain/1.0' if method == 'web3_clientVersion' else '84532'
+        if method == 'eth_call':
+            to = params[0]['to'].lower()
+            data = bytes.fromhex(params[0].get('data', params[0].get('input', '0x'))[2:])
+            if to == MULTICALL3.lower():
+                return '0x' + self.multicall(data).hex()
+            if to == self.contract_address.lower():
+                return '0x' + self.call(data).hex()
+            return '0x'
+        if method == 'eth_getLogs':
+            return self.get_logs(params[0])
+        if method == 'eth_getBlockByNumber':
+            block = self.head if params[0] == 'latest' else int(params[0], 16)
+            if block > self.head:
+                return None
+            return {'number': hex(block), 'hash': '0x%064x' % block, 'timestamp': hex(GENESIS_TIME + block * BLOCK_TIME)}
+        raise RpcFailure(None, f"method {method} not supported")
+    
+    def respond(self, request):
+        """Response object for one JSON-RPC request, raising RpcFailure for HTTP-level failures"""
+        self.requests += 1
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.failures += 1
+            if random.random() < 0.5:
+                raise RpcFailure(503, 'injected outage')
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32603, 'message': 'injected failure'}}
+        
+        try:
+            with self.lock:
+                result = self.handle(request['method'], request.get('params') or [])
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+        except RpcFailure as e:
+            if e.status:
+                raise
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32000, 'message': str(e)}}
+    
+    def serve(self, host='127.0.0.1', port=0):
+        """Start serving in a daemon thread; returns (server, url)"""
+        chain = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if chain.latency:
+                    time.sleep(chain.latency)
+                try:
+                    if isinstance(body, list):
+                        response = [chain.respond(item) for item in body]
+                    else:
+                        response = chain.respond(body)
+                    status, out = 200, json.dumps(response).encode()
+                except RpcFailure as e:
+                    status, out = e.status, str(e).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://{host}:{server.server_address[1]}"
+
+def add_chain_arguments(parser):
+    """Options shared with the benchmark"""
+    parser.add_argument('--markets', type=int, default=1000)
+    parser.add_argument('--bets-per-market', type=int, default=10)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--fixture', help='Replay events from a JSON fixture instead of generating them')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--max-log-range', type=int, default=None, help='Reject eth_getLogs spanning more blocks')
+
+def build_chain(args) -> FakeChain:
+    if args.fixture:
+        chain = FakeChain.from_fixture(args.fixture)
+    else:
+        chain = FakeChain.synthetic(markets=args.markets, bets_per_market=args.bets_per_market, users=args.users)
+    chain.latency = args.latency_ms / 1000
+    chain.failure_rate = args.failure_rate
+    chain.max_log_range = args.max_log_range
+    return chain
+
+def main():
+    parser = argparse.ArgumentParser(description='Local RPC stand-in for the prediction market contract')
+    add_chain_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--save-fixture', help='Write the generated events to a JSON fixture and exit')
+    args = parser.parse_args()
+    
+    chain = build_chain(args)
+    if args.save_fixture:
+        chain.save_fixture(args.save_fixture)
+        print(f"Wrote {len(chain.events)} events to {args.save_fixture}")
+        return
+    
+    server, url = chain.serve(args.host, args.port)
+    print(f"Fake chain at {url}: {len(chain.markets)} markets, {len(chain.events)} events, head block {chain.head}")
+    print(f"export BASE_RPC_URL={url} PREDICTION_MARKET_CONTRACT_ADDRESS={chain.contract_address}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
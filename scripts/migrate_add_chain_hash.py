@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the chain_hash column to markets table
+
+chain_hash stores a fingerprint of each market's last synced contract read so
+sync can skip markets whose on-chain state has not changed. Existing rows start
+empty and are filled in by the next sync.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from sqlalchemy import text
+
+def migrate_add_chain_hash():
+    """Add chain_hash column to markets table"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            # Check if column already exists
+            result = db.session.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'markets'
+                AND column_name = 'chain_hash'
+            """))
+            existing_column = result.fetchone()
+            
+            if not existing_column:
+                print("Adding chain_hash column to markets table...")
+                db.session.execute(text("ALTER TABLE markets ADD COLUMN chain_hash VARCHAR(32)"))
+                db.session.commit()
+                print("✓ chain_hash column added")
+            else:
+                print("✓ chain_hash column already exists")
+            
+            print("\n✅ Migration completed successfully!")
+        
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            db.session.rollback()
+            return False
+    
+    return True
+
+if __name__ == "__main__":
+    print("🔄 Starting database migration: Add chain_hash column to markets table")
+    print("=" * 70)
+    
+    success = migrate_add_chain_hash()
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+        print("The markets table now includes the chain_hash column.")
+    else:
+        print("\n💥 Migration failed!")
+        sys.exit(1)
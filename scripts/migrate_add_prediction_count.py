@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the denormalized prediction_count column to markets table
+and backfill it from the predictions table with a single GROUP BY query
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Market
+from sqlalchemy import text
+
+def migrate_add_prediction_count():
+    """Add prediction_count column to markets table and backfill it"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            # Check if column already exists
+            result = db.session.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'markets'
+                AND column_name = 'prediction_count'
+            """))
+            existing_column = result.fetchone()
+
+            if not existing_column:
+                print("Adding prediction_count column to markets table...")
+                db.session.execute(text("ALTER TABLE markets ADD COLUMN prediction_count INTEGER DEFAULT 0"))
+                db.session.commit()
+                print("✓ prediction_count column added")
+            else:
+                print("✓ prediction_count column already exists")
+
+            print("Backfilling prediction counts...")
+            updated = Market.backfill_prediction_counts()
+            print(f"✓ Backfilled counts for {updated} markets with predictions")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            db.session.rollback()
+            return False
+
+    return True
+
+if __name__ == "__main__":
+    print("🔄 Starting database migration: Add prediction_count column to markets table")
+    print("=" * 70)
+
+    success = migrate_add_prediction_count()
+
+    if success:
+        print("\n🎉 Migration completed successfully!")
+        print("The markets table now includes the prediction_count column.")
+    else:
+        print("\n💥 Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the (market_id, user_address) index to predictions
+
+Positions are one contract Bet per (market, user); the reconciler groups and
+pages predictions by that pair, and event ingestion looks up known pairs, so
+both run off this index instead of sorting the table.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from sqlalchemy import text
+
+def migrate_add_prediction_position_index():
+    """Add idx_predictions_market_user to predictions table"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            print("Creating idx_predictions_market_user on predictions(market_id, user_address)...")
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_predictions_market_user ON predictions(market_id, user_address)"
+            ))
+            db.session.commit()
+            print("✓ idx_predictions_market_user index ready")
+            
+            print("\n✅ Migration completed successfully!")
+        
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            db.session.rollback()
+            return False
+    
+    return True
+
+if __name__ == "__main__":
+    print("🔄 Starting database migration: Add (market_id, user_address) index to predictions")
+    print("=" * 70)
+    
+    success = migrate_add_prediction_position_index()
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+        print("The predictions table now has the position index.")
+    else:
+        print("\n💥 Migration failed!")
+        sys.exit(1)
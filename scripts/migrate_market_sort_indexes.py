@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Database migration script to rebuild the market list keyset indexes
+
+The (sort column, id) indexes were created ascending by SQLAlchemy and
+descending by supabase_schema.sql, and neither matched the list's ORDER BY
+once NULL pools started sorting as 0. This drops them and recreates them on
+the exact (COALESCE(column, 0) DESC, id DESC) expressions the list uses.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from sqlalchemy import text
+
+SORT_INDEXES = {
+    'idx_markets_end_time_id': 'end_time DESC, id DESC',
+    'idx_markets_total_liquidity_id': 'COALESCE(total_liquidity, 0) DESC, id DESC',
+    'idx_markets_yes_pool_id': 'COALESCE(yes_pool, 0) DESC, id DESC',
+    'idx_markets_no_pool_id': 'COALESCE(no_pool, 0) DESC, id DESC',
+}
+
+def migrate_market_sort_indexes():
+    """Recreate the keyset pagination indexes on markets"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            for name, columns in SORT_INDEXES.items():
+                print(f"Rebuilding {name}...")
+                db.session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                db.session.execute(text(f"CREATE INDEX {name} ON markets({columns})"))
+                db.session.commit()
+                print(f"✓ {name} on ({columns})")
+            
+            print("\n✅ Migration completed successfully!")
+        
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            db.session.rollback()
+            return False
+    
+    return True
+
+if __name__ == "__main__":
+    print("🔄 Starting database migration: Rebuild market list keyset indexes")
+    print("=" * 70)
+    
+    success = migrate_market_sort_indexes()
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+        print("The markets keyset indexes now match the list ORDER BY.")
+    else:
+        print("\n💥 Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Reconcile the predictions table with on-chain bets(marketId, user) state
+and write a JSON drift report. Runs as a dry run unless --apply is given.
+
+Usage: python scripts/reconcile_positions.py [--market ID] [--apply] [--report PATH]
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.position_reconciler import position_reconciler
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile DB positions with on-chain bets')
+    parser.add_argument('--market', help='Only reconcile this market id')
+    parser.add_argument('--apply', action='store_true', help='Fix amount/claimed drift in the database')
+    parser.add_argument('--report', default='position_drift_report.json', help='Where to write the drift report')
+    args = parser.parse_args()
+    
+    app = create_app()
+    with app.app_context():
+        report = position_reconciler.reconcile(
+            market_id=args.market,
+            dry_run=not args.apply,
+            report_path=args.report
+        )
+    
+    print(f"Checked {report['positions_checked']} positions in {report['duration']}s")
+    print(f"Drift by kind: {report['by_kind'] or 'none'}")
+    print(f"Fixed: {report['fixed']}")
+    print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
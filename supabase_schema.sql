@@ -52,9 +52,11 @@ CREATE TABLE IF NOT EXISTS markets (
     participant_count INTEGER DEFAULT 0,
     comment_count INTEGER DEFAULT 0,
     favorite_count INTEGER DEFAULT 0,
+    prediction_count INTEGER DEFAULT 0,
     slug VARCHAR(200) UNIQUE,
     featured BOOLEAN DEFAULT FALSE,
-    trending_score FLOAT DEFAULT 0.0
+    trending_score FLOAT DEFAULT 0.0,
+    chain_hash VARCHAR(32)
 );
 
 -- Predictions table
@@ -159,13 +161,56 @@ CREATE TABLE IF NOT EXISTS games (
     api_data JSONB
 );
 
+-- Price history: one row per pool change
+CREATE TABLE IF NOT EXISTS price_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    market_id VARCHAR(66) NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
+    timestamp BIGINT NOT NULL,
+    yes_price SMALLINT NOT NULL,
+    volume BIGINT DEFAULT 0
+);
+
+-- Pre-rolled OHLC candles (1m, 1h, 1d) of the YES price in basis points
+CREATE TABLE IF NOT EXISTS price_candles (
+    market_id VARCHAR(66) NOT NULL REFERENCES markets(id) ON DELETE CASCADE,
+    interval VARCHAR(4) NOT NULL,
+    bucket_start BIGINT NOT NULL,
+    open SMALLINT NOT NULL,
+    high SMALLINT NOT NULL,
+    low SMALLINT NOT NULL,
+    close SMALLINT NOT NULL,
+    volume BIGINT DEFAULT 0,
+    PRIMARY KEY (market_id, interval, bucket_start)
+);
+
+-- Last block applied by each chain sync process
+CREATE TABLE IF NOT EXISTS sync_checkpoints (
+    name VARCHAR(64) PRIMARY KEY,
+    block_number BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_markets_category ON markets(category);
 CREATE INDEX IF NOT EXISTS idx_markets_resolved ON markets(resolved);
 CREATE INDEX IF NOT EXISTS idx_markets_created_timestamp ON markets(created_timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_markets_volume ON markets(volume_24h DESC);
+-- Keyset pagination: same expressions as the market list ORDER BY (NULL pools sort as 0)
+CREATE INDEX IF NOT EXISTS idx_markets_end_time_id ON markets(end_time DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_markets_total_liquidity_id ON markets(COALESCE(total_liquidity, 0) DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_markets_yes_pool_id ON markets(COALESCE(yes_pool, 0) DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_markets_no_pool_id ON markets(COALESCE(no_pool, 0) DESC, id DESC);
+
+-- Full-text search over market question (weight A) and description (weight B)
+ALTER TABLE markets ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(question, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_markets_search_vector ON markets USING GIN (search_vector);
 CREATE INDEX IF NOT EXISTS idx_predictions_market_id ON predictions(market_id);
 CREATE INDEX IF NOT EXISTS idx_predictions_user_address ON predictions(user_address);
+CREATE INDEX IF NOT EXISTS idx_predictions_market_user ON predictions(market_id, user_address);
 CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions(timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_comments_market_id ON comments(market_id);
 CREATE INDEX IF NOT EXISTS idx_favorites_user_address ON favorites(user_address);
@@ -173,6 +218,7 @@ CREATE INDEX IF NOT EXISTS idx_notifications_user_address ON notifications(user_
 CREATE INDEX IF NOT EXISTS idx_activity_feed_timestamp ON activity_feed(timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_games_fixture_id ON games(fixture_id);
 CREATE INDEX IF NOT EXISTS idx_games_kickoff_time ON games(kickoff_time);
+CREATE INDEX IF NOT EXISTS idx_price_snapshots_market_timestamp ON price_snapshots(market_id, timestamp);
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE markets ENABLE ROW LEVEL SECURITY;
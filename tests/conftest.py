@@ -0,0 +1,84 @@
+"""
+Shared fixtures: one app on a throwaway SQLite database, tables rebuilt per test
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import pytest
+
+# Set before the app is imported: config reads them at import time
+os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='seti-test-'), 'test.db')
+# A closed port, so chain clients fail fast instead of reaching a real node
+os.environ['BASE_RPC_URL'] = 'http://127.0.0.1:1'
+os.environ['SUI_RPC_URL'] = 'http://127.0.0.1:1'
+
+ADMIN_HEADERS = {'X-Admin-Key': 'admin-secret-key'}
+# scripts/fake_chain.py serves as the local chain for RPC-level tests
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+
+@pytest.fixture(autouse=True)
+def db(app):
+    from app import cache, db
+    db.drop_all()
+    db.create_all()
+    cache.clear()
+    yield db
+    db.session.rollback()
+    db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_markets(db):
+    """Insert n markets with ids 0..n-1 and return them"""
+    from app.models import Market
+    
+    def make(n, **overrides):
+        now = int(time.time())
+        markets = []
+        for i in range(n):
+            fields = {
+                'id': str(i), 'question': f'Will team {i} win the cup?', 'description': 'desc',
+                'end_time': now + 86400 + i, 'creator': '0xcreator', 'created_timestamp': now,
+                'category': 'Sports' if i % 2 else 'Crypto', 'total_liquidity': i * 10,
+                'yes_pool': i, 'no_pool': 100 - i
+            }
+            fields.update(overrides)
+            markets.append(Market(**fields))
+        db.session.add_all(markets)
+        db.session.commit()
+        return markets
+    
+    return make
+
+@pytest.fixture
+def fake_chain(monkeypatch):
+    """contract_service pointed at a local FakeChain (scripts/fake_chain.py) for one test"""
+    from fake_chain import FakeChain
+    from app.services import contract_service as contract_module
+    from app.services.rpc_client import RpcClient
+    
+    chain = FakeChain.synthetic(markets=12, bets_per_market=4, users=8)
+    server, url = chain.serve()
+    client = RpcClient([url], timeout=5)
+    monkeypatch.setattr(contract_module, 'evm_rpc_client', client)
+    monkeypatch.setenv('PREDICTION_MARKET_CONTRACT_ADDRESS', chain.contract_address)
+    service = contract_module.ContractService()
+    for name, value in vars(service).items():
+        monkeypatch.setattr(contract_module.contract_service, name, value, raising=False)
+    
+    yield chain
+    server.shutdown()
+    if client.loop_session is not None:
+        asyncio.run_coroutine_threadsafe(client.loop_session.close(), client.loop).result()
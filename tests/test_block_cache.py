@@ -0,0 +1,83 @@
+import threading
+import time
+import pytest
+from app.services.block_cache import BlockReadCache
+
+class Head:
+    def __init__(self, block=100):
+        self.block = block
+        self.reads = 0
+    
+    def __call__(self):
+        self.reads += 1
+        return self.block
+
+def test_results_are_reused_until_the_head_moves():
+    head = Head()
+    cache = BlockReadCache(head, head_ttl=0)
+    loads = []
+    
+    def loader(block):
+        loads.append(block)
+        return f'value@{block}'
+    
+    assert cache.get('markets', (1,), loader) == 'value@100'
+    assert cache.get('markets', (1,), loader) == 'value@100'
+    head.block = 101
+    assert cache.get('markets', (1,), loader) == 'value@101'
+    
+    assert loads == [100, 101]
+    assert cache.stats['invalidations'] == 1
+
+def test_head_is_trusted_for_head_ttl():
+    head = Head()
+    cache = BlockReadCache(head, head_ttl=60)
+    for _ in range(5):
+        cache.get('nextMarketId', (), lambda block: 7)
+    assert head.reads == 1
+
+def test_observed_head_invalidates_and_stale_puts_are_dropped():
+    head = Head()
+    cache = BlockReadCache(head, head_ttl=60)
+    cache.get('markets', (1,), lambda block: 'old')
+    
+    cache.observe_head(105)
+    cache.put('markets', (2,), 100, 'read at an older block')
+    
+    assert cache.get_stats()['entries'] == 0
+    assert cache.get('markets', (1,), lambda block: f'new@{block}') == 'new@105'
+
+def test_concurrent_misses_share_one_load():
+    cache = BlockReadCache(Head(), head_ttl=60)
+    started = threading.Event()
+    loads = []
+    
+    def slow_loader(block):
+        loads.append(block)
+        started.set()
+        time.sleep(0.2)
+        return 'value'
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('markets', (1,), slow_loader)))
+               for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ['value'] * 5
+    assert len(loads) == 1
+    assert cache.stats['coalesced'] == 4
+
+def test_failed_load_is_not_cached():
+    cache = BlockReadCache(Head(), head_ttl=60)
+    
+    def failing(block):
+        raise ConnectionError('node down')
+    
+    with pytest.raises(ConnectionError):
+        cache.get('markets', (1,), failing)
+    assert cache.get('markets', (1,), lambda block: 'ok') == 'ok'
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import event
+from app.models import Market
+from app.services.sync_scheduler import SyncScheduler
+
+@pytest.fixture
+def scheduler():
+    scheduler = SyncScheduler()
+    scheduler.confirmations = 0
+    return scheduler
+
+def capture_updates(db):
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        if statement.startswith('UPDATE markets'):
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    return statements, lambda: event.remove(db.engine, 'before_cursor_execute', record)
+
+def test_unchanged_full_sync_writes_nothing(db, scheduler, fake_chain):
+    scheduler._full_sync()
+    assert scheduler.sync_stats['markets_created'] == 12
+    assert all(market.chain_hash for market in Market.query)
+    
+    statements, stop = capture_updates(db)
+    try:
+        scheduler._full_sync()
+    finally:
+        stop()
+    
+    assert scheduler.sync_stats['markets_unchanged'] == 12
+    assert scheduler.sync_stats['markets_updated'] == 0
+    assert statements == []
+
+def test_changed_market_is_the_only_update(db, scheduler, fake_chain):
+    scheduler._full_sync()
+    fake_chain.markets[3]['yes_pool'] += 5
+    scheduler._full_sync()
+    
+    assert scheduler.sync_stats['markets_updated'] == 1
+    assert scheduler.sync_stats['markets_unchanged'] == 11
+    assert db.session.get(Market, '3').yes_pool == fake_chain.markets[3]['yes_pool']
+
+def test_missing_fingerprint_is_backfilled_without_counting_as_change(db, scheduler, fake_chain):
+    scheduler._full_sync()
+    Market.query.update({Market.chain_hash: None})
+    db.session.commit()
+    
+    scheduler._full_sync()
+    
+    assert scheduler.sync_stats['markets_updated'] == 0
+    assert all(market.chain_hash for market in Market.query)
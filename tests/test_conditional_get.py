@@ -0,0 +1,48 @@
+import time
+from email.utils import format_datetime
+from app.models import Market, Prediction
+
+def test_market_list_etag_and_last_modified(client, make_markets):
+    make_markets(5)
+    response = client.get('/api/v1/markets?per_page=3')
+    assert response.status_code == 200
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+    
+    assert client.get('/api/v1/markets?per_page=3', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/v1/markets?per_page=3', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get('/api/v1/markets?per_page=3', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_projected_list_has_last_modified(client, make_markets):
+    make_markets(3)
+    response = client.get('/api/v1/markets?view=card')
+    assert response.status_code == 200
+    assert 'Last-Modified' in response.headers
+
+def test_old_if_modified_since_gets_full_response(client, make_markets):
+    make_markets(2)
+    since = format_datetime(Market.query.first().last_updated.replace(year=2000), usegmt=False)
+    response = client.get('/api/v1/markets', headers={'If-Modified-Since': since})
+    assert response.status_code == 200
+
+def test_market_detail_etag_changes_with_predictions(client, db, make_markets):
+    make_markets(1)
+    etag = client.get('/api/v1/markets/0').headers['ETag']
+    assert client.get('/api/v1/markets/0', headers={'If-None-Match': etag}).status_code == 304
+    
+    Market.increment_prediction_count('0')
+    db.session.commit()
+    response = client.get('/api/v1/markets/0', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_live_predictions_use_weak_etag(client, db, make_markets):
+    make_markets(1)
+    db.session.add(Prediction(transaction_hash='0x1', market_id='0', user_address='0xu', amount=10,
+                              outcome=1, timestamp=int(time.time())))
+    db.session.commit()
+    
+    response = client.get('/api/v1/tracking/predictions/live')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert client.get('/api/v1/tracking/predictions/live', headers={'If-None-Match': etag}).status_code == 304
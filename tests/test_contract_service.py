@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+import pytest
+from app.services.contract_service import contract_service, is_log_range_error
+from app.services.rpc_client import RpcError
+
+@pytest.fixture
+def fake_logs(monkeypatch):
+    """get_logs over a node that rejects spans wider than max_span blocks"""
+    calls = []
+    
+    def get_logs(params):
+        span = params['toBlock'] - params['fromBlock'] + 1
+        calls.append((params['fromBlock'], params['toBlock']))
+        if span > fake.max_span:
+            raise ValueError({'code': -32005, 'message': 'query exceeds max block range'})
+        return [{'blockNumber': n} for n in range(params['fromBlock'], params['toBlock'] + 1)]
+    
+    fake = SimpleNamespace(calls=calls, max_span=100)
+    monkeypatch.setattr(contract_service, 'contract', SimpleNamespace(address='0x0000000000000000000000000000000000000001'))
+    monkeypatch.setattr(contract_service, 'event_topics', lambda: {'0x01': 'BetPlaced'})
+    monkeypatch.setattr(contract_service, 'w3', SimpleNamespace(eth=SimpleNamespace(get_logs=get_logs)))
+    monkeypatch.setattr(contract_service, 'log_block_range', 1000)
+    monkeypatch.setattr(contract_service, 'max_log_block_range', 1000)
+    monkeypatch.setattr(contract_service, 'full_windows_at_ceiling', 0)
+    return fake
+
+def test_log_range_errors_are_told_apart_from_transport_errors():
+    assert is_log_range_error(ValueError({'message': 'Block range is too large'}))
+    assert not is_log_range_error(ValueError({'message': 'rate limit exceeded'}))
+    assert not is_log_range_error(ConnectionError('reset'))
+
+def test_rejected_window_shrinks_without_losing_blocks(fake_logs):
+    logs = contract_service.get_logs(1, 1000)
+    
+    assert [log['blockNumber'] for log in logs] == list(range(1, 1001))
+    # Each rejection lowers the ceiling the window grows back towards
+    assert contract_service.max_log_block_range < 1000
+    assert contract_service.log_block_range <= contract_service.max_log_block_range
+    rejected = [(start, end) for start, end in fake_logs.calls if end - start + 1 > fake_logs.max_span]
+    assert len(rejected) < len(fake_logs.calls) / 2
+
+def test_transport_errors_are_not_retried_smaller(fake_logs, monkeypatch):
+    def get_logs(params):
+        raise ConnectionError('reset')
+    monkeypatch.setattr(contract_service.w3.eth, 'get_logs', get_logs)
+    
+    with pytest.raises(ConnectionError):
+        contract_service.get_logs(1, 1000)
+    assert contract_service.log_block_range == 1000
+
+def test_block_timestamps_are_fetched_once_per_block(monkeypatch):
+    requested = []
+    
+    def batch(calls):
+        requested.extend(int(params[0], 16) for _, params in calls)
+        return [{'timestamp': hex(1000 + int(params[0], 16))} for _, params in calls]
+    
+    monkeypatch.setattr(contract_service, 'rpc', SimpleNamespace(batch=batch))
+    monkeypatch.setattr(contract_service, 'block_timestamps', type(contract_service.block_timestamps)())
+    
+    assert contract_service.get_block_timestamps({5, 6}) == {5: 1005, 6: 1006}
+    assert contract_service.get_block_timestamps({6, 7}) == {6: 1006, 7: 1007}
+    assert sorted(requested) == [5, 6, 7]
+
+def test_unreadable_block_raises(monkeypatch):
+    monkeypatch.setattr(contract_service, 'rpc', SimpleNamespace(batch=lambda calls: [RpcError('header not found')]))
+    monkeypatch.setattr(contract_service, 'block_timestamps', type(contract_service.block_timestamps)())
+    
+    with pytest.raises(RpcError):
+        contract_service.get_block_timestamps({9})
+
+def test_batch_reads_match_chain_state(fake_chain, monkeypatch):
+    monkeypatch.setattr(contract_service, 'multicall_batch_size', 5)
+    fake_chain.requests = 0
+    
+    markets = contract_service.get_markets(list(range(12)))
+    
+    assert [m['id'] for m in markets] == [str(i) for i in range(12)]
+    for market, expected in zip(markets, fake_chain.markets):
+        assert (market['question'], market['yes_pool'], market['no_pool'], market['resolved']) == \
+            (expected['question'], expected['yes_pool'], expected['no_pool'], expected['resolved'])
+    # 12 reads in chunks of 5: one aggregate3 call per chunk (plus the head block)
+    assert fake_chain.requests <= 4
+
+def test_failed_multicall_chunk_falls_back_to_single_calls(fake_chain, monkeypatch):
+    monkeypatch.setattr(contract_service, 'multicall_batch_size', 5)
+    decode = contract_service._decode_aggregate
+    failures = []
+    
+    def flaky_decode(fn_name, response):
+        if not failures:
+            failures.append(fn_name)
+            raise ValueError('bad aggregate response')
+        return decode(fn_name, response)
+    
+    monkeypatch.setattr(contract_service, '_decode_aggregate', flaky_decode)
+    
+    markets = contract_service.get_markets(list(range(12)))
+    
+    assert failures and [m['id'] for m in markets] == [str(i) for i in range(12)]
@@ -0,0 +1,86 @@
+import pytest
+from hexbytes import HexBytes
+from app.models import Market, Prediction, User
+from app.services.contract_service import contract_service
+from app.services.event_listener import event_listener
+from app.services.trending_service import trending_engine
+from app.utils import bulk
+
+EVENT_NAMES = ('MarketCreated', 'BetPlaced', 'MarketResolved', 'PayoutClaimed')
+
+def block_time(block_number):
+    return 1_700_000_000 + block_number * 2
+
+@pytest.fixture(autouse=True)
+def listener(monkeypatch):
+    monkeypatch.setattr(event_listener, 'event_names', EVENT_NAMES)
+    monkeypatch.setattr(contract_service, 'get_block_timestamps', lambda blocks: {n: block_time(n) for n in blocks})
+    return event_listener
+
+def bet(i, market_id='0', user=None, amount=10, outcome=1):
+    return {
+        'event': 'BetPlaced',
+        'args': {'marketId': int(market_id), 'user': user or f'0xuser{i}', 'outcome': outcome, 'amount': amount},
+        'transactionHash': HexBytes(i.to_bytes(32, 'big')),
+        'blockNumber': 100 + i // 10
+    }
+
+def test_bets_are_inserted_once(db, make_markets):
+    make_markets(2)
+    events = [bet(i, market_id=str(i % 2)) for i in range(10)]
+    
+    event_listener.apply_events(events)
+    event_listener.apply_events(events)
+    
+    assert Prediction.query.count() == 10
+    assert db.session.get(Market, '0').prediction_count == 5
+    assert db.session.get(Market, '1').prediction_count == 5
+
+def test_backfill_batch_beyond_bind_parameter_limit(db, make_markets):
+    make_markets(3)
+    # Predictions have 6 columns: this batch does not fit in one SQLite statement
+    count = bulk.MAX_BIND_PARAMS['sqlite'] // 6 + 500
+    events = [bet(i, market_id=str(i % 3)) for i in range(count)]
+    
+    event_listener.apply_events(events, checkpoint_block=500)
+    
+    assert Prediction.query.count() == count
+    assert User.query.count() == count
+    assert sum(m.prediction_count for m in Market.query) == count
+
+def test_resolution_and_claims(db, make_markets):
+    make_markets(1)
+    event_listener.apply_events([bet(1, user='0xwinner')])
+    event_listener.apply_events([
+        {'event': 'MarketResolved', 'args': {'marketId': 0, 'winningOutcome': 1}},
+        {'event': 'PayoutClaimed', 'args': {'marketId': 0, 'user': '0xwinner', 'amount': 20}}
+    ])
+    
+    market = db.session.get(Market, '0')
+    assert market.resolved and market.winning_outcome == 1
+    assert Prediction.query.one().claimed
+
+def test_bets_carry_their_block_timestamp(db, make_markets, monkeypatch):
+    make_markets(1)
+    recorded = []
+    monkeypatch.setattr(trending_engine, 'record_prediction', lambda *args, **kwargs: recorded.append(kwargs['ts']))
+    
+    event_listener.apply_events([bet(1), bet(25)])
+    
+    stamps = sorted(p.timestamp for p in Prediction.query)
+    assert stamps == [block_time(100), block_time(102)]
+    assert sorted(recorded) == stamps
+
+def test_bisection_skips_only_the_bad_event(db, make_markets):
+    make_markets(1)
+    events = [bet(i) for i in range(7)]
+    events.insert(3, {'event': 'Unknown', 'args': {}, 'transactionHash': HexBytes(b'\xff' * 32), 'blockNumber': 100})
+    
+    with pytest.raises(KeyError):
+        event_listener.apply_events(events)
+    db.session.rollback()
+    skipped = event_listener.stats['events_skipped']
+    event_listener._apply_bisected(events)
+    
+    assert Prediction.query.count() == 7
+    assert event_listener.stats['events_skipped'] == skipped + 1
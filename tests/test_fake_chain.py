@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from fake_chain import FakeChain, RpcFailure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_state_follows_the_event_log():
+    chain = FakeChain.synthetic(markets=5, bets_per_market=3, users=4, resolved_ratio=0)
+    
+    for market_id, market in enumerate(chain.markets):
+        bets = [e['args'] for e in chain.events if e['event'] == 'BetPlaced' and e['args']['marketId'] == market_id]
+        assert market['total_liquidity'] == sum(b['amount'] for b in bets)
+        assert market['yes_pool'] == sum(b['amount'] for b in bets if b['outcome'] == 1)
+    assert chain.event_blocks == sorted(chain.event_blocks)
+
+def test_get_logs_enforces_the_range_limit_and_topic_filter():
+    chain = FakeChain.synthetic(markets=10, bets_per_market=3, users=4)
+    chain.max_log_range = 2
+    
+    with pytest.raises(RpcFailure):
+        chain.get_logs({'fromBlock': hex(1), 'toBlock': hex(3)})
+    
+    logs = chain.get_logs({'fromBlock': hex(1), 'toBlock': hex(2)})
+    assert logs and all(int(log['blockNumber'], 16) in (1, 2) for log in logs)
+    
+    topic = logs[0]['topics'][0]
+    assert all(log['topics'][0] == topic for log in chain.get_logs({'fromBlock': hex(1), 'toBlock': hex(2), 'topics': [topic]}))
+
+def test_fixture_round_trip(tmp_path):
+    chain = FakeChain.synthetic(markets=4, bets_per_market=2, users=3)
+    path = tmp_path / 'chain.json'
+    chain.save_fixture(path)
+    
+    replayed = FakeChain.from_fixture(path)
+    
+    assert replayed.markets == chain.markets
+    assert replayed.bets == chain.bets
+
+def test_benchmark_runs_end_to_end(tmp_path):
+    report_path = tmp_path / 'bench.json'
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'scripts', 'benchmark_sync.py'),
+         '--markets', '20', '--bets-per-market', '3', '--users', '10', '--new-bets', '20',
+         '--json', str(report_path)],
+        cwd=ROOT, capture_output=True, text=True, timeout=300
+    )
+    
+    assert result.returncode == 0, result.stdout + result.stderr
+    report = json.loads(report_path.read_text())
+    assert report['caught_up']
+    assert {p['phase'] for p in report['phases']} == {
+        'fetch_all_markets', 'listener_backfill', 'full_sync', 'listener_incremental', 'incremental_sync'
+    }
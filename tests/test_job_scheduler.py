@@ -0,0 +1,97 @@
+import threading
+import time
+import pytest
+from app.services import job_scheduler as module
+from app.services.job_scheduler import JobScheduler
+
+class SharedLease:
+    """In-memory stand-in for the Redis/Postgres lease: one holder at a time across schedulers"""
+    
+    holder = None
+    lock = threading.Lock()
+    backend = 'shared'
+    
+    def acquire(self) -> bool:
+        with SharedLease.lock:
+            if SharedLease.holder in (None, self):
+                SharedLease.holder = self
+            return SharedLease.holder is self
+    
+    def release(self):
+        with SharedLease.lock:
+            if SharedLease.holder is self:
+                SharedLease.holder = None
+
+@pytest.fixture
+def schedulers(app, monkeypatch):
+    monkeypatch.setattr(SharedLease, 'holder', None)
+    monkeypatch.setattr(module, 'create_lease', lambda name, ttl: SharedLease())
+    created = []
+    
+    def make(runs):
+        scheduler = JobScheduler()
+        scheduler.lease_ttl = 0.3
+        name = f'worker{len(created)}'
+        scheduler.register('sync', lambda: runs.append(name), 0.05, jitter=0)
+        scheduler.register('index', lambda: runs.append(f'{name}-index'), 0.05, jitter=0, leader_only=False)
+        created.append(scheduler)
+        return scheduler, name
+    
+    yield make
+    for scheduler in created:
+        if scheduler.is_running:
+            scheduler.stop()
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_only_the_leader_runs_leader_jobs_and_the_lease_hands_off(app, schedulers):
+    runs = []
+    first, first_name = schedulers(runs)
+    second, second_name = schedulers(runs)
+    first.start(app)
+    assert wait_for(lambda: first.is_leader)
+    second.start(app)
+    
+    assert wait_for(lambda: runs.count(f'{second_name}-index') >= 3)
+    assert runs.count(first_name) >= 1
+    assert second_name not in runs
+    
+    first.stop()
+    assert wait_for(lambda: second.is_leader)
+    assert wait_for(lambda: second_name in runs)
+
+def test_overlapping_runs_are_skipped(app, schedulers, monkeypatch):
+    release = threading.Event()
+    scheduler = JobScheduler()
+    scheduler.lease_ttl = 0.3
+    monkeypatch.setattr(module, 'create_lease', lambda name, ttl: module.LocalLease())
+    job = scheduler.register('slow', lambda: release.wait(2), 0.01, jitter=0)
+    scheduler.start(app)
+    try:
+        assert wait_for(lambda: job.running.locked())
+        time.sleep(0.1)
+        assert job.stats['runs'] == 0
+        # Still running, so it was dispatched once and not queued again
+        assert job.next_run == float('inf')
+    finally:
+        release.set()
+        scheduler.stop()
+    assert job.stats['runs'] >= 1
+
+def test_background_task_runs_once_per_name(app):
+    scheduler = JobScheduler()
+    gate = threading.Event()
+    
+    scheduler.run_in_background('reconcile', lambda: gate.wait(2) and 'done', app=app)
+    with pytest.raises(RuntimeError):
+        scheduler.run_in_background('reconcile', lambda: None, app=app)
+    gate.set()
+    
+    assert wait_for(lambda: not scheduler.get_task('reconcile')['running'])
+    assert scheduler.get_task('reconcile')['result'] == 'done'
@@ -0,0 +1,29 @@
+from app.models import Market
+from app.utils.tagged_cache import market_tag, tagged_cache
+
+def test_batch_keeps_request_order_and_lists_missing(client, make_markets):
+    make_markets(3)
+    body = client.get('/api/v1/markets/batch?ids=2,missing,0,2').get_json()
+    
+    assert [m['id'] for m in body['markets']] == ['2', '0']
+    assert body['missing'] == ['missing']
+    assert 'prices' in body['markets'][0]
+
+def test_post_body_and_validation(client, make_markets):
+    make_markets(2)
+    assert [m['id'] for m in client.post('/api/v1/markets/batch', json={'ids': [1, 0]}).get_json()['markets']] == ['1', '0']
+    assert client.post('/api/v1/markets/batch', json={'ids': '1,0'}).status_code == 400
+    assert client.get('/api/v1/markets/batch').status_code == 400
+    assert client.get('/api/v1/markets/batch?ids=' + ','.join(map(str, range(251)))).status_code == 400
+
+def test_batch_entries_are_cached_and_evicted_per_market(client, db, make_markets):
+    make_markets(3)
+    client.get('/api/v1/markets/batch?ids=0,1,2')
+    Market.query.filter(Market.id.in_(['1', '2'])).update({'question': 'renamed'}, synchronize_session=False)
+    db.session.commit()
+    
+    tagged_cache.invalidate(market_tag('2'))
+    body = client.get('/api/v1/markets/batch?ids=0,1,2').get_json()
+    
+    assert body['cache_hits'] == 2
+    assert [m['question'] == 'renamed' for m in body['markets']] == [False, False, True]
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import desc, text
+from app.models import Market
+from app.models.market import null_as_zero
+from app.utils.helpers import encode_cursor
+
+def walk(client, url):
+    """Every page of a cursor-paginated list, following next_cursor"""
+    ids, pages = [], 0
+    cursor = None
+    while True:
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        body = response.get_json()
+        ids.extend(m['id'] for m in body['markets'])
+        pages += 1
+        cursor = body['pagination']['next_cursor']
+        if not cursor:
+            return ids, pages
+
+@pytest.mark.parametrize('sort_by', ['end_time', 'total_liquidity', 'yes_pool'])
+def test_cursor_pages_match_offset_listing(client, make_markets, sort_by):
+    make_markets(23)
+    first = client.get(f'/api/v1/markets?sort_by={sort_by}&per_page=100').get_json()
+    expected = [m['id'] for m in first['markets']]
+    
+    ids, pages = walk(client, f'/api/v1/markets?sort_by={sort_by}&per_page=5')
+    
+    assert ids == expected
+    assert len(ids) == 23 and pages == 5
+
+def test_null_sort_values_keep_their_place(client, db, make_markets):
+    make_markets(12)
+    Market.query.filter(Market.id.in_(['2', '3', '7'])).update({'total_liquidity': None}, synchronize_session=False)
+    db.session.commit()
+    
+    ids, _ = walk(client, '/api/v1/markets?sort_by=total_liquidity&per_page=2')
+    
+    assert len(ids) == 12 and len(set(ids)) == 12
+    # NULL sorts as 0, next to market 0, ties broken by id descending
+    assert ids[-4:] == ['7', '3', '2', '0']
+
+def test_filters_apply_to_cursor_pages(client, make_markets):
+    make_markets(15)
+    ids, _ = walk(client, '/api/v1/markets?category=Sports&sort_by=yes_pool&per_page=3')
+    assert ids == [str(i) for i in range(13, 0, -2)]
+
+@pytest.mark.parametrize('cursor', [
+    encode_cursor('total_liquidity', 'abc', '3'),
+    encode_cursor('total_liquidity', [1], '3'),
+    encode_cursor('total_liquidity', 10, 3),
+    encode_cursor('end_time', 10, '3'),
+    'not-a-cursor',
+])
+def test_bad_cursor_is_a_client_error(client, make_markets, cursor):
+    make_markets(3)
+    response = client.get(f'/api/v1/markets?sort_by=total_liquidity&cursor={cursor}')
+    assert response.status_code == 400
+
+def test_cursor_query_uses_the_sort_index(db, make_markets):
+    make_markets(3)
+    sort_column = null_as_zero(Market.yes_pool)
+    query = Market.query.filter(
+        db.or_(sort_column < 5, db.and_(sort_column == 5, Market.id < '3'))
+    ).order_by(desc(sort_column), desc(Market.id)).limit(5)
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    
+    plan = ' '.join(str(row) for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+    
+    assert 'idx_markets_yes_pool_id' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import text
+from app.services.market_search_service import market_search_service
+
+@pytest.fixture
+def search_index(db, monkeypatch):
+    """Start without an FTS table; whatever a test creates is dropped afterwards"""
+    monkeypatch.setattr(market_search_service, 'index_ready', False)
+    monkeypatch.setattr(market_search_service, 'index_checked_at', 0.0)
+    db.session.execute(text('DROP TABLE IF EXISTS markets_fts'))
+    db.session.commit()
+    yield market_search_service
+    db.session.rollback()
+    db.session.execute(text('DROP TABLE IF EXISTS markets_fts'))
+    db.session.commit()
+
+@pytest.fixture
+def markets(make_markets):
+    markets = make_markets(4)
+    markets[0].question, markets[0].description = 'Will Bitcoin hit 100k?', 'Crypto price market'
+    markets[1].question, markets[1].description = 'Will Arsenal win the league?', 'Bitcoin sponsorship rumours'
+    markets[2].question, markets[2].description = 'Will it rain in London?', 'Weather'
+    markets[3].question = 'Bitcoin ETF approved by June?'
+    return markets
+
+def ids(response):
+    return [r['market']['id'] for r in response.get_json()['results']]
+
+def test_search_falls_back_to_ilike_without_index(client, db, search_index, markets):
+    db.session.commit()
+    
+    response = client.get('/api/v1/markets/search?q=bitcoin')
+    
+    assert response.status_code == 200
+    # Question matches rank above description-only matches
+    assert ids(response)[-1] == '1'
+    assert sorted(ids(response)) == ['0', '1', '3']
+    assert not search_index.index_ready
+
+def test_fts_index_ranks_prefix_matches(client, db, search_index, markets):
+    db.session.commit()
+    assert search_index.create_index()
+    
+    assert sorted(ids(client.get('/api/v1/markets/search?q=bitc'))) == ['0', '1', '3']
+    assert ids(client.get('/api/v1/markets/search?q=bitcoin etf')) == ['3']
+    assert ids(client.get('/api/v1/markets/search?q=bitcoin'))[-1] == '1'
+
+def test_index_follows_market_writes(client, db, search_index, markets):
+    db.session.commit()
+    search_index.create_index()
+    
+    markets[2].question = 'Will Bitcoin rain in London?'
+    db.session.commit()
+    
+    assert '2' in ids(client.get('/api/v1/markets/search?q=bitcoin'))
+
+def test_list_search_filter_uses_the_index(client, db, search_index, markets):
+    db.session.commit()
+    search_index.create_index()
+    
+    listed = client.get('/api/v1/markets?search=arsenal').get_json()['markets']
+    assert [m['id'] for m in listed] == ['1']
+
+def test_empty_query_is_rejected(client, search_index):
+    assert client.get('/api/v1/markets/search?q=').status_code == 400
@@ -0,0 +1,58 @@
+import pytest
+import requests
+from prometheus_client import REGISTRY, Counter, Histogram
+from app.utils.metrics import timed, upstream_error_reason
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_requests_and_queries_are_timed(client, make_markets):
+    make_markets(3)
+    labels = dict(endpoint='markets.get_markets', method='GET', status='200')
+    requests_before = sample('seti_http_request_duration_seconds_count', **labels)
+    selects_before = sample('seti_db_query_duration_seconds_count', operation='SELECT')
+    
+    assert client.get('/api/v1/markets').status_code == 200
+    
+    assert sample('seti_http_request_duration_seconds_count', **labels) == requests_before + 1
+    assert sample('seti_db_query_duration_seconds_count', operation='SELECT') > selects_before
+
+def test_unmatched_routes_share_one_label(client):
+    before = sample('seti_http_request_duration_seconds_count', endpoint='unmatched', method='GET', status='404')
+    client.get('/no/such/route/1')
+    client.get('/no/such/route/2')
+    assert sample('seti_http_request_duration_seconds_count', endpoint='unmatched', method='GET', status='404') == before + 2
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    client.get('/health')
+    response = client.get('/metrics')
+    
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert '# TYPE seti_http_request_duration_seconds histogram' in body
+    assert 'seti_sync_markets_total' in body
+
+def test_timed_counts_errors_and_still_observes():
+    histogram = Histogram('test_timed_seconds', 'test', ['phase'], registry=None)
+    errors = Counter('test_timed_errors_total', 'test', ['phase'], registry=None)
+    
+    with pytest.raises(ValueError):
+        with timed(histogram, errors, phase='boom'):
+            raise ValueError('bad')
+    with timed(histogram, errors, phase='ok'):
+        pass
+    
+    assert errors.labels(phase='boom')._value.get() == 1
+    assert errors.labels(phase='ok')._value.get() == 0
+    assert histogram.labels(phase='boom')._sum.get() >= 0
+    assert {s.labels['phase'] for s in histogram.collect()[0].samples if s.name.endswith('_count')} == {'boom', 'ok'}
+
+def test_upstream_error_reasons():
+    response = requests.Response()
+    response.status_code = 503
+    
+    assert upstream_error_reason(requests.exceptions.ReadTimeout()) == 'timeout'
+    assert upstream_error_reason(requests.exceptions.HTTPError(response=response)) == 'http_5xx'
+    assert upstream_error_reason(requests.exceptions.ConnectionError()) == 'connection'
+    assert upstream_error_reason(ValueError('not json')) == 'invalid_response'
@@ -0,0 +1,50 @@
+from datetime import datetime
+import pytest
+from app.models import Comment, Game, Market, Prediction
+from app.services.sync_scheduler import SyncScheduler
+
+@pytest.fixture
+def setup(db, make_markets):
+    """Chain has markets 0-3; the DB also has 'stale' (orphan, with dependents) and '9' (created after the fetch)"""
+    make_markets(4)
+    make_markets(1, id='stale')
+    make_markets(1, id='9')
+    db.session.add_all([
+        Prediction(transaction_hash='0x1', market_id='stale', user_address='0xa', amount=1, outcome=1, timestamp=1),
+        Prediction(transaction_hash='0x2', market_id='0', user_address='0xa', amount=1, outcome=1, timestamp=1),
+        Comment(market_id='stale', user_address='0xa', content='gone soon'),
+        Game(fixture_id=1, home_team='A', away_team='B', league='L', kickoff_time=datetime.utcnow(), market_id='stale'),
+    ])
+    db.session.commit()
+    return [{'id': str(i)} for i in range(4)]
+
+def test_orphans_and_their_dependents_are_removed(db, setup):
+    report = SyncScheduler()._cleanup_old_data(setup, dry_run=False, next_market_id=4)
+    
+    assert report['orphan_ids'] == ['stale']
+    dependents = report['dependents']
+    assert (dependents['predictions'], dependents['comments'], dependents['games']) == (1, 1, 1)
+    assert db.session.get(Market, 'stale') is None
+    assert db.session.get(Market, '9') is not None
+    assert Prediction.query.count() == 1
+    assert Comment.query.count() == 0
+    # Nullable references without a cascade are detached, not deleted
+    assert Game.query.one().market_id is None
+
+def test_dry_run_only_reports(db, setup):
+    report = SyncScheduler()._cleanup_old_data(setup, dry_run=True, next_market_id=4)
+    
+    assert report['orphans'] == 1
+    assert db.session.get(Market, 'stale') is not None
+    assert Prediction.query.count() == 2
+
+@pytest.mark.parametrize('fetched, next_market_id, reason', [
+    ([], 4, 'empty chain fetch'),
+    ([{'id': '0'}, {'id': '1'}, {'id': '3'}], 4, 'incomplete chain fetch'),
+    ([{'id': str(i)} for i in range(4)], None, 'chain market count unknown'),
+])
+def test_partial_fetches_never_delete(db, setup, fetched, next_market_id, reason):
+    report = SyncScheduler()._cleanup_old_data(fetched, dry_run=False, next_market_id=next_market_id)
+    
+    assert report['skipped'] == reason
+    assert Market.query.count() == 6
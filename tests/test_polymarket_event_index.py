@@ -0,0 +1,64 @@
+from app.services import polymarket_event_index as index_module
+from app.services.polymarket_event_index import PolymarketEventIndex, event_teams
+
+
+def make_event(i, title, outcomes=None):
+    return {
+        'id': str(i),
+        'title': title,
+        'markets': [{'outcomes': outcomes}] if outcomes else []
+    }
+
+
+def serve(monkeypatch, pages, fail_at=None):
+    def get_events(params, strict=False):
+        page = params['offset'] // params['limit']
+        if page == fail_at:
+            if strict:
+                raise RuntimeError('Gamma API events request failed')
+            return []
+        return pages[page] if page < len(pages) else []
+    
+    monkeypatch.setattr(index_module.polymarket_gamma_service, 'get_events', get_events)
+
+
+def test_event_teams_normalizes_outcomes_and_skips_binary():
+    event = {
+        'teams': [{'name': 'Los Angeles Lakers'}],
+        'markets': [{'outcomes': '["Boston  Celtics", "Los Angeles Lakers"]'}, {'outcomes': ['Yes', 'No']}]
+    }
+    
+    assert event_teams(event) == {'los angeles lakers', 'boston celtics'}
+
+
+def test_find_event_by_team_names(monkeypatch):
+    serve(monkeypatch, [[
+        make_event(1, 'NBA: Lakers vs. Celtics', '["Lakers", "Celtics"]'),
+        make_event(2, 'NBA: Lakers vs. Warriors', '["Lakers", "Warriors"]'),
+    ]])
+    index = PolymarketEventIndex()
+    assert index.refresh()
+    
+    # The question shares no tokens with the title; the team keys still match
+    event = index.find_event('Who wins tonight?', ('LAKERS', 'warriors'))
+    assert event['id'] == '2'
+    
+    assert index.find_event('Lakers vs Celtics')['id'] == '1'
+    assert index.find_event('Who wins tonight?', ('Lakers', 'Knicks')) is None
+
+
+def test_failed_later_page_keeps_previous_index(monkeypatch):
+    index = PolymarketEventIndex()
+    index.page_size = 2
+    first = [make_event(1, 'Lakers vs Celtics'), make_event(2, 'Heat vs Knicks')]
+    second = [make_event(3, 'Bulls vs Nets')]
+    
+    serve(monkeypatch, [first, second])
+    assert index.refresh()
+    assert len(index.events) == 3
+    
+    serve(monkeypatch, [first, second], fail_at=1)
+    assert not index.refresh()
+    assert len(index.events) == 3
+    assert index.find_event('Bulls vs Nets')['id'] == '3'
+    assert index.stats['refresh_errors'] == 1
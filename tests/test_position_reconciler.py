@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+import pytest
+from app.models import Prediction, User
+from app.services.contract_service import contract_service
+from app.services.position_reconciler import position_reconciler
+
+def address(i):
+    return '0x' + f'{i:040x}'
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Contract bets keyed by (market_id, checksum address); unknown positions read as empty"""
+    bets = {}
+    calls = []
+    
+    def batch_call(fn_name, args_list):
+        calls.append(len(args_list))
+        return [bets.get((market_id, user.lower()), (0, 0, False)) for market_id, user in args_list]
+    
+    monkeypatch.setattr(contract_service, 'contract', SimpleNamespace())
+    monkeypatch.setattr(contract_service, 'batch_call', batch_call)
+    monkeypatch.setattr(contract_service.read_cache, 'block', 1234)
+    monkeypatch.setattr(position_reconciler, 'page_size', 2)
+    return SimpleNamespace(bets=bets, calls=calls)
+
+def add_bet(db, i, market_id, user, amount, claimed=False):
+    if not db.session.get(User, user):
+        db.session.add(User(address=user))
+    db.session.add(Prediction(
+        transaction_hash=f'0x{i:064x}', market_id=market_id, user_address=user,
+        amount=amount, outcome=1, claimed=claimed, timestamp=1
+    ))
+
+@pytest.fixture
+def positions(db, make_markets, chain):
+    make_markets(3)
+    add_bet(db, 1, '0', address(1), 10)
+    add_bet(db, 2, '0', address(1), 5)      # two rows, one position of 15
+    add_bet(db, 3, '0', address(2), 20)     # amount drift
+    add_bet(db, 4, '1', address(1), 30)     # claimed on chain only
+    add_bet(db, 5, '1', address(3), 40)     # missing on chain
+    add_bet(db, 6, '2', address(2), 50)
+    add_bet(db, 7, '2', 'not-an-address', 1)
+    db.session.commit()
+    
+    chain.bets.update({
+        (0, address(1)): (15, 1, False),
+        (0, address(2)): (25, 1, False),
+        (1, address(1)): (30, 1, True),
+        (2, address(2)): (50, 1, False),
+    })
+    return chain
+
+def test_dry_run_reports_drift_across_pages(db, positions):
+    report = position_reconciler.reconcile(dry_run=True)
+    
+    assert report['positions_checked'] == 5
+    assert report['skipped'] == 1
+    assert report['by_kind'] == {'amount': 1, 'claimed': 1, 'missing_on_chain': 1}
+    # Keyset pages of 2 grouped positions, each verified with one batched read
+    assert positions.calls == [2, 2, 1]
+    assert Prediction.query.filter_by(claimed=True).count() == 0
+
+def test_fix_applies_amount_and_claimed_drift(db, positions):
+    report = position_reconciler.reconcile(dry_run=False)
+    
+    assert report['fixed'] == 2
+    amounts = dict(db.session.query(Prediction.transaction_hash, Prediction.amount))
+    assert amounts[f'0x{3:064x}'] == 25
+    assert Prediction.query.filter_by(market_id='1', user_address=address(1)).one().claimed
+    # Missing positions are report-only
+    assert Prediction.query.filter_by(market_id='1', user_address=address(3)).one().amount == 40
+    
+    assert position_reconciler.reconcile(dry_run=True)['by_kind'] == {'missing_on_chain': 1}
+
+def test_single_market(db, positions):
+    report = position_reconciler.reconcile(market_id='0', dry_run=True)
+    assert report['positions_checked'] == 2
+    assert report['by_kind'] == {'amount': 1}
@@ -0,0 +1,38 @@
+from app.models import Market, Prediction, User
+
+def create_prediction(client, market_id, user, outcome='YES'):
+    return client.post('/api/v1/predictions', json={
+        'market_id': market_id, 'user_address': user, 'outcome': outcome, 'amount': 10,
+        'transaction_hash': f'0x{market_id}{user}{outcome}'
+    })
+
+def test_created_predictions_bump_the_counter(client, db, make_markets):
+    make_markets(2)
+    db.session.add_all([User(address='0xa'), User(address='0xb')])
+    db.session.commit()
+    
+    assert create_prediction(client, '0', '0xa').status_code == 201
+    assert create_prediction(client, '0', '0xb').status_code == 201
+    assert create_prediction(client, '0', '0xa', 'NO').status_code == 201
+    # Duplicate outcome is rejected and must not count
+    assert create_prediction(client, '0', '0xa').status_code == 409
+    
+    assert db.session.get(Market, '0').prediction_count == 3
+    listed = {m['id']: m['prediction_count'] for m in client.get('/api/v1/markets').get_json()['markets']}
+    assert listed == {'0': 3, '1': 0}
+    assert client.get('/api/v1/markets/0').get_json()['market']['prediction_count'] == 3
+
+def test_backfill_recomputes_from_predictions(db, make_markets):
+    make_markets(3)
+    for i, market_id in enumerate(['0', '0', '2']):
+        db.session.add(Prediction(
+            transaction_hash=f'0x{i}', market_id=market_id, user_address='0xa',
+            amount=1, outcome=1, timestamp=1
+        ))
+    Market.query.filter_by(id='1').update({'prediction_count': 7})
+    db.session.commit()
+    
+    assert Market.backfill_prediction_counts() == 2
+    
+    counts = dict(db.session.query(Market.id, Market.prediction_count))
+    assert counts == {'0': 2, '1': 0, '2': 1}
@@ -0,0 +1,41 @@
+import time
+from app.models import Market, PriceCandle, PriceSnapshot
+from app.utils import bulk
+
+def test_pool_changes_roll_candles(db, make_markets):
+    market, = make_markets(1, yes_pool=100, no_pool=100)
+    for yes_pool in (300, 50, 80):
+        market.yes_pool = yes_pool
+        db.session.commit()
+    
+    candles = {c.interval: c for c in PriceCandle.query.filter_by(market_id='0')}
+    assert set(candles) == {'1m', '1h', '1d'}
+    for candle in candles.values():
+        assert candle.open == 5000
+        assert candle.high == 7500
+        assert candle.low == 3333
+        assert candle.close == 4444
+        # 200 at creation, then pool growth of 200, 0 and 30
+        assert candle.volume == 430
+    assert PriceSnapshot.query.filter_by(market_id='0').count() == 4
+
+def test_unchanged_price_and_volume_record_nothing(db, make_markets):
+    market, = make_markets(1, yes_pool=10, no_pool=10)
+    market.question = 'Renamed question?'
+    db.session.commit()
+    assert PriceSnapshot.query.count() == 1
+
+def test_flush_beyond_bind_parameter_limit(db):
+    # 3 candles x 8 columns per new market: more parameters than one SQLite statement allows
+    count = bulk.MAX_BIND_PARAMS['sqlite'] // 24 + 100
+    now = int(time.time())
+    db.session.add_all(
+        Market(id=str(i), question=f'Market {i}?', end_time=now + 60, creator='0x', created_timestamp=now,
+               yes_pool=i, no_pool=1)
+        for i in range(count)
+    )
+    db.session.commit()
+    
+    assert Market.query.count() == count
+    assert PriceCandle.query.count() == 3 * count
+    assert PriceSnapshot.query.count() == count
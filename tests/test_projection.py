@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.models.market import CARD_FIELDS
+
+@contextmanager
+def statements(db):
+    """SQL statements executed inside the block"""
+    seen = []
+    
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield seen
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def market_selects(seen):
+    """Row SELECTs on markets (the pagination total is a count over a subquery)"""
+    return [s for s in seen if s.lstrip().startswith('SELECT markets.') and 'FROM markets' in s]
+
+def test_fields_projection_returns_and_selects_only_those_fields(client, db, make_markets):
+    make_markets(3)
+    
+    with statements(db) as seen:
+        body = client.get('/api/v1/markets?fields=question,prices').get_json()
+    
+    assert all(set(m) == {'id', 'question', 'prices'} for m in body['markets'])
+    selects = market_selects(seen)
+    assert selects and all('markets.description' not in s for s in selects)
+    # prices is derived from the pool columns, which must be loaded
+    assert any('markets.yes_pool' in s for s in selects)
+
+def test_card_view(client, make_markets):
+    make_markets(2)
+    markets = client.get('/api/v1/markets?view=card').get_json()['markets']
+    assert [set(m) for m in markets] == [set(CARD_FIELDS)] * 2
+
+def test_projected_cursor_pages(client, make_markets):
+    make_markets(5)
+    first = client.get('/api/v1/markets?fields=question&sort_by=yes_pool&per_page=2').get_json()
+    cursor = first['pagination']['next_cursor']
+    
+    second = client.get(f'/api/v1/markets?fields=question&sort_by=yes_pool&per_page=2&cursor={cursor}').get_json()
+    
+    assert [m['id'] for m in first['markets'] + second['markets']] == ['4', '3', '2', '1']
+
+def test_unknown_fields_and_views_are_rejected(client, make_markets):
+    make_markets(1)
+    assert client.get('/api/v1/markets?fields=question,secret').status_code == 400
+    assert client.get('/api/v1/markets?view=tiny').status_code == 400
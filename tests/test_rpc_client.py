@@ -0,0 +1,73 @@
+import asyncio
+import time
+import pytest
+from fake_chain import FakeChain
+from app.services.rpc_client import RpcClient, RpcError
+
+DOWN_URL = 'http://127.0.0.1:1'
+
+@pytest.fixture
+def nodes():
+    """Two local chain stand-ins at heads 5 and 7"""
+    servers, urls, chains = [], [], []
+    for head in (5, 7):
+        chain = FakeChain()
+        chain.head = head
+        server, url = chain.serve()
+        servers.append(server)
+        urls.append(url)
+        chains.append(chain)
+    yield chains, urls
+    for server in servers:
+        server.shutdown()
+
+def close(client):
+    if client.loop_session is not None:
+        asyncio.run_coroutine_threadsafe(client.loop_session.close(), client.loop).result()
+
+def test_fails_over_and_cools_down_a_dead_endpoint(nodes):
+    _, urls = nodes
+    client = RpcClient([DOWN_URL, urls[0]], timeout=2)
+    
+    assert int(client.call('eth_blockNumber'), 16) == 5
+    assert client.stats['failovers'] == 1
+    # The dead endpoint is ranked last until its cooldown ends
+    assert client.ranked_endpoints()[0].url == urls[0]
+    client.call('eth_blockNumber')
+    assert client.stats['failovers'] == 1
+
+def test_node_errors_are_not_retried_elsewhere(nodes):
+    chains, urls = nodes
+    client = RpcClient(urls, timeout=2)
+    
+    with pytest.raises(RpcError):
+        client.call('eth_unknownMethod')
+    assert sum(chain.requests for chain in chains) == 1
+
+def test_hedged_request_wins_over_a_slow_primary(nodes):
+    chains, urls = nodes
+    client = RpcClient(urls, timeout=5, hedge_delay=0.05)
+    # Rank the slow node first
+    client.endpoints[0].latency, client.endpoints[1].latency = 0.001, 0.002
+    chains[0].latency = 0.5
+    
+    started = time.perf_counter()
+    head = int(client.call('eth_blockNumber'), 16)
+    
+    assert head == 7
+    assert time.perf_counter() - started < 0.4
+    assert client.stats['hedged'] == 1 and client.stats['hedge_wins'] == 1
+
+def test_batch_and_call_many_keep_call_order(nodes):
+    _, urls = nodes
+    client = RpcClient([urls[1]], timeout=2)
+    calls = [('eth_getBlockByNumber', [hex(n), False]) for n in (3, 1, 99)] + [('eth_blockNumber', [])]
+    
+    batched = client.batch(calls)
+    gathered = client.call_many(calls, concurrency=2)
+    close(client)
+    
+    assert [int(b['number'], 16) for b in batched[:2]] == [3, 1]
+    assert batched[2] is None and int(batched[3], 16) == 7
+    assert [int(b['number'], 16) for b in gathered[:2]] == [3, 1]
+    assert gathered[2] is None and int(gathered[3], 16) == 7
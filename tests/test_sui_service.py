@@ -0,0 +1,64 @@
+import pytest
+from app.services.sui_service import SuiService
+
+class FakeSuiRpc:
+    """suix_queryObjects pages of ids and sui_multiGetObjects, with injectable failures"""
+    
+    def __init__(self, ids, page_size=3, fail_page=None, fail_multi_get=False):
+        self.ids = ids
+        self.page_size = page_size
+        self.fail_page = fail_page
+        self.fail_multi_get = fail_multi_get
+        self.multi_get_sizes = []
+    
+    def call(self, method, params):
+        cursor = params[1] or 0
+        if cursor == self.fail_page:
+            raise ConnectionError('page unavailable')
+        page = self.ids[cursor:cursor + self.page_size]
+        end = cursor + len(page)
+        return {
+            'data': [{'data': {'objectId': object_id}} for object_id in page],
+            'nextCursor': end if end < len(self.ids) else None,
+            'hasNextPage': end < len(self.ids)
+        }
+    
+    def call_many(self, calls, concurrency=50):
+        results = []
+        for _, (chunk, _options) in calls:
+            self.multi_get_sizes.append(len(chunk))
+            if self.fail_multi_get:
+                results.append(ConnectionError('multiGet failed'))
+                continue
+            results.append([
+                {'data': {'objectId': object_id, 'content': {'fields': {'question': f'Q {object_id}', 'endTime': '1'}}}}
+                for object_id in chunk
+            ])
+        return results
+
+def make_service(rpc):
+    service = SuiService()
+    service.rpc = rpc
+    service.multi_get_batch_size = 2
+    service.concurrency = 2
+    return service
+
+def test_iter_markets_streams_every_page():
+    rpc = FakeSuiRpc([f'0x{i}' for i in range(10)])
+    service = make_service(rpc)
+    
+    markets = list(service.iter_markets())
+    
+    assert [m['id'] for m in markets] == [f'0x{i}' for i in range(10)]
+    # At most one window (batch size x concurrency) is hydrated at a time
+    assert max(rpc.multi_get_sizes) <= 2
+
+def test_failed_listing_page_raises():
+    service = make_service(FakeSuiRpc([f'0x{i}' for i in range(10)], fail_page=6))
+    with pytest.raises(ConnectionError):
+        list(service.iter_markets())
+
+def test_failed_multi_get_chunk_raises():
+    service = make_service(FakeSuiRpc(['0x1', '0x2', '0x3'], fail_multi_get=True))
+    with pytest.raises(ConnectionError):
+        service.get_markets(['0x1', '0x2', '0x3'])
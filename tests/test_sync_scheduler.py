@@ -0,0 +1,69 @@
+import time
+import pytest
+from app.models import Market, SyncCheckpoint
+from app.services.sync_scheduler import SyncScheduler
+
+@pytest.fixture
+def scheduler():
+    scheduler = SyncScheduler()
+    scheduler.last_activity = {'7': time.time() - 60}
+    scheduler.confirmations = 0
+    return scheduler
+
+def test_market_lifecycle_states(scheduler):
+    now = time.time()
+    far = int(now + 7 * 86400)
+    
+    assert scheduler.market_state('1', far, True, now) == 'resolved'
+    assert scheduler.market_state('7', far, False, now) == 'hot'
+    assert scheduler.market_state('1', far, False, now) == 'cold'
+    assert scheduler.market_state('1', int(now + 600), False, now) == 'closing'
+
+def test_ended_markets_leave_closing_after_grace_period(scheduler):
+    now = time.time()
+    assert scheduler.market_state('1', int(now - 60), False, now) == 'closing'
+    assert scheduler.market_state('1', int(now - scheduler.closing_grace - 60), False, now) == 'cold'
+
+def test_failed_cycle_counts_as_failure_and_backs_off(db, scheduler, monkeypatch):
+    from app.services import sync_scheduler as module
+    
+    def unreachable():
+        raise ConnectionError('node down')
+    monkeypatch.setattr(module.contract_service, 'get_block_number', unreachable)
+    
+    for expected in (2, 4):
+        with pytest.raises(ConnectionError):
+            scheduler.run_cycle()
+        assert scheduler.next_cycle_in == scheduler.min_interval * expected
+    
+    assert scheduler.sync_stats['failed_syncs'] == 2
+    assert scheduler.sync_stats['successful_syncs'] == 0
+    assert scheduler.sync_stats['consecutive_failures'] == 2
+
+def test_incremental_sync_refetches_only_touched_markets(db, scheduler, fake_chain):
+    scheduler.run_cycle()
+    assert scheduler.sync_stats['last_sync_mode'] == 'full'
+    assert Market.query.count() == 12
+    
+    fake_chain.add_bets(3)
+    touched = {str(e['args']['marketId']) for e in fake_chain.events[-3:]}
+    scheduler.run_cycle()
+    
+    assert scheduler.sync_stats['last_sync_mode'] == 'incremental'
+    assert scheduler.sync_stats['last_markets_fetched'] == len(touched)
+    assert SyncCheckpoint.get('market_sync').block_number == fake_chain.head
+    for market_id in touched:
+        assert db.session.get(Market, market_id).yes_pool == fake_chain.markets[int(market_id)]['yes_pool']
+        assert scheduler.market_state(market_id, 2 ** 40, False, time.time()) == 'hot'
+
+def test_quiet_chain_skips_the_log_scan(db, scheduler, fake_chain, monkeypatch):
+    from app.services import sync_scheduler as module
+    scheduler.run_cycle()
+    
+    def unexpected(*args):
+        raise AssertionError('no new blocks to scan')
+    monkeypatch.setattr(module.contract_service, 'touched_market_ids', unexpected)
+    scheduler.run_cycle()
+    
+    assert scheduler.sync_stats['incremental_syncs'] == 0
+    assert scheduler.sync_stats['failed_syncs'] == 0
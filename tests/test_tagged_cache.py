@@ -0,0 +1,74 @@
+from app.models import Market
+from app.utils.tagged_cache import MIN_TAG_TIMEOUT, TaggedCache, category_tag, market_tag, tagged_cache
+
+class RecordingCache:
+    """Dict-backed cache that remembers the timeout of every key"""
+    
+    def __init__(self):
+        self.values = {}
+        self.timeouts = {}
+    
+    def get(self, key):
+        return self.values.get(key)
+    
+    def get_many(self, *keys):
+        return [self.values.get(key) for key in keys]
+    
+    def set(self, key, value, timeout=None):
+        self.values[key], self.timeouts[key] = value, timeout
+    
+    def set_many(self, mapping, timeout=None):
+        for key, value in mapping.items():
+            self.set(key, value, timeout)
+
+def rename(db, market_id, question):
+    # Direct write without invalidation, so only a tag bump can expose it
+    Market.query.filter_by(id=market_id).update({'question': question})
+    db.session.commit()
+
+def test_market_tag_evicts_only_that_market(client, db, make_markets):
+    make_markets(2)
+    client.get('/api/v1/markets/0')
+    client.get('/api/v1/markets/1')
+    rename(db, '0', 'renamed 0')
+    rename(db, '1', 'renamed 1')
+    
+    assert client.get('/api/v1/markets/0').get_json()['market']['question'] != 'renamed 0'
+    
+    tagged_cache.invalidate(market_tag('0'))
+    
+    assert client.get('/api/v1/markets/0').get_json()['market']['question'] == 'renamed 0'
+    assert client.get('/api/v1/markets/1').get_json()['market']['question'] != 'renamed 1'
+
+def test_category_lists_are_evicted_by_their_category(client, db, make_markets):
+    make_markets(4)
+    crypto = '/api/v1/markets?category=Crypto'
+    sports = '/api/v1/markets?category=Sports'
+    client.get(crypto)
+    client.get(sports)
+    rename(db, '0', 'renamed crypto')
+    rename(db, '1', 'renamed sports')
+    
+    tagged_cache.invalidate_markets(['0'], ['Crypto'])
+    
+    assert 'renamed crypto' in {m['question'] for m in client.get(crypto).get_json()['markets']}
+    assert 'renamed sports' not in {m['question'] for m in client.get(sports).get_json()['markets']}
+
+def test_tag_versions_outlive_entries():
+    backend = RecordingCache()
+    cache = TaggedCache(backend)
+    cache.set_many({'a': 1}, cache.get_many({'a': [category_tag('x')]})[1], timeout=7200)
+    cache.invalidate(market_tag('1'))
+    
+    tag_timeouts = {key: t for key, t in backend.timeouts.items() if key.startswith('tagver:')}
+    entry_timeouts = [t for key, t in backend.timeouts.items() if key.startswith('tagged:')]
+    assert tag_timeouts and all(t >= MIN_TAG_TIMEOUT for t in tag_timeouts.values())
+    assert tag_timeouts['tagver:' + market_tag('1')] > max(entry_timeouts)
+
+def test_entries_without_timeout_keep_tags_forever():
+    backend = RecordingCache()
+    cache = TaggedCache(backend)
+    cache.set_many({'a': 1}, cache.get_many({'a': ['t']})[1], timeout=0)
+    cache.invalidate('t')
+    
+    assert backend.timeouts['tagver:t'] == 0
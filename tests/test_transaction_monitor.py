@@ -0,0 +1,51 @@
+import pytest
+from app.models import Prediction
+from app.services.contract_service import contract_service
+from app.services.event_listener import event_listener
+from app.services.transaction_monitor import TransactionMonitor
+from app.utils.helpers import LRUSet
+
+@pytest.fixture
+def monitor(fake_chain, monkeypatch):
+    monkeypatch.setattr(event_listener, 'event_names', ('MarketCreated', 'BetPlaced', 'MarketResolved', 'PayoutClaimed'))
+    monitor = TransactionMonitor()
+    monitor.contract = contract_service.contract
+    monitor.last_processed_block = fake_chain.head
+    return monitor
+
+def test_new_bets_are_applied_once(db, fake_chain, monitor):
+    fake_chain.add_bets(5)
+    
+    monitor.poll()
+    
+    assert Prediction.query.count() == 5
+    assert monitor.last_processed_block == fake_chain.head
+    assert monitor.stats['bets_applied'] == 5
+    
+    # Replaying the same blocks is deduplicated before touching the database
+    monitor.last_processed_block -= 1
+    monitor.poll()
+    assert Prediction.query.count() == 5
+    assert monitor.stats['duplicates_skipped'] == 5
+
+def test_only_bet_logs_are_requested(db, fake_chain, monitor, monkeypatch):
+    requested = []
+    get_logs = contract_service.get_logs
+    
+    def recording_get_logs(from_block, to_block, event_names=None):
+        requested.append(event_names)
+        return get_logs(from_block, to_block, event_names)
+    
+    monkeypatch.setattr(contract_service, 'get_logs', recording_get_logs)
+    fake_chain.add_bets(2)
+    monitor.poll()
+    
+    assert requested == [('BetPlaced',)]
+
+def test_dedupe_set_is_bounded():
+    seen = LRUSet(3)
+    for key in range(5):
+        seen.add(key)
+    
+    assert 0 not in seen and 1 not in seen
+    assert all(key in seen for key in (2, 3, 4))
@@ -0,0 +1,103 @@
+import time
+import pytest
+from app.models import Market, SyncCheckpoint
+from app.api import markets as markets_api
+from app.services import trending_service
+from app.services.trending_service import EPOCH_CHECKPOINT, REBASE_HALF_LIVES, TrendingEngine
+
+@pytest.fixture
+def engine():
+    engine = TrendingEngine()
+    engine.warm_start(quiet=True)
+    return engine
+
+def test_scores_rank_by_activity(db, make_markets, engine):
+    make_markets(3)
+    engine.record_prediction('1', 5 * trending_service.AMOUNT_UNIT, new_participant=True)
+    engine.record_prediction('2', 50 * trending_service.AMOUNT_UNIT, new_participant=True)
+    engine.record_view('0')
+    engine.refresh()
+    
+    assert [market_id for market_id, _ in engine.get_trending(limit=3)] == ['2', '1', '0']
+
+def test_persist_is_additive_across_workers(db, make_markets):
+    make_markets(2)
+    first, second = TrendingEngine(), TrendingEngine()
+    first.warm_start(quiet=True)
+    second.warm_start(quiet=True)
+    
+    first.record_comment('0')
+    second.record_comment('0')
+    second.record_comment('1')
+    first.persist()
+    second.persist()
+    first.warm_start(quiet=True)
+    
+    assert first.current_score('0') == pytest.approx(2 * first.weights['comment'], rel=1e-3)
+    assert first.current_score('0') == pytest.approx(second.current_score('0'))
+    assert first.current_score('1') == pytest.approx(first.weights['comment'], rel=1e-3)
+
+def test_persist_without_events_writes_nothing(db, make_markets, engine):
+    make_markets(1)
+    engine.record_comment('0')
+    engine.persist()
+    stored = db.session.query(Market.trending_score, Market.last_updated).filter_by(id='0').one()
+    
+    engine.persist()
+    engine.persist()
+    
+    assert db.session.query(Market.trending_score, Market.last_updated).filter_by(id='0').one() == stored
+
+def test_read_time_decay(db, make_markets, engine):
+    make_markets(1)
+    engine.record_comment('0')
+    engine.persist()
+    market = db.session.get(Market, '0')
+    
+    now = time.time()
+    assert market.current_trending_score() == pytest.approx(engine.weights['comment'], rel=1e-3)
+    assert engine.decayed(market.trending_score, now + engine.half_life) == \
+        pytest.approx(engine.decayed(market.trending_score, now) / 2)
+
+def test_rebase_rescales_without_touching_last_updated(db, make_markets, engine):
+    make_markets(2)
+    engine.record_comment('0')
+    engine.record_comment('1')
+    engine.persist()
+    before = {m.id: (m.current_trending_score(), m.last_updated) for m in Market.query}
+    
+    # Pretend the epoch is old enough to rebase and market 1 has resolved since
+    old_epoch = int(time.time() - engine.half_life * (REBASE_HALF_LIVES + 1))
+    factor = 2 ** ((engine.epoch - old_epoch) / engine.half_life)
+    checkpoint = SyncCheckpoint.get(EPOCH_CHECKPOINT)
+    checkpoint.block_number = old_epoch
+    Market.query.update({Market.trending_score: Market.trending_score * factor,
+                         Market.last_updated: Market.last_updated}, synchronize_session=False)
+    db.session.get(Market, '1').resolved = True
+    db.session.commit()
+    resolved_updated = db.session.get(Market, '1').last_updated
+    
+    engine.persist()
+    
+    assert engine.stats['rebases'] == 1
+    assert SyncCheckpoint.get(EPOCH_CHECKPOINT).block_number > old_epoch
+    market = db.session.get(Market, '0')
+    assert market.current_trending_score() == pytest.approx(before['0'][0], rel=1e-3)
+    assert market.last_updated == before['0'][1]
+    assert db.session.get(Market, '1').trending_score == 0
+    assert db.session.get(Market, '1').last_updated == resolved_updated
+
+def test_trending_endpoint_skips_resolved_markets(client, db, make_markets, engine, monkeypatch):
+    monkeypatch.setattr(markets_api, 'trending_engine', engine)
+    make_markets(3)
+    db.session.get(Market, '2').resolved = True
+    db.session.commit()
+    for market_id, comments in (('0', 1), ('1', 3), ('2', 5)):
+        for _ in range(comments):
+            engine.record_comment(market_id)
+    engine.refresh()
+    
+    markets = client.get('/api/v1/markets/trending?limit=5').get_json()['markets']
+    
+    assert [m['id'] for m in markets] == ['1', '0']
+    assert markets[0]['trending_score'] > markets[1]['trending_score']